@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class DbMysqlConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.db_mysql'
+
+    def ready(self):
+        from panelcore.ports import port_allocator
+        from .helper import get_installed_ports
+        port_allocator.register_source('db_mysql', get_installed_ports)
@@ -12,6 +12,12 @@ app_data_dir = app_path / 'data'
 app_cache_dir = app_path / 'cache'
 version_file = app_data_dir / 'version.json'
 software_file = app_data_dir / 'software.json'
+slim_profile_file = app_data_dir / 'slim_profile.json'
+
+install_profiles = {
+    'full': '完整安装',
+    'slim': '精简安装',
+}
 
 download_url = 'https://downloads.mysql.com/archives/get/p/23/file/mysql-{}-winx64.zip'
 
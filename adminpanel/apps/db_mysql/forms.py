@@ -1,6 +1,8 @@
 from django import forms
 
 from jiefoundation.forms import FormBase
+
+from .config import install_profiles
 from mimetypes import init
 
 
@@ -12,6 +14,12 @@ class ConfigForm(FormBase):
             attrs={'class': 'form-control', 'lay-verify': 'required', 'lay-reqtext': '请选择安装文件夹~'}
         )
     )
+    install_profile = forms.ChoiceField(
+        label='安装方式', required=True,
+        choices=install_profiles.items(),
+        help_text='精简安装解压时跳过调试版程序、调试符号(.pdb)和测试套件，本地开发使用足够，节省安装时间和磁盘空间~',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
 
 class InitializeForm(FormBase):
     install_id = forms.CharField(widget=forms.HiddenInput)
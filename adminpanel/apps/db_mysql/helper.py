@@ -1,37 +1,44 @@
 import json
 from pathlib import Path
 
+from jiefoundation.jsonstore import read_json
+
 def get_installed(id=None):
     from .config import installed_file_path
-    if not installed_file_path.exists():
-        installed_file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(installed_file_path, 'w', encoding='utf-8') as f:
-            json.dump({}, f, ensure_ascii=False, indent=4)
-        return {}
-    with open(installed_file_path, 'r', encoding='utf-8') as f:
-        installed = json.load(f)
+    installed = read_json(installed_file_path, {})
     if id: return installed[id]
     return installed
 
+def get_installed_ports():
+    """已安装实例配置的端口"""
+    return [item['port'] for item in get_installed().values() if item.get('port')]
+
 def get_config():
     from .config import config_file_path
-    if not config_file_path.exists():
-        config_file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(config_file_path, 'w', encoding='utf-8') as f:
-            json.dump({'install_folder': ''}, f, ensure_ascii=False, indent=4)
-            return {'install_folder': ''}
-    with open(config_file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return read_json(config_file_path, {'install_folder': ''})
 
 def get_version(version=None):
     from .config import version_file
-    with open(version_file, 'r', encoding='utf-8') as f:
-        versions = json.load(f)
+    versions = read_json(version_file)
     if version:
         return versions.get(version)
     return versions
 
 
+def get_slim_exclude(version):
+    """
+    获取精简安装时需要跳过的文件匹配规则，先按 主版本.次版本 匹配，没有则使用 default
+
+    :param version: 版本号，如 8.0.36
+    :return: 相对MySQL根目录的通配符列表
+    """
+    from .config import slim_profile_file
+    profiles = read_json(slim_profile_file)
+    series = '.'.join(str(version).split('.')[:2])
+    profile = profiles.get(series) or profiles.get(str(version).split('.')[0]) or profiles['default']
+    return profile['exclude']
+
+
 def parse_mysql_version(version_string):
     """解析MySQL版本号，支持5.7和8.0格式"""
     import re
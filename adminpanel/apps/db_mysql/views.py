@@ -13,13 +13,18 @@ from django.urls import reverse_lazy, reverse
 from django.shortcuts import redirect
 
 from jiefoundation.jiebase import JsonView
+from jiefoundation.jobs import submit_job, find_job, JobCancelled
+from jiefoundation.downloader import download
+from jiefoundation.jsonstore import read_json, write_json, update_json, get_lock
 from jiefoundation.utils import run_command, read_file, write_file
 from jiefoundation.utils import windows_api_blocking, windows_api
 
 from panelcore.mixin import DatabaseMixin
-from panelcore.helper import find_available_port, get_sorted
-from .helper import get_installed, get_config, get_version, parse_mysql_version
-from .config import app_name, version_file, config_file_path, app_cache_dir, installed_file_path
+from panelcore.helper import get_sorted
+from panelcore.ports import port_allocator
+from panelcore.services import service_catalog, invalidate_services, get_services_status
+from .helper import get_installed, get_config, get_version, parse_mysql_version, get_slim_exclude
+from .config import app_name, version_file, config_file_path, app_cache_dir, installed_file_path, install_profiles
 from .forms import ConfigForm, InitializeForm, UserPasswordForm, ConfigEditForm, ImportForm, ImportServiceForm
 
 
@@ -49,6 +54,7 @@ class ConfigView(MysqlMixin, FormView):
     def get_initial(self):
         initial = super().initial
         initial['install_folder'] = get_config()['install_folder']
+        initial['install_profile'] = get_config().get('install_profile', 'full')
         return initial.copy()
 
     def get_context_data(self, **kwargs):
@@ -57,10 +63,9 @@ class ConfigView(MysqlMixin, FormView):
         return context
 
     def form_valid(self, form):
-        config = get_config()
-        config['install_folder'] = form.cleaned_data['install_folder']
-        with open(config_file_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=4)
+        with update_json(config_file_path, {'install_folder': ''}) as config:
+            config['install_folder'] = form.cleaned_data['install_folder']
+            config['install_profile'] = form.cleaned_data['install_profile']
         messages.success(self.request, '配置保存成功~')
         return redirect(reverse_lazy(f'{app_name}:index'))
 
@@ -84,8 +89,7 @@ class SoftwareView(MysqlMixin, TemplateView):
             },
         ]
         from .config import software_file
-        with open(software_file, 'r', encoding='utf-8') as f:
-            context['software_list'] = json.load(f)
+        context['software_list'] = read_json(software_file)
         return context
 
 
@@ -95,7 +99,14 @@ class IndexView(MysqlMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'MySQL服务'
-        context['installed_list'] = get_installed()
+        installed_list = get_installed()
+        # 一次 sc 查询得到所有实例的服务状态
+        services_status = get_services_status(
+            [item['service_name'] for item in installed_list.values() if item.get('set_service') and item.get('service_name')]
+        )
+        for item in installed_list.values():
+            item['server_status'] = services_status.get(item.get('service_name'), {})
+        context['installed_list'] = installed_list
         return context
 
 
@@ -103,8 +114,7 @@ class VersionListView(MysqlMixin, TemplateView):
     template_name = f'{app_name}/version_list.html'
 
     def get_version_list(self):
-        with open(version_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_json(version_file)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -191,8 +201,7 @@ class VersionsRefreshView(RedirectView):
             def version_key(version_string):
                 return [int(x) for x in version_string.split('.')]
             versions = dict(sorted(versions.items(), key=lambda item: version_key(item[0]), reverse=True))
-            with open(version_file, 'w', encoding='utf-8') as f:
-                json.dump(versions, f, ensure_ascii=False, indent=4)
+            write_json(version_file, versions)
             messages.success(request, '获取 MySQL 列表操作完成~')
 
         return super().get(request, *args, **kwargs)
@@ -260,27 +269,25 @@ class ImportView(MysqlMixin, FormView):
             name = f"MySQL {version}"
 
         unique_id = str(uuid.uuid4())
-        with open(installed_file_path, 'r', encoding='utf-8') as f:
-            installed = json.load(f)
-        installed[unique_id] = {
-            'uuid': unique_id,
-            'version': version,
-            'name': name,
-            'title': name,
-            'install_dir': install_dir,
-            'set_root_password': 2,
-            'config_status': 2,
-            "data_dir": data_dir,
-            "conf_file": config_file,
-            "port": port,
-            "set_service": False,
-            "service_name": '',
-            "service_auto": "",
-        }
-        installed = get_sorted(installed, 'version')
-
-        with open(installed_file_path, 'w', encoding='utf-8') as f:
-            json.dump(installed, f, ensure_ascii=False, indent=4)
+        with get_lock(installed_file_path):
+            installed = read_json(installed_file_path, {})
+            installed[unique_id] = {
+                'uuid': unique_id,
+                'version': version,
+                'name': name,
+                'title': name,
+                'install_dir': install_dir,
+                'set_root_password': 2,
+                'config_status': 2,
+                "data_dir": data_dir,
+                "conf_file": config_file,
+                "port": port,
+                "set_service": False,
+                "service_name": '',
+                "service_auto": "",
+            }
+            installed = get_sorted(installed, 'version')
+            write_json(installed_file_path, installed)
 
         return super().form_valid(form)
         # if os.path.isdir(config_file):
@@ -384,6 +391,11 @@ class AnalyzeConfigView(JsonView):
             'datadir': config.get('mysqld', 'datadir'),
             'port': config.get('mysqld', 'port'),
         }
+        # 使用该配置文件的已有服务
+        return_dict['services'] = [
+            {'name': service['name'], 'display_name': service['display_name'], 'status': service['status']}
+            for service in service_catalog.find_by_defaults_file(config_file)
+        ]
         #
         # import psutil
         # exists_service_list_html = '<div class="radio-item">'
@@ -409,103 +421,122 @@ class AnalyzeConfigView(JsonView):
         return self.render_to_json_success(return_dict)
 
 
+def download_task(job, download_url, local_file_path):
+    """
+    后台任务：分段下载MySQL安装包，未完成的部分保存在 .part 文件中，中断后可以继续下载
+    """
+    job.set_stage('download', '下载MySQL安装包')
+    os.makedirs(app_cache_dir, exist_ok=True)
+    print('开始下载..')
+    result = download(
+        download_url, local_file_path,
+        progress=lambda done, total: job.update(bytes_done=done, bytes_total=total),
+        cancel_check=job.check_cancelled,
+    )
+    print('下载完成...')
+    return {'filename': os.path.basename(local_file_path), 'sha256': result.get('sha256')}
+
+
 class DownloadView(JsonView):
 
     def get(self, request, *args, **kwargs):
-        version_info = get_version(request.GET.get('version'))
+        version = request.GET.get('version')
+        version_info = get_version(version)
         download_url = version_info['download_url']
         filename = version_info['filename']
         local_file_path = os.path.join(app_cache_dir, filename)
 
-        import requests
-        if not os.path.exists(local_file_path):
-            try:
-                print('开始下载..')
-                response = requests.get(download_url, stream=True)
-                response.raise_for_status()
-                os.makedirs(app_cache_dir, exist_ok=True)
-                with open(local_file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                print('下载完成...')
-                return self.render_to_json_success(filename)
-            except Exception as e:
-                return self.render_to_json_error(f'文件下载失败: {e}')
-        else:
+        if os.path.exists(local_file_path):
             return self.render_to_json_success(f'文件{filename}已存在,跳过下载。')
+        job = submit_job(
+            f'{app_name}:download:{version}', f'下载 {filename}', download_task, download_url, local_file_path
+        )
+        return self.render_to_json_job(job)
+
+
+def unzip_task(job, version, version_info, cache_file_path, install_folder, install_dir, install_profile='full'):
+    """
+    后台任务：解压MySQL安装包并写入安装记录，精简安装时按 slim_profile.json 跳过调试和测试文件
+    """
+    from jiefoundation.archive import extract_zip
+    job.set_stage('unzip', f'解压MySQL安装包（{install_profiles.get(install_profile, install_profile)}）')
+
+    exclude = None
+    if install_profile == 'slim':
+        # 压缩包内第一层是 mysql-x.x.x-winx64/ 目录
+        exclude = ['*/' + pattern for pattern in get_slim_exclude(version)]
+
+    def report(files_done, files_total, bytes_done, bytes_total):
+        job.check_cancelled()
+        job.update(files_done=files_done, files_total=files_total, bytes_done=bytes_done, bytes_total=bytes_total)
+
+    try:
+        result = extract_zip(cache_file_path, install_folder, exclude=exclude, progress=report)
+    except JobCancelled:
+        shutil.rmtree(install_dir, ignore_errors=True)
+        raise
+    print(f"解压完成，跳过 {result['skipped_files']} 个文件，节省 {result['skipped_bytes']} 字节，写入json数据...")
+
+    unique_id = str(uuid.uuid4())
+    with get_lock(installed_file_path):
+        installed = read_json(installed_file_path, {})
+        installed[unique_id] = {
+            'uuid': unique_id,
+            'version': version,
+            'name': version_info['name'],
+            'title': version_info['name'],
+            'install_dir': install_dir,
+            'set_root_password': 0,
+            'config_status': 0,
+            "data_dir": install_dir + '-data/data/',
+            "conf_file": install_dir + '-data/my.ini',
+            "port": '',
+            "set_service": True,
+            "service_name": '',
+            "service_auto": "",
+            "install_profile": install_profile,
+            "saved_bytes": result['skipped_bytes'],
+        }
+        installed = get_sorted(installed, 'version')
+        write_json(installed_file_path, installed)
+    return {'id': unique_id, 'saved_bytes': result['skipped_bytes']}
 
 
 class UnzipView(JsonView):
 
     def get(self, request, *args, **kwargs):
         version = request.GET.get('version')
+        job = find_job(f'{app_name}:unzip:{version}')
+        if job:
+            return self.render_to_json_job(job)
         version_info = get_version(version)
         filename = version_info['filename']
         cache_file_path = os.path.join(app_cache_dir, filename)
         if not os.path.exists(cache_file_path):
             return self.render_to_json_error('文件不存在')
-        else:
-            from jiefoundation.utils import extract_from_zip
-            install_folder = get_config()['install_folder']
-            install_dir = install_folder + '/' + os.path.splitext(filename)[0]
-            if os.path.exists(install_dir):
-                return self.render_to_json_error('安装目录已存在~不能重复安装~')
-            extract_from_zip(cache_file_path, extract_to=install_folder)
-            print('解压完成，写入json数据...')
-
-            unique_id = str(uuid.uuid4())
-            with open(installed_file_path, 'r', encoding='utf-8') as f:
-                installed = json.load(f)
-            installed[unique_id] = {
-                'uuid': unique_id,
-                'version': version,
-                'name': version_info['name'],
-                'title': version_info['name'],
-                'install_dir': install_dir,
-                'set_root_password': 0,
-                'config_status': 0,
-                "data_dir": install_dir + '-data/data/',
-                "conf_file": install_dir + '-data/my.ini',
-                "port": '',
-                "set_service": True,
-                "service_name": '',
-                "service_auto": "",
-            }
-
-            installed = get_sorted(installed, 'version')
-
-            with open(installed_file_path, 'w', encoding='utf-8') as f:
-                json.dump(installed, f, ensure_ascii=False, indent=4)
-            return self.render_to_json_response({'status':'success', 'id': unique_id, 'message': '解压成功！'})
+        config = get_config()
+        install_folder = config['install_folder']
+        install_profile = request.GET.get('profile') or config.get('install_profile', 'full')
+        if install_profile not in install_profiles:
+            return self.render_to_json_error('安装方式错误~')
+        install_dir = install_folder + '/' + os.path.splitext(filename)[0]
+        if os.path.exists(install_dir):
+            return self.render_to_json_error('安装目录已存在~不能重复安装~')
+        job = submit_job(
+            f'{app_name}:unzip:{version}', f'解压 {filename}', unzip_task,
+            version, version_info, cache_file_path, install_folder, install_dir, install_profile
+        )
+        return self.render_to_json_job(job)
 
 
 class CheckPortView(JsonView):
     def get(self, request, *args, **kwargs):
-        base_port = new_port = int(request.GET.get('port'))
-        installed_ports = []
-        installed_list = get_installed()
-        for item in installed_list.values():
-            installed_ports.append(item['port'])
-        is_new = 0
-
-        while True:
-            port = find_available_port(new_port)
-            if port not in installed_ports:
-                import socket
-                try:
-                    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    result = sock.connect_ex(('127.0.0.1', port))
-                    sock.close()
-                    if result != 0:
-                        new_port = port
-                        break
-                except:
-                    new_port = port
-                    break
-            is_new = 1
-            new_port = port + 1
+        base_port = int(request.GET.get('port'))
+        install_id = request.GET.get('id')
+        owner = f'{app_name}:{install_id}' if install_id else None
+        new_port = port_allocator.allocate(base_port, owner=owner)[0]
         message = f'端口{base_port}可用！'
-        if is_new:
+        if new_port != base_port:
             message = f'端口 {base_port} 已被占用，自动选择新端口 {new_port} ！'
         return self.render_to_json_response({
             'status': 'success',
@@ -523,6 +554,99 @@ class CheckServernameView(JsonView):
             return self.render_to_json_success('服务名可以使用！')
 
 
+def initialize_task(job, id, port, set_service, service_name, service_auto):
+    """
+    后台任务：生成 my.ini、初始化数据库并按需创建服务
+    """
+    install_info = get_installed(id)
+    job.set_stage('config', '创建配置文件')
+    print('创建 my.ini 文件')
+    install_info['port'] = port
+    import configparser
+    config_dir = os.path.dirname(install_info['conf_file'])
+    os.makedirs(config_dir, exist_ok=True)
+
+    config = configparser.ConfigParser()
+    config['mysqld'] = {
+        'port': str(port),
+        'basedir': install_info['install_dir'],
+        'datadir': install_info['data_dir'],
+        'character-set-server': 'utf8mb4',
+        'default-storage-engine': 'INNODB',
+    }
+    config['mysql'] = {
+        'default-character-set': 'utf8mb4'
+    }
+    config['client'] = {
+        'port': str(port),
+        'default-character-set': 'utf8mb4'
+    }
+    with open(install_info['conf_file'], 'w', encoding='utf-8') as configfile:
+        config.write(configfile)
+    print(f"MySQL配置文件已创建: {install_info['conf_file']}")
+
+    job.set_stage('initialize', '初始化数据库')
+    print(f"开始初始化数据库...")
+    # runt_mysqld = f'{install_info['install_dir']}/bin/mysqld.exe'
+    # parameters = f'--defaults-file={install_info['conf_file']} --initialize-insecure'
+    # print(runt_mysqld + ' ' + parameters)
+    # windows_api(runt_mysqld, parameters, operation="runas")
+    run_file = f'{install_info['install_dir']}/bin/mysqld.exe --defaults-file={install_info['conf_file']} --initialize-insecure'
+    print(run_file)
+    result = run_command(run_file, shell=True, cwd=install_info['install_dir'])
+    if result.returncode != 0:
+        raise RuntimeError(f'初始化数据库失败！错误内容{result.stderr}')
+    # print(f"数据库初始化完成")
+
+    install_info['set_service'] = set_service
+    install_info['service_name'] = service_name
+    install_info['service_auto'] = service_auto
+
+    if set_service:
+        job.set_stage('service', '创建Windows服务')
+        # 创建服务
+        print(f"开始创建服务: {service_name}")
+
+        try:
+            windows_api_blocking(
+                executable=f'{install_info['install_dir']}/bin/mysqld.exe',
+                parameters=f'--install "{service_name}" --defaults-file={install_info['conf_file']}',
+                operation="runas",
+            )
+            windows_api_blocking(
+                executable='sc',
+                parameters=f'description "{service_name}" "{install_info['name']} 服务"',
+                operation="runas",
+            )
+
+        except Exception as e:
+            print(f'创建服务失败！{e}')
+        if service_auto:
+            print(f"设置服务自动启动: {service_name}")
+            if service_auto:
+                auto_str = 'auto'
+            else:
+                auto_str = 'demand'
+            windows_api_blocking(
+                executable='sc',
+                parameters=f'config "{service_name}" start={auto_str}',
+                operation="runas",
+            )
+            print('尝试立即启动服务。。。')
+            windows_api_blocking(
+                executable='sc',
+                parameters=f'start "{service_name}"',
+                operation="runas",
+            )
+            print(f"服务启动完成: {service_name}")
+        print(f"服务创建完成: {service_name}")
+        invalidate_services()
+    install_info['config_status'] = 1
+    with update_json(installed_file_path, {}) as installed_list:
+        installed_list[id] = install_info
+    return {'id': id}
+
+
 class InitializeView(MysqlMixin, FormView):
     template_name = 'db_mysql/initialize.html'
     form_class = InitializeForm
@@ -531,7 +655,7 @@ class InitializeView(MysqlMixin, FormView):
         initial = super().get_initial()
         initial['install_id'] = self.request.GET.get('id')
         install_info =  get_installed(initial['install_id'])
-        initial['port'] = find_available_port(3306)
+        initial['port'] = port_allocator.allocate(3306, owner=f"{app_name}:{initial['install_id']}")[0]
         initial['set_service'] = True
         initial['service_name'] = f'MySQL{install_info['version'].replace('.', '')}'
         initial['service_auto'] = True
@@ -553,6 +677,10 @@ class InitializeView(MysqlMixin, FormView):
             },
         ]
         context['install_info'] = get_installed(self.request.GET.get('id'))
+        if 'job' not in context:
+            # 刷新页面时找回正在执行的初始化任务
+            context['job'] = find_job(f'{app_name}:initialize:{self.request.GET.get("id")}')
+        context['success_url'] = self.get_success_url()
         return context
 
     def get_success_url(self):
@@ -565,14 +693,8 @@ class InitializeView(MysqlMixin, FormView):
         service_auto = form.cleaned_data.get('service_auto')
         service_name = form.cleaned_data.get('service_name')
 
-        from panelcore.helper import is_port_available
-        installed_ports = []
-        installed_list = get_installed()
-        for item in installed_list.values():
-            installed_ports.append(item['port'])
-
         check_error = 0
-        if not is_port_available(port) or port in installed_ports:
+        if not port_allocator.is_available(port, owner=f'{app_name}:{id}'):
             form.add_error('port', '端口被占用！请选择其他端口~')
             check_error = 1
         if set_service:
@@ -588,92 +710,14 @@ class InitializeView(MysqlMixin, FormView):
         if not install_info:
             messages.error(self.request, '安装信息不存在！请勿修改链接或从非法地址进入~')
             return self.form_invalid(form)
-        print('创建 my.ini 文件')
-        install_info['port'] = port
-        import configparser
-        config_dir = os.path.dirname(install_info['conf_file'])
-        os.makedirs(config_dir, exist_ok=True)
-
-        config = configparser.ConfigParser()
-        config['mysqld'] = {
-            'port': str(port),
-            'basedir': install_info['install_dir'],
-            'datadir': install_info['data_dir'],
-            'character-set-server': 'utf8mb4',
-            'default-storage-engine': 'INNODB',
-        }
-        config['mysql'] = {
-            'default-character-set': 'utf8mb4'
-        }
-        config['client'] = {
-            'port': str(port),
-            'default-character-set': 'utf8mb4'
-        }
-        with open(install_info['conf_file'], 'w', encoding='utf-8') as configfile:
-            config.write(configfile)
-        print(f"MySQL配置文件已创建: {install_info['conf_file']}")
-
-        print(f"开始初始化数据库...")
-        # runt_mysqld = f'{install_info['install_dir']}/bin/mysqld.exe'
-        # parameters = f'--defaults-file={install_info['conf_file']} --initialize-insecure'
-        # print(runt_mysqld + ' ' + parameters)
-        # windows_api(runt_mysqld, parameters, operation="runas")
-        run_file = f'{install_info['install_dir']}/bin/mysqld.exe --defaults-file={install_info['conf_file']} --initialize-insecure'
-        print(run_file)
-        result = run_command(run_file, shell=True, cwd=install_info['install_dir'])
-        if result.returncode != 0:
-            messages.error(self.request, f'初始化数据库失败！错误内容{result.stderr}')
-            return self.form_invalid(form)
-        # print(f"数据库初始化完成")
-
-        install_info['set_service'] = set_service
-        install_info['service_name'] = service_name
-        install_info['service_auto'] = service_auto
-
-        if set_service:
-            # 创建服务
-            print(f"开始创建服务: {service_name}")
-
-            try:
-                windows_api_blocking(
-                    executable=f'{install_info['install_dir']}/bin/mysqld.exe',
-                    parameters=f'--install "{service_name}" --defaults-file={install_info['conf_file']}',
-                    operation="runas",
-                )
-                windows_api_blocking(
-                    executable='sc',
-                    parameters=f'description "{service_name}" "{install_info['name']} 服务"',
-                    operation="runas",
-                )
-
-            except Exception as e:
-                print(f'创建服务失败！{e}')
-            if service_auto:
-                print(f"设置服务自动启动: {service_name}")
-                if service_auto:
-                    auto_str = 'auto'
-                else:
-                    auto_str = 'demand'
-                windows_api_blocking(
-                    executable='sc',
-                    parameters=f'config "{service_name}" start={auto_str}',
-                    operation="runas",
-                )
-                print('尝试立即启动服务。。。')
-                windows_api_blocking(
-                    executable='sc',
-                    parameters=f'start "{service_name}"',
-                    operation="runas",
-                )
-                print(f"服务启动完成: {service_name}")
-            print(f"服务创建完成: {service_name}")
-        install_info['config_status'] = 1
-        installed_list[id] = install_info
 
-        with open(installed_file_path, 'w', encoding='utf-8') as f:
-            json.dump(installed_list, f, ensure_ascii=False, indent=4)
+        port_allocator.reserve(port, owner=f'{app_name}:{id}')
+        job = submit_job(
+            f'{app_name}:initialize:{id}', f'初始化 {install_info["name"]}', initialize_task,
+            id, port, set_service, service_name, service_auto
+        )
+        return self.render_to_response(self.get_context_data(form=form, job=job))
 
-        return super().form_valid(form)
 
 
 class ServerDetailView(MysqlMixin, TemplateView):
@@ -729,6 +773,7 @@ class UninstallView(RedirectView):
                 operation="runas",
             )
             print(f"服务删除完成: {install_info['service_name']}")
+            invalidate_services()
 
             # time.sleep(3)
         # 删除安装文件夹
@@ -743,10 +788,8 @@ class UninstallView(RedirectView):
             shutil.rmtree(install_info['install_dir'])
             print('安装文件夹删除完成。。')
 
-        install_list = get_installed()
-        install_list.pop(id)
-        with open(installed_file_path, 'w', encoding='utf-8') as f:
-            json.dump(install_list, f, ensure_ascii=False, indent=4)
+        with update_json(installed_file_path, {}) as install_list:
+            install_list.pop(id, None)
 
         print('卸载完成')
         return super().get(request, *args, **kwargs)
@@ -775,6 +818,7 @@ class StatusActionView(JsonView):
                 windows_api_blocking(executable='sc', parameters=f'start "{service_name}"', operation="runas")
             else:
                 windows_api_blocking(executable='sc', parameters=f'{action} "{service_name}"', operation="runas")
+            invalidate_services()
             return self.render_to_json_success(f'服务操作完成: {service_name} {valid_actions[action]}')
         except Exception as e:
             return self.render_to_json_error(f'执行服务操作时发生异常: {str(e)}')
@@ -818,10 +862,8 @@ class InitRootPasswordView(MysqlMixin, FormView):
             cwd=install_info['install_dir']
         )
         if result.returncode == 0:
-            install_info['set_root_password'] = 1
-            installed_list[id] = install_info
-            with open(installed_file_path, 'w', encoding='utf-8') as f:
-                json.dump(installed_list, f, ensure_ascii=False, indent=4)
+            with update_json(installed_file_path, {}) as installed_list:
+                installed_list[id]['set_root_password'] = 1
             messages.success(self.request, '初始化root密码完成！')
         else:
             messages.error(self.request, f'初始化root密码失败！错误信息:{result.stderr}')
@@ -975,27 +1017,10 @@ class ImportServiceView(MysqlMixin, FormView):
         context['have_service'] = False
         context['system_service'] = []
         context['default_service_name'] = f'MySQL{install_info["version"].replace('.', '')}'
-        i = 1
-        is_select = False
-        for service in psutil.win_service_iter():
-            try:
-                service_info = service.as_dict()
-                binpath = service_info.get('binpath')
-                if install_info['conf_file'] in binpath:
-                    context['have_service'] = True
-                    if i == 1: is_select  = True
-                    context['system_service'].append({
-                        'name': service_info.get('name'),
-                        'display_name': service_info.get('display_name'),
-                        'start_type': service_info.get('start_type'),
-                        'status': service_info.get('status'),
-                        'description': service_info.get('description'),
-                        'binpath': service_info.get('binpath'),
-                        'is_select': is_select
-                    })
-                    i = i + 1
-            except Exception as e:
-                continue
+        for service in service_catalog.find_by_defaults_file(install_info['conf_file']):
+            service['is_select'] = not context['system_service']
+            context['have_service'] = True
+            context['system_service'].append(service)
         return context
 
     def get_success_url(self):
@@ -1025,15 +1050,10 @@ class ImportServiceView(MysqlMixin, FormView):
             service_name = ''
             service_auto = False
 
-        with open(installed_file_path, 'r+', encoding='utf-8') as f:
-            installed_data = json.load(f)
-
-        installed_data[id]['set_service'] = set_service
-        installed_data[id]['service_name'] = service_name
-        installed_data[id]['service_auto'] = service_auto
-        installed_data[id]['config_status'] = config_status
-
-        with open(installed_file_path, 'w', encoding='utf-8') as f:
-            json.dump(installed_data, f, ensure_ascii=False, indent=4)
+        with update_json(installed_file_path, {}) as installed_data:
+            installed_data[id]['set_service'] = set_service
+            installed_data[id]['service_name'] = service_name
+            installed_data[id]['service_auto'] = service_auto
+            installed_data[id]['config_status'] = config_status
 
         return super().form_valid(form)
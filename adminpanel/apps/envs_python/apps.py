@@ -4,4 +4,13 @@ from django.apps import AppConfig
 class EnvsPythonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.envs_python'
-    verbose_name = 'Python环境管理基础组件'
\ No newline at end of file
+    verbose_name = 'Python环境管理基础组件'
+
+    def ready(self):
+        from .pypiproxy import restore_user_index
+
+        # 迁移：旧版本写入 pip 配置文件的本地代理地址在面板停止后会让 pip 失败
+        try:
+            restore_user_index()
+        except OSError as e:
+            print(f'检查 pip 配置文件失败: {e}')
\ No newline at end of file
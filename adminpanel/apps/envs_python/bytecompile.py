@@ -0,0 +1,140 @@
+"""
+字节码预编译
+
+解压的运行环境没有 .pyc，每个模块第一次导入时才编译，目录没有写权限时每次运行都要重新编译。
+安装完成后用目标解释器的 compileall 预先编译：
+- 源文件按数量分片，多个 python -m compileall -i - 进程并行编译，每完成一个分片更新一次进度；
+- 跳过 test、tests、idle_test 等测试目录，已有不旧于源文件的 .pyc 的文件不再交给 compileall；
+- 返回文件数、失败数和用时；
+- Python 2 不预编译：.pyc 写在源文件旁边（没有 __pycache__），py_compile 会原地改写已有的 .pyc，
+  按模板创建的环境中这些文件是与模板共享的硬链接。
+"""
+import math
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+SKIP_DIRS = {'test', 'tests', 'idle_test', '__pycache__'}
+COMPILE_WORKERS = min(os.cpu_count() or 2, 8)
+# 每个分片至少包含的文件数，避免启动解释器的开销超过编译本身
+MIN_SHARD_SIZE = 100
+
+
+def cache_tag(python_path=None, version=None):
+    """
+    .pyc 文件名中的解释器标记，如 cpython-312
+
+    :param version: 版本号，如 3.12.1，不传时通过助手进程获取
+    :return: Python 2 返回 None，参见 supports_version()
+    """
+    if version is None:
+        from jiefoundation.pyworker import interpreter_version
+        version = interpreter_version(python_path)
+    if not supports_version(version):
+        return None
+    major, minor = version.split('.')[:2]
+    return f'cpython-{major}{minor}'
+
+
+def supports_version(version):
+    """是否预编译该版本，只预编译 Python 3"""
+    return int(version.split('.')[0]) >= 3
+
+
+def site_packages_dirs(python_path):
+    """解释器的 site-packages 目录"""
+    from jiefoundation.pyworker import worker_pool
+
+    return [path for path in worker_pool.call(python_path, 'sys_path')
+            if os.path.basename(path).lower() == 'site-packages' and os.path.isdir(path)]
+
+
+def collect_sources(paths, tag):
+    """
+    需要编译的源文件
+
+    :return: (源文件列表, 已是最新的文件数)
+    """
+    sources = []
+    up_to_date = 0
+    for path in paths:
+        for root, dirs, files in os.walk(path):
+            dirs[:] = [name for name in dirs if name.lower() not in SKIP_DIRS]
+            compiled = {}
+            try:
+                for entry in os.scandir(os.path.join(root, '__pycache__')):
+                    compiled[entry.name] = entry.stat().st_mtime
+            except OSError:
+                pass
+            for filename in files:
+                if not filename.endswith('.py'):
+                    continue
+                source = os.path.join(root, filename)
+                pyc_mtime = compiled.get(f'{filename[:-3]}.{tag}.pyc')
+                try:
+                    if pyc_mtime is not None and pyc_mtime >= os.stat(source).st_mtime:
+                        up_to_date += 1
+                        continue
+                except OSError:
+                    continue
+                sources.append(source)
+    return sources, up_to_date
+
+
+def _compile_shard(python_path, files):
+    """
+    在一个 compileall 进程中编译一组文件
+
+    :return: 编译出错的输出行
+    """
+    kwargs = {}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+    result = subprocess.run(
+        [str(python_path), '-m', 'compileall', '-q', '-i', '-'],
+        input='\n'.join(files) + '\n', capture_output=True, text=True, encoding='utf-8', errors='replace',
+        env=dict(os.environ, PYTHONIOENCODING='utf-8'), **kwargs
+    )
+    return [line for line in (result.stdout + result.stderr).splitlines() if line.startswith('***')]
+
+
+def compile_task(job, python_path, paths, tag=None):
+    """
+    后台任务：并行预编译目录下的 .py 文件
+
+    :param paths: 要编译的目录列表
+    :param tag: 解释器标记，参见 cache_tag()
+    :return: {'files': 编译的文件数, 'skipped': 已是最新的文件数, 'errors': 失败数, 'seconds': 用时}
+    """
+    start = time.time()
+    job.set_stage('compile', '预编译字节码')
+    tag = tag or cache_tag(python_path)
+    if tag is None:
+        job.update('Python 2 不预编译字节码~')
+        return {'files': 0, 'skipped': 0, 'errors': 0, 'seconds': 0}
+    sources, up_to_date = collect_sources(paths, tag)
+    errors = []
+    if sources:
+        shard_size = max(MIN_SHARD_SIZE, math.ceil(len(sources) / (COMPILE_WORKERS * 4)))
+        shards = [sources[i:i + shard_size] for i in range(0, len(sources), shard_size)]
+        files_done = 0
+        job.update(files_done=0, files_total=len(sources))
+        with ThreadPoolExecutor(max_workers=COMPILE_WORKERS, thread_name_prefix='jiecompile') as executor:
+            futures = {executor.submit(_compile_shard, python_path, shard): len(shard) for shard in shards}
+            for future in as_completed(futures):
+                for line in future.result():
+                    errors.append(line)
+                    job.log(line)
+                files_done += futures[future]
+                job.update(files_done=files_done, files_total=len(sources))
+                if job.cancelled:
+                    for pending in futures:
+                        pending.cancel()
+                    job.check_cancelled()
+    seconds = round(time.time() - start, 2)
+    message = f'预编译 {len(sources)} 个文件（{up_to_date} 个已是最新），失败 {len(errors)} 个，用时 {seconds} 秒'
+    print(message)
+    job.update(message)
+    return {'files': len(sources), 'skipped': up_to_date, 'errors': len(errors), 'seconds': seconds}
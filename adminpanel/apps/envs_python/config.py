@@ -4,7 +4,13 @@ from django.conf import settings
 
 app_base_path = Path(__file__).resolve().parent
 pypi_json = app_base_path / 'data' / 'pypi.json'
+app_cache_dir = app_base_path / 'cache'
+pypi_cache_json = app_cache_dir / 'pypi_cache.json'
+name_index_json = app_cache_dir / 'name_index.json'
 
 project_python_path = settings.PYTHON_ROOT / 'python.exe'
 tools_pip_path = settings.PYTHON_ROOT / 'Scripts' / 'pip.exe'
 
+proxy_cache_dir = app_cache_dir / 'proxy'
+proxy_config_json = app_cache_dir / 'proxy.json'
+wheelhouse_dir = app_cache_dir / 'wheelhouse'
@@ -0,0 +1,192 @@
+"""
+依赖关系图
+
+读取已安装包元数据中的 Requires-Dist（egg-info 为 requires.txt），按目标解释器的环境标记计算条件，
+得到每个包依赖的包和被哪些包依赖，并检查缺少的依赖和版本不满足的依赖，效果同 pip check，但不启动子进程。
+
+- 环境标记值来自 inventory 中获取 site-packages 时的同一次探测；
+- 依赖的 extras（如 requests[socks]）会启用对应包中 extra == 'socks' 的依赖；
+- 结果按 site-packages 目录的修改时间缓存，安装/卸载包后重新生成。
+"""
+import os
+import threading
+
+try:
+    from packaging.markers import InvalidMarker, UndefinedEnvironmentName
+    from packaging.requirements import Requirement, InvalidRequirement
+except ImportError:
+    from pip._vendor.packaging.markers import InvalidMarker, UndefinedEnvironmentName
+    from pip._vendor.packaging.requirements import Requirement, InvalidRequirement
+
+from .inventory import (scan_packages, canonicalize_name, get_marker_environment, get_site_signature,
+                        _python_key)
+
+_graph_cache = {}
+_requires_cache = {}
+_lock = threading.Lock()
+
+
+def _read_requires_dist(metadata_file):
+    """METADATA / PKG-INFO 头部中的全部 Requires-Dist"""
+    requires = []
+    with open(metadata_file, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line:
+                break
+            if line.startswith('Requires-Dist:'):
+                requires.append(line.split(':', 1)[1].strip())
+    return requires
+
+
+def _read_requires_txt(path):
+    """
+    egg-info 的 requires.txt，[extra:marker] 段转换为 Requires-Dist 的写法
+    """
+    requires = []
+    section_marker = ''
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return requires
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('[') and line.endswith(']'):
+            extra, _, marker = line[1:-1].partition(':')
+            conditions = []
+            if extra:
+                conditions.append(f'extra == "{extra}"')
+            if marker:
+                conditions.append(f'({marker})')
+            section_marker = ' and '.join(conditions)
+            continue
+        requires.append(f'{line}; {section_marker}' if section_marker else line)
+    return requires
+
+
+def read_requirements(metadata_path):
+    """
+    读取一个包声明的依赖，按元数据目录的修改时间缓存
+
+    :return: 解析后的 Requirement 列表，无法解析的行被忽略
+    """
+    try:
+        signature = os.stat(metadata_path).st_mtime_ns
+    except OSError:
+        return []
+    cached = _requires_cache.get(metadata_path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    if metadata_path.endswith('.dist-info'):
+        lines = _read_requires_dist(os.path.join(metadata_path, 'METADATA'))
+    elif os.path.isdir(metadata_path):
+        lines = _read_requires_txt(os.path.join(metadata_path, 'requires.txt'))
+    else:
+        lines = _read_requires_dist(metadata_path)
+    requirements = []
+    for line in lines:
+        try:
+            requirements.append(Requirement(line))
+        except InvalidRequirement as e:
+            print(f'无法解析 {metadata_path} 中的依赖 {line}: {e}')
+    _requires_cache[metadata_path] = (signature, requirements)
+    return requirements
+
+
+def _marker_matches(requirement, environment, extra):
+    if requirement.marker is None:
+        return True
+    try:
+        return requirement.marker.evaluate(dict(environment, extra=extra))
+    except (InvalidMarker, UndefinedEnvironmentName):
+        return False
+
+
+def build_graph(packages, environment):
+    """
+    生成依赖关系图
+
+    :param packages: inventory.scan_packages 的返回值
+    :param environment: 环境标记值，参见 inventory.get_marker_environment
+    :return: {
+        'packages': {规范化包名: {'name', 'version', 'requires': [...], 'required_by': [...]}},
+        'problems': [{'package', 'requirement', 'dependency', 'installed', 'type': 'missing' / 'conflict'}]
+    }
+    """
+    nodes = {}
+    for name, package in packages.items():
+        nodes[canonicalize_name(name)] = {
+            'name': name,
+            'version': package['current_version'],
+            'requires': [],
+            'required_by': [],
+            '_requirements': read_requirements(package['metadata_path']),
+        }
+
+    # 从未指定 extras 的依赖开始，被依赖时要求的 extras 加入后再次计算，直到不再变化
+    active_extras = {key: {''} for key in nodes}
+    pending = list(nodes)
+    edges = {}
+    while pending:
+        key = pending.pop()
+        node = nodes[key]
+        for requirement in node['_requirements']:
+            if not any(_marker_matches(requirement, environment, extra) for extra in active_extras[key]):
+                continue
+            dependency = canonicalize_name(requirement.name)
+            edges[(key, dependency, str(requirement))] = requirement
+            if dependency in nodes:
+                new_extras = {canonicalize_name(extra) for extra in requirement.extras} - active_extras[dependency]
+                if new_extras:
+                    active_extras[dependency] |= new_extras
+                    pending.append(dependency)
+
+    problems = []
+    for (key, dependency, text), requirement in sorted(edges.items(), key=lambda item: item[0]):
+        node = nodes[key]
+        target = nodes.get(dependency)
+        specifier = str(requirement.specifier)
+        ok = True
+        if target is None:
+            ok = False
+            problems.append({'package': node['name'], 'requirement': text, 'dependency': requirement.name,
+                             'installed': '', 'type': 'missing'})
+        elif specifier and not requirement.specifier.contains(target['version'], prereleases=True):
+            ok = False
+            problems.append({'package': node['name'], 'requirement': text, 'dependency': target['name'],
+                             'installed': target['version'], 'type': 'conflict'})
+        node['requires'].append({
+            'name': target['name'] if target else requirement.name,
+            'specifier': specifier,
+            'extras': sorted(requirement.extras),
+            'installed': target['version'] if target else '',
+            'ok': ok,
+        })
+        if target is not None:
+            target['required_by'].append({'name': node['name'], 'specifier': specifier, 'ok': ok})
+
+    for node in nodes.values():
+        del node['_requirements']
+        node['required_by'].sort(key=lambda item: item['name'].lower())
+    return {'packages': nodes, 'problems': problems}
+
+
+def get_dependency_graph(python_path):
+    """
+    获取环境的依赖关系图，site-packages 未变化时直接返回缓存
+
+    :return: 参见 build_graph
+    """
+    key = _python_key(python_path)
+    signature = get_site_signature(python_path)
+    with _lock:
+        cached = _graph_cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+    graph = build_graph(scan_packages(python_path), get_marker_environment(python_path))
+    with _lock:
+        _graph_cache[key] = (signature, graph)
+    return graph
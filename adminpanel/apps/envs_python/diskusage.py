@@ -0,0 +1,179 @@
+"""
+包占用空间统计
+
+按 dist-info 中 RECORD 列出的文件逐个 os.stat 得到实际大小（RECORD 中的大小列不包含安装后生成的文件），
+并统计对应目录下 __pycache__ 的占用；没有 RECORD 的 egg-info 使用 installed-files.txt，
+都没有时按 top_level.txt 遍历包目录。
+
+- 各个包在线程池中并发统计，os.stat 期间会释放 GIL；
+- 结果按（元数据目录, 修改时间）缓存，重新安装或升级后才重新统计。
+"""
+import csv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .inventory import scan_packages
+
+USAGE_WORKERS = 16
+
+_usage_cache = {}
+_lock = threading.Lock()
+
+
+def _record_files(metadata_path):
+    """
+    包安装的文件的绝对路径
+
+    :return: 文件路径列表，没有文件清单时返回 None
+    """
+    if metadata_path.endswith('.dist-info'):
+        record_file = os.path.join(metadata_path, 'RECORD')
+        base = os.path.dirname(metadata_path)
+        if not os.path.exists(record_file):
+            return None
+        with open(record_file, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            return [os.path.normpath(os.path.join(base, row[0])) for row in csv.reader(f) if row and row[0]]
+    if os.path.isdir(metadata_path):
+        installed_file = os.path.join(metadata_path, 'installed-files.txt')
+        if os.path.exists(installed_file):
+            with open(installed_file, 'r', encoding='utf-8', errors='replace') as f:
+                return [os.path.normpath(os.path.join(metadata_path, line.strip())) for line in f if line.strip()]
+    return None
+
+
+def _walk_size(path):
+    """遍历目录的大小，返回 (总大小, __pycache__ 大小, 文件数)"""
+    size = pycache = count = 0
+    stack = [(path, False)]
+    while stack:
+        folder, in_pycache = stack.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, in_pycache or entry.name == '__pycache__'))
+                elif entry.is_file(follow_symlinks=False):
+                    file_size = entry.stat(follow_symlinks=False).st_size
+                    size += file_size
+                    count += 1
+                    if in_pycache:
+                        pycache += file_size
+            except OSError:
+                continue
+    return size, pycache, count
+
+
+def _top_level_paths(metadata_path):
+    """egg-info 的 top_level.txt 列出的包目录或模块"""
+    top_level = os.path.join(metadata_path, 'top_level.txt')
+    base = os.path.dirname(metadata_path)
+    paths = [metadata_path]
+    if os.path.exists(top_level):
+        with open(top_level, 'r', encoding='utf-8', errors='replace') as f:
+            for name in f.read().split():
+                for candidate in (os.path.join(base, name), os.path.join(base, name + '.py')):
+                    if os.path.exists(candidate):
+                        paths.append(candidate)
+    return paths
+
+
+def measure_distribution(metadata_path):
+    """
+    统计一个包的占用空间
+
+    :return: {'size': 总大小（包含 __pycache__）, 'pycache': __pycache__ 大小, 'files': 文件数}
+    """
+    files = _record_files(metadata_path)
+    if files is None:
+        size = pycache = count = 0
+        for path in _top_level_paths(metadata_path):
+            if os.path.isdir(path):
+                path_size, path_pycache, path_count = _walk_size(path)
+            else:
+                try:
+                    path_size, path_pycache, path_count = os.stat(path).st_size, 0, 1
+                except OSError:
+                    continue
+            size += path_size
+            pycache += path_pycache
+            count += path_count
+        return {'size': size, 'pycache': pycache, 'files': count}
+
+    size = pycache = count = 0
+    seen = set()
+    source_folders = set()
+    for path in files:
+        key = os.path.normcase(path)
+        if key in seen:
+            continue
+        seen.add(key)
+        try:
+            file_size = os.stat(path).st_size
+        except OSError:
+            continue
+        size += file_size
+        count += 1
+        folder = os.path.dirname(path)
+        if os.path.basename(folder) == '__pycache__':
+            pycache += file_size
+        elif path.endswith('.py'):
+            source_folders.add(folder)
+
+    # 运行时生成、不在 RECORD 中的 .pyc
+    for folder in source_folders:
+        try:
+            entries = list(os.scandir(os.path.join(folder, '__pycache__')))
+        except OSError:
+            continue
+        for entry in entries:
+            if os.path.normcase(entry.path) in seen:
+                continue
+            try:
+                file_size = entry.stat().st_size
+            except OSError:
+                continue
+            size += file_size
+            pycache += file_size
+            count += 1
+    return {'size': size, 'pycache': pycache, 'files': count}
+
+
+def _cached_measure(metadata_path):
+    try:
+        signature = os.stat(metadata_path).st_mtime_ns
+    except OSError:
+        return {'size': 0, 'pycache': 0, 'files': 0}
+    with _lock:
+        cached = _usage_cache.get(metadata_path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    try:
+        usage = measure_distribution(metadata_path)
+    except OSError as e:
+        print(f'统计 {metadata_path} 占用空间失败: {e}')
+        usage = {'size': 0, 'pycache': 0, 'files': 0}
+    with _lock:
+        _usage_cache[metadata_path] = (signature, usage)
+    return usage
+
+
+def environment_usage(python_path):
+    """
+    统计环境中所有包的占用空间
+
+    :return: {'packages': {包名: {'size', 'pycache', 'files'}}, 'total': 总大小, 'pycache': __pycache__ 总大小}
+    """
+    packages = scan_packages(python_path)
+    names = list(packages)
+    with ThreadPoolExecutor(max_workers=USAGE_WORKERS, thread_name_prefix='jieusage') as executor:
+        usages = list(executor.map(_cached_measure, [packages[name]['metadata_path'] for name in names]))
+    result = dict(zip(names, usages))
+    return {
+        'packages': result,
+        'total': sum(usage['size'] for usage in usages),
+        'pycache': sum(usage['pycache'] for usage in usages),
+    }
@@ -1,3 +1,5 @@
+import os
+
 from django import forms
 from jiefoundation.forms import FormBase
 
@@ -8,7 +10,10 @@ class PackageInstallForm(FormBase):
     """
     package_name = forms.CharField(
         label="包名",
-        widget=forms.TextInput(attrs={'class': 'form-control', 'lay-verify': 'required', 'lay-reqtext':'请输入包名~'})
+        widget=forms.TextInput(attrs={
+            'class': 'form-control', 'lay-verify': 'required', 'lay-reqtext':'请输入包名~',
+            'list': 'package_suggest', 'autocomplete': 'off',
+        })
     )
     package_version = forms.CharField(
         label="版本",
@@ -18,6 +23,12 @@ class PackageInstallForm(FormBase):
             choices=(('latest', '自动适配版本'),)
         ),
     )
+    compile_pyc = forms.BooleanField(
+        label="安装后在后台并行预编译 .pyc",
+        required=False,
+        initial=True,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
 
 class PackagePipExportForm(FormBase):
     """
@@ -26,4 +37,32 @@ class PackagePipExportForm(FormBase):
     save_path = forms.CharField(
         label="保存路径",
         widget=forms.TextInput(attrs={'class': 'form-control', 'lay-verify': 'required', 'lay-reqtext':'请选择保存路径~'})
-    )
\ No newline at end of file
+    )
+    with_hashes = forms.BooleanField(
+        label="附带摘要（--hash）",
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    def clean_save_path(self):
+        save_path = self.cleaned_data.get('save_path')
+        folder = save_path if os.path.isdir(save_path) else os.path.dirname(save_path)
+        if not folder or not os.path.isdir(folder):
+            raise forms.ValidationError('保存目录不存在~')
+        return save_path
+
+
+class PackageRequirementsImportForm(FormBase):
+    """
+    requirements 导入表单
+    """
+    requirements_file = forms.CharField(
+        label="requirements文件",
+        widget=forms.TextInput(attrs={'class': 'form-control', 'lay-verify': 'required', 'lay-reqtext':'请选择requirements文件~'})
+    )
+
+    def clean_requirements_file(self):
+        requirements_file = self.cleaned_data.get('requirements_file')
+        if not os.path.isfile(requirements_file):
+            raise forms.ValidationError('requirements文件不存在~')
+        return requirements_file
\ No newline at end of file
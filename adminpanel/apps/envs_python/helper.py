@@ -1,16 +1,24 @@
 import os
-import json
 from jiefoundation.utils import run_command, ensure_path_end_separator
 from panelcore.helper import get_reg_user_env
+from jiefoundation.jsonstore import read_json
 
-from .config import project_python_path, pypi_json
+from .config import pypi_json
 
 def get_default_pypi():
-    result = run_command(f"{project_python_path} -m pip config get global.index-url")
-    if result.returncode == 1:
-        return "https://pypi.org/simple"
-    else:
-        return result.stdout.strip()
+    """
+    当前生效的 PyPI 索引地址，直接读取 pip 配置文件，参见 pipconfig.PipConfig
+    """
+    from .pipconfig import get_index_url
+    return get_index_url()
+
+
+def get_query_pypi():
+    """
+    面板查询版本、包名时使用的索引地址，默认索引是本地缓存代理时直接访问代理的上游
+    """
+    from .pypiproxy import upstream_of
+    return upstream_of(get_default_pypi())
 
 
 def get_pypi_list(pypi_name=None):
@@ -25,21 +33,19 @@ def get_pypi_list(pypi_name=None):
               否则返回包含所有包信息的字典
     """
     default_pypi = get_default_pypi()
-    pypi_list = {}
-    with open(pypi_json, 'r', encoding='utf-8') as f:
-        pypi_list = json.load(f)
-        for name, pypi in pypi_list.items():
-            if pypi['url'] == default_pypi:
-                is_default = True
-            else:
-                is_default = False
-            pypi_list[name] = {
-                'title': pypi['title'],
-                'url': pypi['url'],
-                'is_default': is_default,
-            }
-            if pypi_name == name:
-                return pypi_list[name]
+    pypi_list = read_json(pypi_json)
+    for name, pypi in pypi_list.items():
+        if pypi['url'].rstrip('/') == default_pypi:
+            is_default = True
+        else:
+            is_default = False
+        pypi_list[name] = {
+            'title': pypi['title'],
+            'url': pypi['url'],
+            'is_default': is_default,
+        }
+        if pypi_name == name:
+            return pypi_list[name]
     return pypi_list
 
 
@@ -51,8 +57,13 @@ def get_default_env_python():
     for path in user_path_list:
         path = ensure_path_end_separator(path.replace('\\', '/'))
         if os.path.exists(os.path.join(path, 'python.exe')):
-            return {
-                "path": path, "version": run_command([f'{path}python.exe', '-V']).stdout.split(maxsplit=1)[1].strip()}
+            from jiefoundation.pyworker import interpreter_version, WorkerError
+            try:
+                version = interpreter_version(f'{path}python.exe')
+            except WorkerError as e:
+                print(f'获取 {path}python.exe 版本失败: {e}')
+                version = ''
+            return {"path": path, "version": version}
 
 
     return ''
@@ -60,7 +71,7 @@ def get_default_env_python():
 
 def get_packages(python_path):
     """
-    获取包列表
+    获取包列表，直接读取 site-packages 中的元数据，参见 inventory.scan_packages
 
     Args:
         python_path: 要执行的 pytthon 文件路径
@@ -68,87 +79,150 @@ def get_packages(python_path):
     Returns:
         包含包信息的字典列表
     """
-    if os.path.exists(python_path):
-        cmd = [python_path, '-m', 'pip', 'list', '--format=json']
-        result = run_command(cmd)
-        package_list = json.loads(result.stdout)
-        return package_list
-    else:
-        raise FileNotFoundError(f"指定的Python路径 {python_path} 无法找到~")
-    return []
+    from .inventory import scan_packages
+    return [
+        {'name': package['name'], 'version': package['current_version']}
+        for package in scan_packages(python_path).values()
+    ]
 
 
-def get_packages_update(python_path, packages = None):
+def get_package_list(python_path, packages = None):
     """
-    获取包更新信息
+    获取已安装包列表
+
+    最新版本需要访问索引，由页面通过 package_latest 异步加载，这里只返回已安装的信息
 
     Args:
-        python_path: 要执行的 python 文件路径
-        packages: 要检查的包列表，如果为None则检查所有包
+        python_path: 要执行的 pytthon 文件路径
 
     Returns:
-        包含更新信息的字典列表
-    """
-    if not os.path.exists(python_path):
-        raise FileNotFoundError(f"指定的Python路径 {python_path} 无法找到~")
-    if packages is None:
-        cmd = [python_path, '-m', 'pip', 'list', '--outdated', '--format=json']
-    else:
-        cmd = [python_path, '-m', 'pip', 'list', '--outdated', packages, '--format=json']
-    outdated_list = json.loads(run_command(cmd).stdout)
+        {包名: {'name', 'current_version', 'installer', 'size', 'pycache', 'latest_version', 'latest_filetype'}}
+        占用空间参见 diskusage.environment_usage
+    """
+    from .inventory import scan_packages
+    from .diskusage import environment_usage
+
+    usage = environment_usage(python_path)['packages']
     return_dict = {}
-    for package in outdated_list:
-        return_dict[package['name']] = {
+    for name, package in scan_packages(python_path).items():
+        return_dict[name] = {
             'name': package['name'],
-            'current_version': package['version'],
-            'latest_version': package['latest_version'],
-            'latest_filetype': package['latest_filetype'],
+            'current_version': package['current_version'],
+            'installer': package['installer'],
+            'size': usage.get(name, {}).get('size'),
+            'pycache': usage.get(name, {}).get('pycache'),
+            'latest_version': '',
+            'latest_filetype': '',
         }
     return return_dict
 
 
-def get_package_list(python_path, packages = None):
+def package_upgrade(python_path, package_name):
     """
-    获取包更新信息
+    升级包
 
     Args:
         python_path: 要执行的 pytthon 文件路径
-        packages: 要检查的包列表，如果为None则检查所有包
+        package_name: 要升级的包名称
 
     Returns:
-        包含更新信息的字典列表
+        执行结果
     """
+    from .pypiproxy import pip_environ
 
-    packages = get_packages(python_path)
-    updates = get_packages_update(python_path)
+    cmd = [python_path, '-m', 'pip', 'install', '--upgrade', package_name]
+    result = run_command(cmd, env=pip_environ())
+    return result
 
-    return_dict = {}
-    for package in packages:
-        latest_version = ''
-        latest_filetype = ''
-        if package['name'] in updates:
-            latest_version = updates[package['name']]['latest_version']
-            latest_filetype = updates[package['name']]['latest_filetype']
-        return_dict[package['name']] = {
-            'name': package['name'],
-            'current_version': package['version'],
-            'latest_version': latest_version,
-            'latest_filetype': latest_filetype,
-        }
-    return return_dict
+def resolve_installed_names(python_path, names):
+    """
+    把页面提交的包名对应到已安装的包，这些名称会直接放进 pip 的命令行
 
+    Args:
+        python_path: 要执行的 python 文件路径
+        names: 页面提交的包名列表
 
-def package_upgrade(python_path, package_name):
+    Returns:
+        (已安装的包名列表, 无效的名称列表)，以 - 开头的名称（会被 pip 当作选项）和未安装的包都是无效的
     """
-    升级包
+    from .inventory import scan_packages, canonicalize_name
+
+    installed = {canonicalize_name(name): name for name in scan_packages(python_path)}
+    known = []
+    invalid = []
+    for name in names:
+        name = name.strip()
+        if not name:
+            continue
+        canonical = canonicalize_name(name)
+        if name.startswith('-') or canonical not in installed:
+            invalid.append(name)
+        elif installed[canonical] not in known:
+            known.append(installed[canonical])
+    return known, invalid
+
+
+def batch_upgrade_task(job, python_path, packages=None):
+    """
+    批量升级：一次 pip install --upgrade 解析并安装全部包，失败时逐个重试找出失败的包
 
     Args:
-        python_path: 要执行的 pytthon 文件路径
-        package_name: 要升级的包名称
+        job: 后台任务
+        python_path: 要执行的 python 文件路径
+        packages: 要升级的包名列表，为空时升级全部可升级的包
 
     Returns:
-        执行结果
+        {'upgraded': [{'name', 'from', 'to'}], 'unchanged': [包名], 'failed': [{'name', 'error'}],
+         'dependencies': [{'name', 'from', 'to'}] 随之变化的依赖包}
     """
-    cmd = [python_path, '-m', 'pip', 'install', '--upgrade', package_name]
-    result = run_command(cmd)
-    return result
\ No newline at end of file
+    from jiefoundation.jobs import run_command_logged
+    from .inventory import scan_packages, get_latest_versions, canonicalize_name
+    from .pypiproxy import pip_environ
+
+    if not packages:
+        job.set_stage('check', '检查可升级的包')
+        packages = list(get_latest_versions(python_path))
+    if not packages:
+        job.update('没有需要升级的包~')
+        return {'upgraded': [], 'unchanged': [], 'failed': [], 'dependencies': []}
+
+    before = {canonicalize_name(name): package['current_version'] for name, package in scan_packages(python_path).items()}
+    job.set_stage('install', f'升级 {len(packages)} 个包', files_total=len(packages))
+
+    def on_line(line):
+        if line.startswith(('Collecting', 'Installing', 'Successfully', 'ERROR')):
+            job.update(line)
+
+    cmd = [str(python_path), '-m', 'pip', 'install', '--upgrade', '--progress-bar', 'off', *packages]
+    env = pip_environ()
+    returncode, lines = run_command_logged(job, cmd, env=env, on_line=on_line)
+    errors = {}
+    if returncode != 0:
+        batch_error = '\n'.join(line for line in lines if line.startswith('ERROR')) or (lines[-1] if lines else '')
+        # 一起解析失败时 pip 不会安装任何包，逐个升级找出有问题的包
+        job.set_stage('retry', '逐个升级以确认失败的包', files_total=len(packages))
+        for index, name in enumerate(packages):
+            job.update(f'升级 {name}', files_done=index)
+            returncode, lines = run_command_logged(
+                job, [str(python_path), '-m', 'pip', 'install', '--upgrade', '--progress-bar', 'off', name], env=env
+            )
+            if returncode != 0:
+                errors[name] = '\n'.join(line for line in lines if line.startswith('ERROR')) or batch_error
+        job.update(files_done=len(packages))
+
+    after = {canonicalize_name(name): package['current_version'] for name, package in scan_packages(python_path).items()}
+    result = {'upgraded': [], 'unchanged': [], 'failed': [], 'dependencies': []}
+    requested = {canonicalize_name(name) for name in packages}
+    for key, version in after.items():
+        if key not in requested and before.get(key) != version:
+            result['dependencies'].append({'name': key, 'from': before.get(key, ''), 'to': version})
+    for name in packages:
+        key = canonicalize_name(name)
+        if name in errors:
+            result['failed'].append({'name': name, 'error': errors[name]})
+        elif before.get(key) != after.get(key):
+            result['upgraded'].append({'name': name, 'from': before.get(key, ''), 'to': after.get(key, '')})
+        else:
+            result['unchanged'].append(name)
+    job.update(f"升级完成：成功 {len(result['upgraded'])} 个，失败 {len(result['failed'])} 个~")
+    return result
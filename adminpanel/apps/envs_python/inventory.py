@@ -0,0 +1,204 @@
+"""
+已安装包清单
+
+不再启动 pip list，直接读取目标解释器 site-packages 中的 *.dist-info / *.egg-info 元数据：
+- site-packages 路径通过 sysconfig 获取一次，按 python.exe 的修改时间缓存；
+- 扫描结果按各个 site-packages 目录的修改时间缓存，安装/卸载包后目录时间变化才重新扫描，
+  重新扫描时未变化的元数据目录直接复用；
+- 最新版本需要访问索引，由 pypi.PypiResolver 单独缓存，页面异步加载。
+"""
+import json
+import os
+import re
+import threading
+
+from jiefoundation.utils import run_command
+
+SITE_PROBE_SCRIPT = (
+    "import json, os, platform, site, sys, sysconfig; "
+    "paths = sysconfig.get_paths(); "
+    "impl = getattr(sys, 'implementation', None); "
+    "info = impl.version if impl else sys.version_info; "
+    "impl_version = '{0}.{1}.{2}'.format(*info) + "
+    "(info[3][0] + str(info[4]) if info[3] != 'final' else ''); "
+    "markers = {'implementation_name': impl.name if impl else 'cpython', 'implementation_version': impl_version, "
+    "'os_name': os.name, 'platform_machine': platform.machine(), 'platform_release': platform.release(), "
+    "'platform_system': platform.system(), 'platform_version': platform.version(), "
+    "'python_full_version': platform.python_version(), "
+    "'platform_python_implementation': platform.python_implementation(), "
+    "'python_version': '.'.join(platform.python_version_tuple()[:2]), 'sys_platform': sys.platform}; "
+    "print(json.dumps({'version': sys.version.split()[0], "
+    "'paths': [paths['purelib'], paths['platlib']], "
+    "'user_site': site.getusersitepackages() if site.ENABLE_USER_SITE else '', "
+    "'markers': markers}))"
+)
+
+_site_cache = {}
+_scan_cache = {}
+_dist_cache = {}
+_lock = threading.RLock()
+
+
+def canonicalize_name(name):
+    """PEP 503 名称规范化"""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def _python_key(python_path):
+    return os.path.normcase(os.path.abspath(str(python_path)))
+
+
+def get_site_paths(python_path):
+    """
+    获取解释器的 site-packages 目录（包含用户目录），python.exe 未变化时只执行一次
+
+    :return: 存在的目录列表
+    """
+    key = _python_key(python_path)
+    if not os.path.exists(key):
+        raise FileNotFoundError(f"指定的Python路径 {python_path} 无法找到~")
+    signature = os.stat(key).st_mtime_ns
+    cached = _site_cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+    result = run_command([str(python_path), '-c', SITE_PROBE_SCRIPT])
+    if result.returncode != 0:
+        raise RuntimeError(f'获取 site-packages 路径失败：{result.stderr}')
+    probe = json.loads(result.stdout)
+    paths = []
+    for path in probe['paths'] + [probe['user_site']]:
+        if path and os.path.isdir(path) and os.path.normcase(path) not in [os.path.normcase(p) for p in paths]:
+            paths.append(path)
+    _site_cache[key] = (signature, paths, probe['version'], probe.get('markers', {}))
+    return paths
+
+
+def _read_headers(path):
+    """只读取元数据文件的头部（空行之前），不解析很长的描述部分"""
+    headers = {}
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line:
+                break
+            if line[0] in ' \t' or ':' not in line:
+                continue
+            key, value = line.split(':', 1)
+            headers.setdefault(key.strip(), value.strip())
+    return headers
+
+
+def _read_text(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def read_distribution(path):
+    """
+    读取一个 dist-info / egg-info 元数据
+
+    :return: {'name', 'current_version', 'installer', 'metadata_path'}，无法识别时返回 None
+    """
+    if path.endswith('.dist-info'):
+        metadata_file = os.path.join(path, 'METADATA')
+    elif os.path.isdir(path):
+        metadata_file = os.path.join(path, 'PKG-INFO')
+    else:
+        # 单文件形式的 egg-info 本身就是 PKG-INFO
+        metadata_file = path
+    try:
+        headers = _read_headers(metadata_file)
+    except OSError:
+        return None
+    if not headers.get('Name'):
+        return None
+    return {
+        'name': headers['Name'],
+        'current_version': headers.get('Version', ''),
+        'installer': _read_text(os.path.join(path, 'INSTALLER')) if path.endswith('.dist-info') else '',
+        'metadata_path': path,
+    }
+
+
+def _scan_directory(site_path):
+    distributions = []
+    with os.scandir(site_path) as entries:
+        for entry in entries:
+            if not entry.name.endswith(('.dist-info', '.egg-info')):
+                continue
+            try:
+                signature = entry.stat().st_mtime_ns
+            except OSError:
+                continue
+            cached = _dist_cache.get(entry.path)
+            if cached and cached[0] == signature:
+                distribution = cached[1]
+            else:
+                distribution = read_distribution(entry.path)
+                _dist_cache[entry.path] = (signature, distribution)
+            if distribution:
+                distributions.append(distribution)
+    return distributions
+
+
+def scan_packages(python_path):
+    """
+    获取已安装的包
+
+    :return: {包名: {'name', 'current_version', 'installer', 'metadata_path'}}，按名称排序
+    """
+    site_paths = get_site_paths(python_path)
+    signature = get_site_signature(python_path)
+    key = _python_key(python_path)
+    with _lock:
+        cached = _scan_cache.get(key)
+        if cached and cached[0] == signature:
+            return {name: dict(package) for name, package in cached[1].items()}
+        packages = {}
+        seen = set()
+        # 与 sys.path 顺序一致，前面目录中的包优先
+        for site_path in site_paths:
+            for distribution in _scan_directory(site_path):
+                canonical = canonicalize_name(distribution['name'])
+                if canonical in seen:
+                    continue
+                seen.add(canonical)
+                packages[distribution['name']] = distribution
+        packages = dict(sorted(packages.items(), key=lambda item: item[0].lower()))
+        _scan_cache[key] = (signature, packages)
+        return {name: dict(package) for name, package in packages.items()}
+
+
+def get_python_version(python_path):
+    """目标解释器的版本号，如 3.12.1"""
+    get_site_paths(python_path)
+    return _site_cache[_python_key(python_path)][2]
+
+
+def get_marker_environment(python_path):
+    """目标解释器的 PEP 508 环境标记值，用于计算 Requires-Dist 中的条件"""
+    get_site_paths(python_path)
+    return dict(_site_cache[_python_key(python_path)][3])
+
+
+def get_site_signature(python_path):
+    """各 site-packages 目录的修改时间，安装/卸载包后变化"""
+    return tuple((path, os.stat(path).st_mtime_ns) for path in get_site_paths(python_path))
+
+
+def get_latest_versions(python_path, refresh=False):
+    """
+    可升级包的最新版本，参见 pypi.PypiResolver，各环境共用同一份索引缓存
+
+    :return: {包名: {'latest_version', 'latest_filetype'}}，只包含当前版本落后的包
+    """
+    from .helper import get_query_pypi
+    from .pypi import pypi_resolver
+
+    packages = {name: package['current_version'] for name, package in scan_packages(python_path).items()}
+    return pypi_resolver.outdated(
+        get_query_pypi(), packages, python_version=get_python_version(python_path), refresh=refresh
+    )
@@ -0,0 +1,288 @@
+"""
+包名索引
+
+从索引根目录（Simple API 根页面）获取全部包名，规范化后排序保存为每行一个名称的文本文件，
+另存一份 array('I') 行偏移文件；查询时 mmap 名称文件，按偏移二分查找前缀，
+前缀不够时在映射的内存中直接查找子串，最后用 difflib 做近似匹配。
+
+更新方式：Simple API 没有“某个时间之后新增/删除了哪些包”的接口（PyPI 的 XML-RPC changelog 已弃用，
+国内镜像也不提供），根页面是所有索引都支持的唯一来源，所以不做按变更日志的增量合并，而是：
+- 根页面带 ETag / Last-Modified 条件请求，PEP 691 JSON 响应再比较 meta._last-serial，未变化时只更新检查时间；
+- 下载了新的根页面时先与当前索引逐个比较，包名没有变化时不重写文件，有变化时记录新增、删除的数量；
+- 需要重写时写入新的文件名再切换，Windows 下正在映射的旧文件不能被替换，切换后再尝试删除；
+- 索引过期时在后台任务中更新，查询不等待。
+"""
+import bisect
+import difflib
+import glob
+import hashlib
+import mmap
+import os
+import threading
+import time
+from array import array
+
+from jiefoundation.jsonstore import read_json, update_json
+from jiefoundation.jobs import submit_job, find_job, JOB_ERROR
+
+from .config import app_cache_dir, name_index_json
+from .inventory import canonicalize_name
+from .pypi import _LinkParser
+
+ROOT_ACCEPT = 'application/vnd.pypi.simple.v1+json, application/vnd.pypi.simple.v1+html;q=0.2, text/html;q=0.01'
+INDEX_MAX_AGE = 86400
+# 更新失败后多久再重试
+RETRY_INTERVAL = 600
+
+
+class NameIndex:
+    """
+    :param index_url: 索引地址，如 https://pypi.org/simple
+    :param folder: 索引文件保存目录
+    """
+
+    def __init__(self, index_url, folder=app_cache_dir):
+        self.index_url = index_url.rstrip('/')
+        self.folder = str(folder)
+        self.prefix = 'names-' + hashlib.sha1(self.index_url.encode('utf-8')).hexdigest()[:12]
+        self._file = None
+        self._mmap = None
+        self._offsets = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def meta(self):
+        return read_json(name_index_json, {}).get(self.index_url, {})
+
+    def _open(self):
+        """打开当前版本的索引文件，已经打开时直接返回"""
+        name = self.meta().get('file')
+        if not name:
+            return False
+        if self._file == name and self._mmap is not None:
+            return True
+        path = os.path.join(self.folder, name)
+        if not os.path.exists(path) or not os.path.exists(path + '.idx'):
+            return False
+        offsets = array('I')
+        with open(path + '.idx', 'rb') as f:
+            offsets.frombytes(f.read())
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file, self._mmap, self._offsets, self._size = name, mapped, offsets, size
+        return True
+
+    def _name_at(self, index):
+        start = self._offsets[index]
+        end = self._offsets[index + 1] - 1 if index + 1 < len(self._offsets) else self._size - 1
+        return self._mmap[start:end].decode('utf-8')
+
+    def _lower_bound(self, key):
+        low, high = 0, len(self._offsets)
+        while low < high:
+            middle = (low + high) // 2
+            if self._name_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _prefix_range(self, prefix):
+        start = self._lower_bound(prefix)
+        # 前缀后接一个最大字符，得到前缀范围的上界
+        return start, self._lower_bound(prefix + '￿')
+
+    def search(self, query, limit=20):
+        """
+        查找包名：先前缀匹配，再子串匹配，都没有时近似匹配
+
+        :return: 规范化的包名列表
+        """
+        query = canonicalize_name(query.strip())
+        if not query:
+            return []
+        with self._lock:
+            if not self._open() or not self._offsets:
+                return []
+            results = []
+            start, end = self._prefix_range(query)
+            # 完全相同的名称排在最前面
+            for index in range(start, min(end, start + limit)):
+                results.append(self._name_at(index))
+
+            if len(results) < limit:
+                needle = query.encode('utf-8')
+                position = self._mmap.find(needle)
+                while position != -1 and len(results) < limit:
+                    index = bisect.bisect_right(self._offsets, position) - 1
+                    name = self._name_at(index)
+                    if name not in results:
+                        results.append(name)
+                    position = self._mmap.find(needle, self._offsets[index + 1] if index + 1 < len(self._offsets) else self._size)
+
+            if not results:
+                start, end = self._prefix_range(query[:2])
+                candidates = [self._name_at(index) for index in range(start, min(end, start + 20000))]
+                results = difflib.get_close_matches(query, candidates, n=limit, cutoff=0.6)
+            return results
+
+    def contains(self, name):
+        name = canonicalize_name(name)
+        with self._lock:
+            if not self._open() or not self._offsets:
+                return False
+            index = self._lower_bound(name)
+            return index < len(self._offsets) and self._name_at(index) == name
+
+    def is_stale(self, max_age=INDEX_MAX_AGE):
+        meta = self.meta()
+        return not meta.get('file') or time.time() - meta.get('checked_at', 0) > max_age
+
+    def _fetch(self, meta, timeout=60):
+        import requests
+
+        headers = {'Accept': ROOT_ACCEPT}
+        if meta.get('file'):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        response = requests.get(self.index_url + '/', headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            return response, None, None
+        response.raise_for_status()
+        serial = None
+        if 'json' in response.headers.get('Content-Type', ''):
+            data = response.json()
+            serial = data.get('meta', {}).get('_last-serial')
+            names = [project['name'] for project in data.get('projects', [])]
+        else:
+            parser = _LinkParser()
+            parser.feed(response.text)
+            names = [link.get('href', '').rstrip('/').rsplit('/', 1)[-1] for link in parser.links]
+        return response, names, serial
+
+    def _current_names(self):
+        """当前索引中的全部包名，没有索引时返回 None"""
+        with self._lock:
+            if not self._open():
+                return None
+            if self._mmap is None:
+                return []
+            return self._mmap[:self._size - 1].decode('utf-8').split('\n')
+
+    def _touch(self, response, serial):
+        """根页面内容没有变化，只更新检查时间和缓存校验信息"""
+        with update_json(name_index_json, {}) as data:
+            meta = data.setdefault(self.index_url, {})
+            meta['checked_at'] = time.time()
+            meta['added'] = meta['removed'] = 0
+            if response.status_code != 304:
+                meta['etag'] = response.headers.get('ETag', '')
+                meta['last_modified'] = response.headers.get('Last-Modified', '')
+            if serial is not None:
+                meta['serial'] = serial
+
+    def build(self, job=None):
+        """
+        获取根页面并更新索引，未变化时只更新检查时间
+
+        :return: 包名数量
+        """
+        meta = self.meta()
+        if job:
+            job.set_stage('download', '获取包名列表')
+        response, names, serial = self._fetch(meta)
+        if names is None or (serial is not None and meta.get('file') and serial == meta.get('serial')):
+            self._touch(response, serial)
+            return meta.get('count', 0)
+
+        if job:
+            job.check_cancelled()
+            job.set_stage('build', '生成包名索引')
+        names = sorted({canonicalize_name(name) for name in names if name})
+        current = self._current_names()
+        if current is not None:
+            current_set = set(current)
+            added = sum(1 for name in names if name not in current_set)
+            removed = len(current) - (len(names) - added)
+            if not added and not removed:
+                self._touch(response, serial)
+                return len(names)
+        else:
+            added, removed = len(names), 0
+        os.makedirs(self.folder, exist_ok=True)
+        file_name = f'{self.prefix}-{int(time.time())}.txt'
+        path = os.path.join(self.folder, file_name)
+        offsets = array('I')
+        position = 0
+        with open(path, 'wb') as f:
+            for name in names:
+                offsets.append(position)
+                line = name.encode('utf-8') + b'\n'
+                f.write(line)
+                position += len(line)
+        with open(path + '.idx', 'wb') as f:
+            offsets.tofile(f)
+
+        with update_json(name_index_json, {}) as data:
+            data[self.index_url] = {
+                'file': file_name,
+                'count': len(names),
+                'etag': response.headers.get('ETag', ''),
+                'last_modified': response.headers.get('Last-Modified', ''),
+                'serial': serial,
+                'added': added,
+                'removed': removed,
+                'checked_at': time.time(),
+            }
+        self._remove_old(file_name)
+        return len(names)
+
+    def _remove_old(self, current):
+        for path in glob.glob(os.path.join(self.folder, f'{self.prefix}-*.txt')):
+            if os.path.basename(path) == current:
+                continue
+            for old_path in (path, path + '.idx'):
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    # 仍在被映射，下次重建时再删除
+                    pass
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_name_index(index_url):
+    index_url = index_url.rstrip('/')
+    with _indexes_lock:
+        if index_url not in _indexes:
+            _indexes[index_url] = NameIndex(index_url)
+        return _indexes[index_url]
+
+
+def build_name_index_task(job, index_url):
+    count = get_name_index(index_url).build(job)
+    job.update(f'包名索引共 {count} 个包~')
+    return {'count': count}
+
+
+def ensure_name_index(index_url, max_age=INDEX_MAX_AGE):
+    """
+    索引不存在或过期时提交后台任务更新
+
+    :return: 提交的任务，不需要更新时返回 None
+    """
+    name_index = get_name_index(index_url)
+    if not name_index.is_stale(max_age):
+        return None
+    key = f'envs_python:name_index:{name_index.index_url}'
+    last_job = find_job(key, active_only=False)
+    if last_job and last_job.status == JOB_ERROR and time.time() - (last_job.finished_at or 0) < RETRY_INTERVAL:
+        return None
+    return submit_job(key, '更新包名索引', build_name_index_task, index_url)
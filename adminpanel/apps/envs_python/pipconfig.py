@@ -0,0 +1,147 @@
+"""
+pip 配置读取
+
+按 pip 的规则直接读取配置文件，不再每次启动 `python -m pip config get`：
+- 加载顺序（后面的覆盖前面的）：全局 %ProgramData%\\pip\\pip.ini、
+  用户 %USERPROFILE%\\pip\\pip.ini 和 %APPDATA%\\pip\\pip.ini、
+  解释器目录下的 pip.ini、PIP_CONFIG_FILE 指定的文件；
+- PIP_CONFIG_FILE 指向存在的文件时不加载用户配置，指向 os.devnull 时不加载任何配置文件；
+- 环境变量 PIP_<名称> 优先级最高，如 PIP_INDEX_URL；
+- 读取结果按各配置文件的修改时间和相关环境变量缓存。
+"""
+import configparser
+import os
+import threading
+
+from .config import project_python_path
+
+DEFAULT_INDEX_URL = 'https://pypi.org/simple'
+
+
+def _user_files():
+    files = []
+    if os.environ.get('USERPROFILE'):
+        files.append(os.path.join(os.environ['USERPROFILE'], 'pip', 'pip.ini'))
+    if os.environ.get('APPDATA'):
+        files.append(os.path.join(os.environ['APPDATA'], 'pip', 'pip.ini'))
+    return files
+
+
+class PipConfig:
+    """
+    :param site_prefix: 解释器目录（sys.prefix），读取其中的 pip.ini
+    """
+
+    def __init__(self, site_prefix):
+        self.site_prefix = str(site_prefix)
+        self._signature = None
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def config_files(self):
+        """
+        按加载顺序返回 [(类型, 文件路径), ...]，类型为 global / user / site / env
+        """
+        env_file = os.environ.get('PIP_CONFIG_FILE')
+        if env_file == os.devnull:
+            return []
+        program_data = os.environ.get('ProgramData') or os.environ.get('ALLUSERSPROFILE') or r'C:\ProgramData'
+        files = [('global', os.path.join(program_data, 'pip', 'pip.ini'))]
+        if not (env_file and os.path.exists(env_file)):
+            files += [('user', path) for path in _user_files()]
+        files.append(('site', os.path.join(self.site_prefix, 'pip.ini')))
+        if env_file:
+            files.append(('env', env_file))
+        return files
+
+    def _current_signature(self, files):
+        signature = []
+        for kind, path in files:
+            try:
+                signature.append((path, os.stat(path).st_mtime_ns))
+            except OSError:
+                signature.append((path, None))
+        env = tuple(sorted((key, value) for key, value in os.environ.items() if key.startswith('PIP_')))
+        return tuple(signature), env
+
+    def _load(self, files):
+        values = {}
+        for kind, path in files:
+            if not os.path.exists(path):
+                continue
+            parser = configparser.RawConfigParser()
+            try:
+                parser.read(path, encoding='utf-8')
+            except (configparser.Error, UnicodeDecodeError) as e:
+                print(f'读取 pip 配置文件 {path} 失败: {e}')
+                continue
+            for section in parser.sections():
+                for name, value in parser.items(section):
+                    values[f'{section}.{name.replace("_", "-")}'] = value
+        return values
+
+    def values(self):
+        """合并后的配置文件中的值 {'global.index-url': ..., 'install.trusted-host': ...}"""
+        files = self.config_files()
+        signature = self._current_signature(files)
+        with self._lock:
+            if signature != self._signature:
+                self._values = self._load(files)
+                self._signature = signature
+            return dict(self._values)
+
+    def get(self, key, default=None):
+        """
+        获取配置项，如 get('global.index-url')，不包含环境变量
+        """
+        return self.values().get(key, default)
+
+    def get_option(self, name, command='install', default=None):
+        """
+        获取实际生效的选项：环境变量 PIP_<NAME> > [command] > [global]
+
+        :param name: 选项名称，如 index-url
+        """
+        env_value = os.environ.get('PIP_' + name.upper().replace('-', '_'))
+        if env_value:
+            return env_value
+        values = self.values()
+        for section in (command, 'global'):
+            if f'{section}.{name}' in values:
+                return values[f'{section}.{name}']
+        return default
+
+    def user_file(self):
+        """pip config set 默认写入的用户配置文件"""
+        return _user_files()[-1]
+
+    def set(self, key, value, path=None):
+        """
+        写入配置项（默认写入用户配置文件），写入后缓存按修改时间自动失效
+
+        :param key: 如 global.index-url
+        """
+        section, name = key.split('.', 1)
+        path = path or self.user_file()
+        parser = configparser.RawConfigParser()
+        if os.path.exists(path):
+            parser.read(path, encoding='utf-8')
+        if not parser.has_section(section):
+            parser.add_section(section)
+        parser.set(section, name, value)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            parser.write(f)
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = None
+
+
+pip_config = PipConfig(project_python_path.parent)
+
+
+def get_index_url():
+    """实际生效的索引地址"""
+    return pip_config.get_option('index-url', default=DEFAULT_INDEX_URL).rstrip('/') or DEFAULT_INDEX_URL
@@ -0,0 +1,296 @@
+"""
+PyPI 最新版本查询
+
+按 Simple API 并发查询多个包的可用版本（优先 PEP 691 JSON，索引不支持时解析 HTML 页面），
+结果按索引地址缓存在磁盘上，所有 Python 环境共用：
+- 缓存未过期直接使用，过期后带 ETag / Last-Modified 发送条件请求，304 时只更新时间；
+- 同一个包同时只会有一个请求，多个环境同时检查时共用结果；
+- 缓存的是版本和文件信息，按各环境的 Python 版本过滤 requires-python 后再取最新版本。
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from html.parser import HTMLParser
+from urllib.parse import urljoin, unquote
+
+try:
+    from packaging.specifiers import SpecifierSet, InvalidSpecifier
+    from packaging.version import Version, InvalidVersion
+except ImportError:
+    from pip._vendor.packaging.specifiers import SpecifierSet, InvalidSpecifier
+    from pip._vendor.packaging.version import Version, InvalidVersion
+
+from jiefoundation.jsonstore import read_json, update_json
+
+from .config import pypi_cache_json
+from .inventory import canonicalize_name
+
+SIMPLE_ACCEPT = 'application/vnd.pypi.simple.v1+json, application/vnd.pypi.simple.v1+html;q=0.2, text/html;q=0.01'
+CACHE_TTL = 3600
+ARCHIVE_EXTENSIONS = ('.whl', '.tar.gz', '.zip', '.tar.bz2', '.tgz', '.egg')
+
+
+class _LinkParser(HTMLParser):
+    """解析 Simple API HTML 页面中的文件链接"""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            self.links.append(dict(attrs))
+
+
+def parse_filename_version(project, filename):
+    """
+    从文件名中取得版本号
+
+    :return: (版本号, 文件类型 'bdist_wheel' / 'sdist')，无法识别时返回 (None, None)
+    """
+    if filename.endswith('.whl'):
+        parts = filename[:-4].split('-')
+        return (parts[1], 'bdist_wheel') if len(parts) >= 5 else (None, None)
+    for extension in ARCHIVE_EXTENSIONS:
+        if filename.lower().endswith(extension):
+            stem = filename[:-len(extension)]
+            break
+    else:
+        return None, None
+    # sdist 文件名为 “项目名-版本”，项目名中的分隔符可能是 - _ .
+    name_pattern = '[-_.]+'.join(re.escape(part) for part in re.split(r'[-_.]+', project))
+    match = re.match(rf'^{name_pattern}-(.+)$', stem, re.IGNORECASE)
+    if not match:
+        return None, None
+    return match.group(1), 'sdist'
+
+
+def parse_simple_json(project, data):
+    """
+    解析 PEP 691 JSON
+
+    :return: {版本号: [[文件类型, requires-python], ...]}，不包含被撤回（yanked）的文件
+    """
+    releases = {}
+    for file in data.get('files', []):
+        if file.get('yanked'):
+            continue
+        version, filetype = parse_filename_version(project, file['filename'])
+        if version:
+            releases.setdefault(version, []).append([filetype, file.get('requires-python') or ''])
+    return releases
+
+
+def parse_simple_html(project, text):
+    """解析 Simple API HTML 页面（PEP 503），返回格式同 parse_simple_json"""
+    parser = _LinkParser()
+    parser.feed(text)
+    releases = {}
+    for link in parser.links:
+        if 'data-yanked' in link or not link.get('href'):
+            continue
+        filename = unquote(link['href'].split('#', 1)[0].rstrip('/').rsplit('/', 1)[-1])
+        version, filetype = parse_filename_version(project, filename)
+        if version:
+            releases.setdefault(version, []).append([filetype, link.get('data-requires-python') or ''])
+    return releases
+
+
+def select_latest(releases, python_version=None, pre=False):
+    """
+    取最新版本
+
+    :param releases: parse_simple_json 的返回值
+    :param python_version: 目标解释器版本，如 '3.12.1'，用于过滤 requires-python
+    :param pre: 是否包含预发布版本
+    :return: (版本号, 文件类型)，没有可用版本时返回 (None, None)
+    """
+    latest = None
+    latest_filetype = None
+    for version_str, files in releases.items():
+        try:
+            version = Version(version_str)
+        except InvalidVersion:
+            continue
+        if (version.is_prerelease or version.is_devrelease) and not pre:
+            continue
+        if latest is not None and version <= latest:
+            continue
+        compatible = []
+        for filetype, requires_python in files:
+            if python_version and requires_python:
+                try:
+                    if not SpecifierSet(requires_python).contains(python_version, prereleases=True):
+                        continue
+                except InvalidSpecifier:
+                    pass
+            compatible.append(filetype)
+        if compatible:
+            latest = version
+            latest_filetype = 'wheel' if 'bdist_wheel' in compatible else 'sdist'
+    return (str(latest), latest_filetype) if latest is not None else (None, None)
+
+
+def sort_versions(releases, pre=True):
+    """版本号从新到旧排序，忽略无法解析的版本"""
+    parsed = []
+    for version_str in releases:
+        try:
+            version = Version(version_str)
+        except InvalidVersion:
+            continue
+        if pre or not (version.is_prerelease or version.is_devrelease):
+            parsed.append(version)
+    return [str(version) for version in sorted(parsed, reverse=True)]
+
+
+class PypiResolver:
+    """
+    :param cache_file: 磁盘缓存文件
+    :param ttl: 缓存有效秒数
+    :param workers: 并发请求数
+    :param timeout: 单个请求超时秒数
+    """
+
+    def __init__(self, cache_file=pypi_cache_json, ttl=CACHE_TTL, workers=16, timeout=10):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.workers = workers
+        self.timeout = timeout
+        self._session = None
+        self._executor = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.workers, max_retries=2)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['Accept'] = SIMPLE_ACCEPT
+                self._session = session
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='jiepypi')
+            return self._session
+
+    def _fetch(self, index_url, project, cached):
+        """请求一个包的 Simple API 页面，返回新的缓存记录"""
+        session = self._get_session()
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        url = urljoin(index_url.rstrip('/') + '/', f'{project}/')
+        response = session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and cached:
+            return dict(cached, fetched_at=time.time())
+        record = {
+            'fetched_at': time.time(),
+            'etag': response.headers.get('ETag', ''),
+            'last_modified': response.headers.get('Last-Modified', ''),
+            'releases': {},
+        }
+        if response.status_code == 404:
+            # 私有包或本地安装的包，缓存“不存在”，过期前不再请求
+            return record
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '')
+        if 'json' in content_type:
+            record['releases'] = parse_simple_json(project, response.json())
+        else:
+            record['releases'] = parse_simple_html(project, response.text)
+        return record
+
+    def _submit(self, index_url, project, cached):
+        """同一个包已经在请求中时返回同一个 Future"""
+        key = (index_url, project)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+
+        def run():
+            try:
+                future.set_result(self._fetch(index_url, project, cached))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+        self._get_session()
+        self._executor.submit(run)
+        return future, True
+
+    def resolve(self, index_url, names, refresh=False):
+        """
+        获取多个包的版本信息
+
+        :param index_url: 索引地址，如 https://pypi.org/simple
+        :param names: 包名列表
+        :param refresh: 忽略缓存有效期（仍然发送条件请求）
+        :return: {规范化包名: releases}，请求失败的包不包含在结果中
+        """
+        index_url = index_url.rstrip('/')
+        projects = sorted({canonicalize_name(name) for name in names})
+        cache = read_json(self.cache_file, {}).get(index_url, {})
+        now = time.time()
+        result = {}
+        futures = {}
+        for project in projects:
+            cached = cache.get(project)
+            if cached and not refresh and now - cached['fetched_at'] < self.ttl:
+                result[project] = cached['releases']
+            else:
+                futures[project] = self._submit(index_url, project, cached)
+
+        updated = {}
+        for project, (future, owner) in futures.items():
+            try:
+                record = future.result()
+            except Exception as e:
+                print(f'获取 {project} 版本信息失败: {e}')
+                if cache.get(project):
+                    result[project] = cache[project]['releases']
+                continue
+            result[project] = record['releases']
+            if owner:
+                updated[project] = record
+        if updated:
+            with update_json(self.cache_file, {}) as data:
+                data.setdefault(index_url, {}).update(updated)
+        return result
+
+    def outdated(self, index_url, packages, python_version=None, refresh=False):
+        """
+        检查可升级的包
+
+        :param packages: {包名: 当前版本}
+        :return: {包名: {'latest_version', 'latest_filetype'}}
+        """
+        resolved = self.resolve(index_url, packages.keys(), refresh=refresh)
+        outdated = {}
+        for name, current_version in packages.items():
+            releases = resolved.get(canonicalize_name(name))
+            if not releases:
+                continue
+            try:
+                current = Version(current_version)
+            except InvalidVersion:
+                continue
+            latest, filetype = select_latest(releases, python_version, pre=current.is_prerelease)
+            if latest and Version(latest) > current:
+                outdated[name] = {'latest_version': latest, 'latest_filetype': filetype}
+        return outdated
+
+
+pypi_resolver = PypiResolver()
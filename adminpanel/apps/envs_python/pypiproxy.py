@@ -0,0 +1,398 @@
+"""
+本地 PyPI 缓存代理
+
+面板提供 PEP 503 Simple API，启用后面板执行的 pip 命令通过 PIP_INDEX_URL 使用面板（不写入 pip 配置文件）：
+- 包页面从上游索引获取（优先 PEP 691 JSON）后缓存，过期后带 ETag 条件请求，上游不可用时使用旧的缓存；
+- 文件链接改写为面板地址，第一次请求时边从上游下载边返回，同时校验 sha256，按摘要保存在 files/<前两位>/<sha256>，
+  之后各环境重复安装直接从本地磁盘读取，离线也能安装已缓存的包；
+- 缓存文件总大小超过上限时，按最近使用时间（文件修改时间，命中时刷新）删除最久未用的文件。
+"""
+import hashlib
+import html
+import os
+import sys
+import threading
+import time
+from urllib.parse import urljoin, urldefrag, unquote, urlsplit, urlunsplit
+
+from jiefoundation.jsonstore import read_json, write_json, update_json
+
+from .config import proxy_cache_dir, proxy_config_json
+from .inventory import canonicalize_name
+from .pypi import _LinkParser, SIMPLE_ACCEPT
+
+PAGE_TTL = 600
+DEFAULT_UPSTREAM = 'https://pypi.org/simple'
+DEFAULT_MAX_SIZE = 10 * 1024 * 1024 * 1024
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _lock_for(key):
+    with _locks_lock:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def get_proxy_config():
+    """{'upstream': 上游索引地址, 'max_size': 缓存上限字节数}"""
+    return read_json(proxy_config_json, {'upstream': DEFAULT_UPSTREAM, 'max_size': DEFAULT_MAX_SIZE})
+
+
+def set_upstream(upstream):
+    with update_json(proxy_config_json, {'upstream': DEFAULT_UPSTREAM, 'max_size': DEFAULT_MAX_SIZE}) as config:
+        config['upstream'] = upstream.rstrip('/')
+
+
+def enable_proxy(proxy_url, current_index):
+    """
+    启用本地代理，原来的默认索引作为上游
+
+    不修改 pip 的配置文件：面板停止或端口变化后，配置文件中的代理地址会让面板之外的 pip 全部失败。
+    只有面板执行的 pip 命令通过 pip_environ() 使用代理，面板没有运行时也就不会用到代理。
+
+    :param proxy_url: 代理的 Simple API 地址
+    :param current_index: 当前生效的索引地址
+    """
+    proxy_url = proxy_url.rstrip('/')
+    with update_json(proxy_config_json, {'upstream': DEFAULT_UPSTREAM, 'max_size': DEFAULT_MAX_SIZE}) as config:
+        if current_index.rstrip('/') != proxy_url and not _is_local_proxy(current_index):
+            config['upstream'] = current_index.rstrip('/')
+        config['proxy_url'] = proxy_url
+        config['enabled'] = True
+
+
+def disable_proxy():
+    with update_json(proxy_config_json, {'upstream': DEFAULT_UPSTREAM, 'max_size': DEFAULT_MAX_SIZE}) as config:
+        config['enabled'] = False
+
+
+def _is_local_proxy(index_url):
+    """本机任意端口上的代理地址，端口变化后旧地址也能识别"""
+    parts = urlsplit(index_url.rstrip('/'))
+    return parts.hostname in ('127.0.0.1', 'localhost') and parts.path.rstrip('/').endswith('/proxy/simple')
+
+
+def restore_user_index():
+    """
+    旧版本启用代理时把代理地址写入了 pip 的用户配置文件，改回上游地址
+
+    只在面板启动时执行一次，参见 EnvsPythonConfig.ready()
+    """
+    from .pipconfig import pip_config
+
+    index_url = pip_config.get('global.index-url')
+    if index_url and _is_local_proxy(index_url):
+        upstream = get_proxy_config()['upstream']
+        print(f'pip 配置文件中的默认源是本地代理 {index_url}，恢复为 {upstream}')
+        pip_config.set('global.index-url', upstream + '/')
+
+
+def _server_port():
+    """runserver 命令行中的端口，不是通过 runserver 运行时返回 None"""
+    if 'runserver' not in sys.argv:
+        return None
+    for arg in sys.argv[sys.argv.index('runserver') + 1:]:
+        if arg.startswith('-'):
+            continue
+        port = arg.rsplit(':', 1)[-1]
+        return int(port) if port.isdigit() else None
+    return 8000
+
+
+def proxy_index_url():
+    """
+    面板执行 pip 时使用的代理地址，没有启用时返回空字符串
+
+    启动脚本每次可能选择不同的端口，地址中的端口以当前运行的端口为准
+    """
+    config = get_proxy_config()
+    proxy_url = config.get('proxy_url')
+    if not config.get('enabled') or not proxy_url:
+        return ''
+    port = _server_port()
+    if port:
+        parts = urlsplit(proxy_url)
+        proxy_url = urlunsplit(parts._replace(netloc=f'{parts.hostname}:{port}'))
+    return proxy_url + '/'
+
+
+def pip_environ():
+    """
+    面板执行 pip 命令时的环境变量，启用代理时通过 PIP_INDEX_URL 指定代理，未启用时返回 None（继承当前环境）
+
+    命令中再用 -i 指定的索引优先于环境变量
+    """
+    index_url = proxy_index_url()
+    if not index_url:
+        return None
+    return dict(os.environ, PIP_INDEX_URL=index_url)
+
+
+def is_proxy_url(index_url):
+    proxy_url = get_proxy_config().get('proxy_url')
+    return bool(proxy_url) and (index_url.rstrip('/') == proxy_url or _is_local_proxy(index_url))
+
+
+def upstream_of(index_url):
+    """面板自己查询索引时不经过代理，默认索引是本地代理时返回上游地址"""
+    return get_proxy_config()['upstream'] if is_proxy_url(index_url) else index_url
+
+
+def _page_path(project):
+    return os.path.join(proxy_cache_dir, 'simple', f'{project}.json')
+
+
+def _file_path(key):
+    return os.path.join(proxy_cache_dir, 'files', key[:2], key)
+
+
+def _file_key(link):
+    """内容寻址的文件名：上游提供 sha256 时使用摘要，否则使用地址的摘要"""
+    return link['sha256'] or 'url-' + hashlib.sha256(link['url'].encode('utf-8')).hexdigest()
+
+
+def _parse_json_page(data, base_url):
+    links = []
+    for file in data.get('files', []):
+        links.append({
+            'filename': file['filename'],
+            'url': urljoin(base_url, file['url']),
+            'sha256': (file.get('hashes') or {}).get('sha256', ''),
+            'requires_python': file.get('requires-python') or '',
+            'yanked': file.get('yanked') if isinstance(file.get('yanked'), str) else bool(file.get('yanked')),
+        })
+    return links
+
+
+def _parse_html_page(text, base_url):
+    parser = _LinkParser()
+    parser.feed(text)
+    links = []
+    for attrs in parser.links:
+        if not attrs.get('href'):
+            continue
+        url, fragment = urldefrag(urljoin(base_url, attrs['href']))
+        sha256 = fragment[len('sha256='):] if fragment.startswith('sha256=') else ''
+        yanked = attrs.get('data-yanked')
+        links.append({
+            'filename': unquote(url.rstrip('/').rsplit('/', 1)[-1]),
+            'url': url,
+            'sha256': sha256,
+            'requires_python': attrs.get('data-requires-python') or '',
+            'yanked': yanked or ('data-yanked' in attrs),
+        })
+    return links
+
+
+def fetch_project(project, refresh=False):
+    """
+    获取包页面的文件列表，缓存未过期时不访问上游
+
+    :return: 缓存记录 {'fetched_at', 'etag', 'last_modified', 'upstream', 'links': [...]}，上游没有该包时返回 None
+    """
+    import requests
+
+    project = canonicalize_name(project)
+    path = _page_path(project)
+    upstream = get_proxy_config()['upstream'].rstrip('/')
+    with _lock_for(f'page:{project}'):
+        cached = read_json(path) if os.path.exists(path) else None
+        if cached and cached['upstream'] != upstream:
+            cached = None
+        if cached and not refresh and time.time() - cached['fetched_at'] < PAGE_TTL:
+            return cached
+
+        url = f'{upstream}/{project}/'
+        headers = {'Accept': SIMPLE_ACCEPT}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        try:
+            response = requests.get(url, headers=headers, timeout=15)
+        except requests.RequestException as e:
+            if cached:
+                # 离线时使用过期的缓存
+                print(f'获取 {project} 包页面失败，使用缓存: {e}')
+                return cached
+            raise
+        if response.status_code == 304 and cached:
+            cached['fetched_at'] = time.time()
+            write_json(path, cached)
+            return cached
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        if 'json' in response.headers.get('Content-Type', ''):
+            links = _parse_json_page(response.json(), response.url)
+        else:
+            links = _parse_html_page(response.text, response.url)
+        record = {
+            'fetched_at': time.time(),
+            'etag': response.headers.get('ETag', ''),
+            'last_modified': response.headers.get('Last-Modified', ''),
+            'upstream': upstream,
+            'links': links,
+        }
+        write_json(path, record)
+        return record
+
+
+def render_project_page(project, record, file_url):
+    """
+    生成 PEP 503 HTML 页面
+
+    :param file_url: 文件地址生成函数 file_url(filename)
+    """
+    lines = [
+        '<!DOCTYPE html>',
+        '<html><head><meta name="pypi:repository-version" content="1.0">',
+        f'<title>Links for {html.escape(project)}</title></head><body>',
+        f'<h1>Links for {html.escape(project)}</h1>',
+    ]
+    for link in record['links']:
+        href = file_url(link['filename'])
+        if link['sha256']:
+            href += f'#sha256={link["sha256"]}'
+        attrs = f'href="{html.escape(href)}"'
+        if link['requires_python']:
+            attrs += f' data-requires-python="{html.escape(link["requires_python"])}"'
+        if link['yanked']:
+            reason = link['yanked'] if isinstance(link['yanked'], str) else ''
+            attrs += f' data-yanked="{html.escape(reason)}"'
+        lines.append(f'<a {attrs}>{html.escape(link["filename"])}</a><br/>')
+    lines.append('</body></html>')
+    return '\n'.join(lines)
+
+
+def _find_link(project, filename):
+    record = fetch_project(project)
+    if not record:
+        return None
+    link = next((item for item in record['links'] if item['filename'] == filename), None)
+    if link is None:
+        # 包页面缓存可能已经过期，刷新后再找一次
+        record = fetch_project(project, refresh=True)
+        link = next((item for item in (record or {}).get('links', []) if item['filename'] == filename), None)
+    return link
+
+
+def get_file(project, filename):
+    """
+    获取缓存的文件，不存在时从上游下载
+
+    未缓存时不等整个文件下载完：pip 默认的读取超时是 15 秒，大文件（如 torch）先下载完再返回会超时，
+    所以边从上游读取边返回给 pip，同时写入缓存，完整且 sha256 一致时才放入缓存目录。
+
+    :return: (本地文件路径, None)；未缓存时为 (None, (数据块迭代器, 文件大小))，大小未知时为 0；
+        包页面中没有该文件时返回 None
+    :raises requests.RequestException: 连接上游失败
+    """
+    link = _find_link(project, filename)
+    if link is None:
+        return None
+    key = _file_key(link)
+    path = _file_path(key)
+    if os.path.exists(path):
+        # 修改时间作为最近使用时间
+        os.utime(path)
+        return path, None
+    return None, _stream_upstream(link, key, path)
+
+
+def _stream_upstream(link, key, path):
+    """
+    请求上游文件，返回边读取边写入缓存的迭代器
+
+    同一个文件已经有请求在写入缓存时（如 pip 重试），只转发数据不再写入
+    """
+    import requests
+    from jiefoundation.downloader import DEFAULT_HEADERS, CHUNK_SIZE
+
+    response = requests.get(link['url'], headers=DEFAULT_HEADERS, stream=True, timeout=30)
+    try:
+        response.raise_for_status()
+    except requests.RequestException:
+        response.close()
+        raise
+    size = int(response.headers.get('Content-Length') or 0)
+
+    def chunks():
+        lock = _lock_for(f'file:{key}')
+        owner = lock.acquire(blocking=False)
+        temp_path = f'{path}.{threading.get_ident()}.part'
+        f = None
+        try:
+            if owner:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                f = open(temp_path, 'wb')
+            hasher = hashlib.sha256()
+            received = 0
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if not chunk:
+                    continue
+                if f:
+                    f.write(chunk)
+                    hasher.update(chunk)
+                received += len(chunk)
+                yield chunk
+            if f:
+                f.close()
+                f = None
+                if size and received != size:
+                    print(f'{link["filename"]} 下载不完整：{received}/{size}，不缓存')
+                elif link['sha256'] and hasher.hexdigest() != link['sha256'].lower():
+                    print(f'{link["filename"]} sha256 校验失败，不缓存')
+                else:
+                    os.replace(temp_path, path)
+                    evict()
+        finally:
+            response.close()
+            if f:
+                f.close()
+            if owner:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                lock.release()
+
+    return chunks(), size
+
+
+def cache_usage():
+    """已缓存的文件 [(路径, 大小, 最近使用时间), ...]"""
+    files = []
+    root = os.path.join(proxy_cache_dir, 'files')
+    if not os.path.isdir(root):
+        return files
+    for folder in os.scandir(root):
+        if not folder.is_dir():
+            continue
+        for entry in os.scandir(folder.path):
+            if entry.is_file() and not entry.name.endswith(('.part', '.part.json', '.json')):
+                stat = entry.stat()
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+    return files
+
+
+def evict(max_size=None):
+    """
+    缓存超过上限时删除最久未使用的文件
+
+    :return: 删除的文件数
+    """
+    max_size = max_size or get_proxy_config().get('max_size') or DEFAULT_MAX_SIZE
+    files = cache_usage()
+    total = sum(size for path, size, used_at in files)
+    removed = 0
+    for path, size, used_at in sorted(files, key=lambda item: item[2]):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
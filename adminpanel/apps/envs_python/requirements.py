@@ -0,0 +1,259 @@
+"""
+requirements.txt 导出和导入
+
+导出：按 site-packages 元数据生成 pip freeze 格式的列表，可选附带 --hash，
+摘要取自本地 wheelhouse 中的文件和本地缓存代理的包页面（缺少时查询代理的上游）。
+安装后的 RECORD 记录的是解压后各文件的摘要，不是安装包的摘要，不能用于 --hash。
+
+导入：先把全部依赖分组并发 pip download 到公共的 wheelhouse，源码包构建成 wheel（带 --hash 时保留源码包），
+再用一次 pip install --no-index --find-links 离线安装；wheelhouse 在各环境之间共用，
+复制一个环境的包到新的解释器时大部分文件已经在本地。
+"""
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import wheelhouse_dir
+from .inventory import scan_packages, canonicalize_name
+
+# 与 pip freeze 一致，不导出安装工具本身
+FREEZE_EXCLUDE = {'pip', 'setuptools', 'wheel', 'distribute'}
+ARCHIVE_EXTENSIONS = ('.whl', '.tar.gz', '.zip', '.tar.bz2', '.tgz')
+PREFETCH_WORKERS = 4
+
+
+def _direct_url(metadata_path):
+    """
+    PEP 610 direct_url.json，从本地目录、VCS 或网址安装的包
+
+    :return: 'name @ url' 中的 url，通过索引安装时返回 None
+    """
+    path = os.path.join(metadata_path, 'direct_url.json')
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    url = data.get('url')
+    if not url:
+        return None
+    if 'vcs_info' in data:
+        vcs = data['vcs_info']
+        return f"{vcs.get('vcs', 'git')}+{url}@{vcs.get('commit_id', '')}"
+    return url
+
+
+def freeze(python_path):
+    """
+    已安装的包，格式同 pip freeze
+
+    :return: [{'name', 'version', 'requirement', 'direct': 是否直接地址安装}, ...]
+    """
+    items = []
+    for name, package in scan_packages(python_path).items():
+        if canonicalize_name(name) in FREEZE_EXCLUDE:
+            continue
+        url = _direct_url(package['metadata_path'])
+        items.append({
+            'name': name,
+            'version': package['current_version'],
+            'requirement': f'{name} @ {url}' if url else f"{name}=={package['current_version']}",
+            'direct': bool(url),
+        })
+    return items
+
+
+def _archive_version(project, filename):
+    from .pypi import parse_filename_version
+    return parse_filename_version(project, filename)[0]
+
+
+def local_hashes(name, version, folder=wheelhouse_dir):
+    """wheelhouse 中该版本的文件摘要"""
+    from jiefoundation.hashing import file_digests
+
+    project = canonicalize_name(name)
+    hashes = []
+    if not os.path.isdir(folder):
+        return hashes
+    for filename in os.listdir(folder):
+        if not filename.lower().endswith(ARCHIVE_EXTENSIONS):
+            continue
+        if filename.endswith('.whl') and canonicalize_name(filename.split('-', 1)[0]) != project:
+            continue
+        if _archive_version(project, filename) == version:
+            hashes.append(file_digests(os.path.join(folder, filename))['sha256'])
+    return hashes
+
+
+def index_hashes(name, version):
+    """本地缓存代理的包页面中该版本全部文件的摘要，页面缓存不存在或过期时请求上游"""
+    from .pypiproxy import fetch_project
+
+    project = canonicalize_name(name)
+    record = fetch_project(project)
+    if not record:
+        return []
+    return [link['sha256'] for link in record['links']
+            if link['sha256'] and _archive_version(project, link['filename']) == version]
+
+
+def export_requirements(python_path, save_path, with_hashes=False):
+    """
+    导出 requirements.txt
+
+    :param save_path: 保存的目录或文件路径
+    :param with_hashes: 是否附带 --hash，找不到摘要的包不附带（pip 会要求全部都有摘要，此时需要手动处理）
+    :return: (文件路径, 包数量, 缺少摘要的包名列表)
+    """
+    if os.path.isdir(save_path):
+        save_path = os.path.join(save_path, 'requirements.txt')
+    items = freeze(python_path)
+    missing = []
+    hashes = {}
+    if with_hashes:
+        def lookup(item):
+            found = set(local_hashes(item['name'], item['version']))
+            try:
+                found.update(index_hashes(item['name'], item['version']))
+            except Exception as e:
+                print(f"获取 {item['name']} 的摘要失败: {e}")
+            return item['name'], sorted(found)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            hashes = dict(executor.map(lookup, [item for item in items if not item['direct']]))
+        missing = [item['name'] for item in items if not item['direct'] and not hashes.get(item['name'])]
+
+    lines = []
+    for item in items:
+        item_hashes = hashes.get(item['name'])
+        if item_hashes:
+            lines.append(' \\\n'.join([item['requirement']] + [f'    --hash=sha256:{value}' for value in item_hashes]))
+        else:
+            lines.append(item['requirement'])
+    with open(save_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return save_path, len(items), missing
+
+
+def parse_requirements(path):
+    """
+    读取 requirements 文件的逻辑行（合并行尾 \\ 续行，去掉注释和空行）
+
+    :return: (选项行列表, 需求行列表)，-r / -c / -e 等不能预下载的行不包含在内
+    """
+    options = []
+    requirements = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        logical = ''
+        for raw_line in f:
+            line = raw_line.rstrip('\r\n')
+            if line.endswith('\\'):
+                logical += line[:-1] + ' '
+                continue
+            logical += line
+            logical = logical.split(' #', 1)[0].strip()
+            if logical and not logical.startswith('#'):
+                if logical.startswith(('-i', '--index-url', '--extra-index-url', '-f', '--find-links',
+                                       '--trusted-host', '--pre', '--prefer-binary', '--only-binary', '--no-binary')):
+                    options.append(logical)
+                elif not logical.startswith('-'):
+                    requirements.append(logical)
+            logical = ''
+    return options, requirements
+
+
+def _archives(folder):
+    return {name for name in os.listdir(folder) if name.lower().endswith(ARCHIVE_EXTENSIONS)}
+
+
+def import_requirements_task(job, python_path, requirements_path, workers=PREFETCH_WORKERS):
+    """
+    导入 requirements：并发预下载到 wheelhouse，再离线安装
+
+    Returns:
+        {'installed': [{'name', 'from', 'to'}], 'count': 需求数量, 'wheelhouse': 目录,
+         'download_failed': 预下载失败的需求行}
+    """
+    from jiefoundation.jobs import run_command_logged
+    from .pypiproxy import pip_environ
+
+    python_path = str(python_path)
+    env = pip_environ()
+    os.makedirs(wheelhouse_dir, exist_ok=True)
+    wheelhouse = str(wheelhouse_dir)
+    options, requirements = parse_requirements(requirements_path)
+    before = {canonicalize_name(name): package['current_version'] for name, package in scan_packages(python_path).items()}
+    existing = _archives(wheelhouse)
+
+    # 1. 分组并发下载，只下载列出的包本身，依赖在安装时检查
+    job.set_stage('download', f'下载 {len(requirements)} 个包', files_done=0, files_total=len(requirements))
+    done = [0]
+    done_lock = threading.Lock()
+    failed = []
+
+    def on_line(line):
+        if line.startswith(('Saved ', 'File was already downloaded')):
+            with done_lock:
+                done[0] += 1
+                job.update(line, files_done=done[0])
+
+    def download_shard(shard):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            f.write('\n'.join(options + shard) + '\n')
+        try:
+            returncode, lines = run_command_logged(job, [
+                python_path, '-m', 'pip', 'download', '--no-deps', '--progress-bar', 'off',
+                '-d', wheelhouse, '-r', f.name
+            ], env=env, on_line=on_line)
+            if returncode != 0:
+                failed.extend(shard)
+        finally:
+            os.remove(f.name)
+
+    shards = [requirements[index::workers] for index in range(workers) if requirements[index::workers]]
+    with ThreadPoolExecutor(max_workers=max(len(shards), 1)) as executor:
+        list(executor.map(download_shard, shards))
+    job.check_cancelled()
+
+    # 2. 源码包构建成 wheel，离线安装时不再需要构建依赖
+    # 带 --hash 时 pip 以哈希校验模式安装，锁定的是源码包的哈希，构建出的 wheel 通不过校验，保留源码包
+    sdists = sorted(name for name in _archives(wheelhouse) - existing if not name.endswith('.whl'))
+    if sdists and any('--hash' in line for line in requirements):
+        job.log(f'需求文件带有 --hash，{len(sdists)} 个源码包不预先构建')
+    elif sdists:
+        job.set_stage('build', f'构建 {len(sdists)} 个源码包', files_done=0, files_total=len(sdists))
+        for index, name in enumerate(sdists):
+            job.update(f'构建 {name}', files_done=index)
+            returncode, lines = run_command_logged(job, [
+                python_path, '-m', 'pip', 'wheel', '--no-deps', '--progress-bar', 'off',
+                '-w', wheelhouse, os.path.join(wheelhouse, name)
+            ], env=env)
+            if returncode == 0:
+                os.remove(os.path.join(wheelhouse, name))
+        job.update(files_done=len(sdists))
+
+    # 3. 离线安装，缺少依赖时补充下载后再装一次
+    install_cmd = [python_path, '-m', 'pip', 'install', '--no-index', '--find-links', wheelhouse,
+                   '--progress-bar', 'off', '-r', str(requirements_path)]
+    job.set_stage('install', '离线安装')
+    returncode, lines = run_command_logged(job, install_cmd)
+    if returncode != 0:
+        job.set_stage('dependencies', '补充下载缺少的依赖')
+        run_command_logged(job, [python_path, '-m', 'pip', 'download', '--progress-bar', 'off',
+                                 '-d', wheelhouse, '-r', str(requirements_path)], env=env)
+        job.set_stage('install', '离线安装')
+        returncode, lines = run_command_logged(job, install_cmd)
+    if returncode != 0:
+        errors = '\n'.join(line for line in lines if line.startswith('ERROR')) or (lines[-1] if lines else '')
+        raise RuntimeError(f'安装失败：{errors}')
+
+    after = {canonicalize_name(name): package['current_version'] for name, package in scan_packages(python_path).items()}
+    installed = [{'name': key, 'from': before.get(key, ''), 'to': version}
+                 for key, version in after.items() if before.get(key) != version]
+    job.update(f'导入完成：安装 {len(installed)} 个包~')
+    return {'installed': installed, 'count': len(requirements), 'wheelhouse': wheelhouse, 'download_failed': failed}
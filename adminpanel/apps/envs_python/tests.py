@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from http.server import HTTPServer, ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from . import pypiproxy
+from .pypi import parse_filename_version, PypiResolver
+
+# 本地替代索引：项目名 -> (ETag, Simple API 页面，HTML 或 PEP 691 JSON)
+INDEX_PAGES = {
+    'zope-interface': ('"zope-v1"', '''<!DOCTYPE html><html><body>
+<a href="/files/zope.interface-5.5.2.tar.gz#sha256=aa">zope.interface-5.5.2.tar.gz</a>
+<a href="/files/zope.interface-6.0.tar.gz#sha256=bb" data-requires-python="&gt;=3.7">zope.interface-6.0.tar.gz</a>
+<a href="/files/zope.interface-7.0b1.tar.gz#sha256=cc">zope.interface-7.0b1.tar.gz</a>
+</body></html>'''),
+    'typing-extensions': ('"typing-v1"', json.dumps({
+        'meta': {'api-version': '1.1'},
+        'name': 'typing-extensions',
+        'files': [
+            {'filename': 'typing_extensions-4.12.2-py3-none-any.whl', 'url': '/f/a.whl', 'hashes': {}},
+            {'filename': 'typing_extensions-4.12.2.tar.gz', 'url': '/f/a.tar.gz', 'hashes': {}},
+            {'filename': 'typing_extensions-4.13.0.tar.gz', 'url': '/f/b.tar.gz', 'hashes': {}, 'yanked': True},
+        ],
+    })),
+}
+
+
+FILES = {'bigpkg-1.0-py3-none-any.whl': os.urandom(600 * 1024)}
+INDEX_PAGES['bigpkg'] = ('"big-v1"', '<a href="/files/bigpkg-1.0-py3-none-any.whl#sha256={}">bigpkg-1.0-py3-none-any.whl</a>'
+                         '<a href="/files/bigpkg-1.0.tar.gz#sha256={}">bigpkg-1.0.tar.gz</a>'.format(
+                             hashlib.sha256(FILES['bigpkg-1.0-py3-none-any.whl']).hexdigest(), '0' * 64))
+FILES['bigpkg-1.0.tar.gz'] = b'sdist with a wrong digest'
+
+
+class _IndexHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        if self.path.startswith('/files/'):
+            return self._send_file()
+        project = self.path.strip('/').split('/')[-1]
+        etag, body = INDEX_PAGES.get(project, (None, None))
+        self.requests.append((project, self.headers.get('If-None-Match')))
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/vnd.pypi.simple.v1+json' if body.startswith('{') else 'text/html')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_file(self):
+        data = FILES.get(self.path.rsplit('/', 1)[-1])
+        if data is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ParseFilenameVersionTests(SimpleTestCase):
+
+    def test_hyphenated_sdist(self):
+        self.assertEqual(parse_filename_version('zope-interface', 'zope.interface-6.0.tar.gz'), ('6.0', 'sdist'))
+        self.assertEqual(parse_filename_version('zope-interface', 'zope_interface-7.0.1.tar.gz'), ('7.0.1', 'sdist'))
+        self.assertEqual(parse_filename_version('zope-interface', 'zope-interface-5.5.2.zip'), ('5.5.2', 'sdist'))
+
+    def test_name_is_escaped(self):
+        self.assertEqual(parse_filename_version('zope-interface', 'zopexinterface-6.0.tar.gz'), (None, None))
+        self.assertEqual(parse_filename_version('c++lib', 'c++lib-1.0.tar.gz'), ('1.0', 'sdist'))
+
+    def test_wheel(self):
+        self.assertEqual(
+            parse_filename_version('typing-extensions', 'typing_extensions-4.12.2-py3-none-any.whl'),
+            ('4.12.2', 'bdist_wheel')
+        )
+
+
+class PypiResolverTests(SimpleTestCase):
+    """用本地 http.server 作为替代索引"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(('127.0.0.1', 0), _IndexHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.index_url = f'http://127.0.0.1:{cls.server.server_port}/simple'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _IndexHandler.requests = []
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, True)
+        self.resolver = PypiResolver(cache_file=os.path.join(folder, 'cache.json'), workers=4, timeout=5)
+
+    def test_sdist_only_hyphenated_project(self):
+        outdated = self.resolver.outdated(self.index_url, {'zope.interface': '5.5.2'}, python_version='3.12.1')
+        self.assertEqual(outdated, {'zope.interface': {'latest_version': '6.0', 'latest_filetype': 'sdist'}})
+
+    def test_requires_python_filter(self):
+        outdated = self.resolver.outdated(self.index_url, {'zope.interface': '5.5.2'}, python_version='3.6.15')
+        self.assertEqual(outdated, {})
+
+    def test_json_page_skips_yanked(self):
+        resolved = self.resolver.resolve(self.index_url, ['typing_extensions'])
+        self.assertEqual(resolved['typing-extensions'], {'4.12.2': [['bdist_wheel', ''], ['sdist', '']]})
+
+    def test_missing_project(self):
+        self.assertEqual(self.resolver.resolve(self.index_url, ['not-there']), {'not-there': {}})
+
+    def test_cache_and_etag_revalidation(self):
+        first = self.resolver.resolve(self.index_url, ['zope-interface', 'typing-extensions'])
+        self.assertEqual(sorted(_IndexHandler.requests), [('typing-extensions', None), ('zope-interface', None)])
+
+        # 缓存未过期时不发送请求
+        self.assertEqual(self.resolver.resolve(self.index_url, ['zope-interface']), {
+            'zope-interface': first['zope-interface']})
+        self.assertEqual(len(_IndexHandler.requests), 2)
+
+        # 强制刷新时带 If-None-Match，304 时继续使用缓存的版本
+        refreshed = self.resolver.resolve(self.index_url, ['zope-interface'], refresh=True)
+        self.assertEqual(_IndexHandler.requests[-1], ('zope-interface', '"zope-v1"'))
+        self.assertEqual(refreshed['zope-interface'], first['zope-interface'])
+        self.assertIn('6.0', refreshed['zope-interface'])
+
+
+class ProxyFileTests(SimpleTestCase):
+    """缓存代理未命中时边下载边返回，完整且校验通过后才放入缓存"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _IndexHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, True)
+        for name, value in (('proxy_cache_dir', os.path.join(folder, 'proxy')),
+                            ('proxy_config_json', os.path.join(folder, 'proxy.json'))):
+            patcher = mock.patch.object(pypiproxy, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        pypiproxy.set_upstream(f'http://127.0.0.1:{self.server.server_port}/simple')
+
+    def test_stream_then_cache(self):
+        path, stream = pypiproxy.get_file('bigpkg', 'bigpkg-1.0-py3-none-any.whl')
+        self.assertIsNone(path)
+        chunks, size = stream
+        self.assertEqual(size, len(FILES['bigpkg-1.0-py3-none-any.whl']))
+        first = next(chunks)
+        self.assertTrue(first)
+        # 数据块已经开始返回时缓存中还没有该文件
+        self.assertEqual(pypiproxy.cache_usage(), [])
+        data = first + b''.join(chunks)
+        self.assertEqual(data, FILES['bigpkg-1.0-py3-none-any.whl'])
+
+        path, stream = pypiproxy.get_file('bigpkg', 'bigpkg-1.0-py3-none-any.whl')
+        self.assertIsNone(stream)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_checksum_mismatch_not_cached(self):
+        path, (chunks, size) = pypiproxy.get_file('bigpkg', 'bigpkg-1.0.tar.gz')
+        self.assertEqual(b''.join(chunks), FILES['bigpkg-1.0.tar.gz'])
+        self.assertEqual(pypiproxy.cache_usage(), [])
+        path, stream = pypiproxy.get_file('bigpkg', 'bigpkg-1.0.tar.gz')
+        self.assertIsNone(path)
+        stream[0].close()
+
+    def test_unknown_file(self):
+        self.assertIsNone(pypiproxy.get_file('bigpkg', 'bigpkg-2.0.tar.gz'))
@@ -7,7 +7,13 @@ app_name = 'envs_python'
 urlpatterns = [
     path('pypi/list/', views.PypiListView.as_view(), name='pypi_list'),
     path('pypi/set/<str:name>/', views.SetPypiDefaultView.as_view(), name='set_pypi'),
+    path('pypi/proxy/enable/', views.EnablePypiProxyView.as_view(), name='enable_pypi_proxy'),
+    path('pypi/proxy/disable/', views.DisablePypiProxyView.as_view(), name='disable_pypi_proxy'),
+    path('proxy/simple/', views.ProxySimpleIndexView.as_view(), name='proxy_simple'),
+    path('proxy/simple/<str:project>/', views.ProxySimpleProjectView.as_view(), name='proxy_project'),
+    path('proxy/files/<str:project>/<str:filename>', views.ProxyFileView.as_view(), name='proxy_file'),
     path('package/search/', views.PackageSearchView.as_view(), name='package_search'),
+    path('package/suggest/', views.PackageSuggestView.as_view(), name='package_suggest'),
     # path('package/detail/<str:package>/', views.PackageDetailView.as_view(), name='package_detail'),
 
 ]
\ No newline at end of file
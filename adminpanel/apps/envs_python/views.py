@@ -1,7 +1,10 @@
+import html
 import json
 import os.path
 from  django.conf import settings
-from django.urls import reverse_lazy
+from django.http import HttpResponse, HttpResponsePermanentRedirect, FileResponse, StreamingHttpResponse, Http404
+from django.urls import reverse, reverse_lazy
+from django.views import View
 from django.views.generic.base import TemplateView, RedirectView
 from django.views.generic.edit import FormView
 from django.contrib import messages
@@ -10,16 +13,20 @@ from panelcore.mixin import RuntimeEnvsMixin
 
 from jiefoundation.utils import run_command
 from jiefoundation.jiebase import JsonView
+from jiefoundation.jsonstore import read_json
 
-from .config import project_python_path
 from .helper import get_package_list, get_pypi_list
-from .forms import PackageInstallForm
+from .inventory import canonicalize_name
+from .depgraph import get_dependency_graph
+from .config import proxy_cache_dir
+from .pypiproxy import (get_proxy_config, set_upstream, enable_proxy, disable_proxy, pip_environ,
+                        cache_usage, fetch_project, render_project_page, get_file, DEFAULT_MAX_SIZE)
+from .forms import PackageInstallForm, PackagePipExportForm, PackageRequirementsImportForm
 
 app_name = 'envs_python'
 
 def get_category():
-    with open(settings.MENU_MAIN_JSON, 'r', encoding='utf-8') as f:
-        menu_main = json.load(f)
+    menu_main = read_json(settings.MENU_MAIN_JSON)
     return menu_main['runtime_envs']['children']['envs_python']['children']['category']
 
 
@@ -38,6 +45,7 @@ class PypiListView(EnvsPythonMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         context['page_title'] = '全局PyPi设置'
         context['pypi_list'] = get_pypi_list()
+        context['proxy'] = get_proxy_info(self.request)
         return context
 
 
@@ -47,10 +55,105 @@ class SetPypiDefaultView(RedirectView):
     def get(self, request, *args, **kwargs):
         name = self.kwargs.get('name')
         get_pypi_info = get_pypi_list()[name]['url']
-        result = run_command(f"{str(project_python_path)} -m pip config set global.index-url {get_pypi_info}", shell=True)
+        from .pipconfig import pip_config
+        pip_config.set('global.index-url', get_pypi_info)
+        # 之后再启用本地缓存代理时以选择的源作为上游
+        set_upstream(get_pypi_info)
         return super().get(request, *args, **kwargs)
 
 
+def get_proxy_url(request):
+    """
+    本地缓存代理的 Simple API 地址，使用 127.0.0.1 访问，pip 不需要配置 trusted-host
+    """
+    return f'http://127.0.0.1:{request.get_port()}{reverse("envs_python:proxy_simple")}'
+
+
+def get_proxy_info(request):
+    config = get_proxy_config()
+    files = cache_usage()
+    return {
+        'url': get_proxy_url(request),
+        'upstream': config['upstream'],
+        'enabled': bool(config.get('enabled')),
+        'count': len(files),
+        'size': sum(size for path, size, used_at in files),
+        'max_size': config.get('max_size') or DEFAULT_MAX_SIZE,
+    }
+
+
+class EnablePypiProxyView(RedirectView):
+    """启用本地缓存代理，面板执行的 pip 命令使用代理，pip 的配置文件不变"""
+    url = reverse_lazy(f'{app_name}:pypi_list')
+
+    def get(self, request, *args, **kwargs):
+        from .helper import get_default_pypi
+
+        enable_proxy(get_proxy_url(request), get_default_pypi())
+        messages.success(request, '已启用本地缓存代理~')
+        return super().get(request, *args, **kwargs)
+
+
+class DisablePypiProxyView(RedirectView):
+    url = reverse_lazy(f'{app_name}:pypi_list')
+
+    def get(self, request, *args, **kwargs):
+        disable_proxy()
+        messages.success(request, '已停用本地缓存代理~')
+        return super().get(request, *args, **kwargs)
+
+
+class ProxySimpleIndexView(View):
+    """代理根页面，只列出已缓存的包"""
+    def get(self, request, *args, **kwargs):
+        projects = sorted(name[:-5] for name in os.listdir(os.path.join(proxy_cache_dir, 'simple'))
+                          if name.endswith('.json')) if os.path.isdir(os.path.join(proxy_cache_dir, 'simple')) else []
+        links = '\n'.join(f'<a href="{html.escape(name)}/">{html.escape(name)}</a><br/>' for name in projects)
+        return HttpResponse(f'<!DOCTYPE html>\n<html><body>\n{links}\n</body></html>')
+
+
+class ProxySimpleProjectView(View):
+    def get(self, request, *args, **kwargs):
+        project = self.kwargs.get('project')
+        canonical = canonicalize_name(project)
+        if project != canonical:
+            return HttpResponsePermanentRedirect(reverse(f'{app_name}:proxy_project', kwargs={'project': canonical}))
+        try:
+            record = fetch_project(canonical)
+        except Exception as e:
+            return HttpResponse(f'获取 {canonical} 失败: {e}', status=502, content_type='text/plain; charset=utf-8')
+        if record is None:
+            raise Http404(f'{canonical} 不存在')
+
+        def file_url(filename):
+            return reverse(f'{app_name}:proxy_file', kwargs={'project': canonical, 'filename': filename})
+
+        return HttpResponse(render_project_page(canonical, record, file_url),
+                            content_type='text/html; charset=utf-8')
+
+
+class ProxyFileView(View):
+    def get(self, request, *args, **kwargs):
+        filename = self.kwargs.get('filename')
+        try:
+            result = get_file(self.kwargs.get('project'), filename)
+        except Exception as e:
+            return HttpResponse(f'下载 {filename} 失败: {e}', status=502, content_type='text/plain; charset=utf-8')
+        if result is None:
+            raise Http404(f'{filename} 不存在')
+        path, stream = result
+        if path:
+            return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename,
+                                content_type='application/octet-stream')
+        # 未缓存：边从上游下载边返回
+        chunks, size = stream
+        response = StreamingHttpResponse(chunks, content_type='application/octet-stream')
+        if size:
+            response['Content-Length'] = str(size)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 class PythonRunMixin:
     python_path = None
     app_namespace = None
@@ -75,12 +178,40 @@ class PackageListMixin(PythonRunMixin, TemplateView):
         try:
             context['app_namespace'] = self.get_app_namespace()
             context['packages'] = get_package_list(self.get_python_path())
+            graph = get_dependency_graph(self.get_python_path())
+            for name, package in context['packages'].items():
+                package['required_by'] = graph['packages'].get(canonicalize_name(name), {}).get('required_by', [])
+            context['dependency_problems'] = graph['problems']
+            context['disk_usage'] = {
+                'total': sum(package['size'] or 0 for package in context['packages'].values()),
+                'pycache': sum(package['pycache'] or 0 for package in context['packages'].values()),
+            }
+            context['sort'] = self.request.GET.get('sort', '')
+            if context['sort'] == 'size':
+                context['packages'] = dict(sorted(
+                    context['packages'].items(), key=lambda item: item[1]['size'] or 0, reverse=True
+                ))
             context['env_info'] = self.get_env_info()
+            context['export_form'] = PackagePipExportForm()
+            context['import_form'] = PackageRequirementsImportForm()
         except Exception as e:
             messages.warning(self.request, f"显示包列表失败! </br>错误信息为：{e}")
         return context
 
 
+class PackageLatestMixin(PythonRunMixin, JsonView):
+    """
+    异步获取可升级包的最新版本，refresh=1 时忽略缓存重新检查
+    """
+    def get(self, request, *args, **kwargs):
+        from .inventory import get_latest_versions
+        try:
+            latest_versions = get_latest_versions(self.get_python_path(), refresh=request.GET.get('refresh') == '1')
+        except Exception as e:
+            return self.render_to_json_error(f'获取最新版本失败：{e}')
+        return self.render_to_json_response({'status': 'success', 'packages': latest_versions})
+
+
 class PackageInstallMixin(PythonRunMixin, FormView):
     template_name = f'{app_name}/package_install.html'
     form_class = PackageInstallForm
@@ -95,6 +226,20 @@ class PackageInstallMixin(PythonRunMixin, FormView):
         context['is_path'] = os.path.exists(self.get_python_path())
         return context
 
+    def submit_compile(self, python_path):
+        """在后台预编译 site-packages 中新安装的文件"""
+        from jiefoundation.jobs import submit_job
+        from jiefoundation.pyworker import WorkerError
+        from .bytecompile import compile_task, site_packages_dirs
+
+        try:
+            paths = site_packages_dirs(python_path)
+        except (WorkerError, OSError) as e:
+            print(f'获取 site-packages 目录失败，跳过预编译：{e}')
+            return
+        submit_job(f'{app_name}:compile:{python_path}', '预编译 site-packages', compile_task, python_path, paths)
+        messages.info(self.request, '已在后台预编译新安装的包~')
+
     def form_valid(self, form):
         package_name = form.cleaned_data.get('package_name')
         package_version = form.cleaned_data.get('package_version')
@@ -103,23 +248,29 @@ class PackageInstallMixin(PythonRunMixin, FormView):
         from .helper import get_pypi_list
 
         pypi_url = get_pypi_list('pypi')['url']
+        compile_pyc = form.cleaned_data.get('compile_pyc')
         cmd = [python_path, "-m", 'pip', 'install']
+        if compile_pyc:
+            # pip 逐个文件编译，改为安装后在后台并行编译
+            cmd.append('--no-compile')
         if package_version == 'latest':
             cmd.append(package_name)
         else:
             cmd.append(f"{package_name}=={package_version}")
         print('开始安装指定包。')
-        result = run_command(cmd)
+        result = run_command(cmd, env=pip_environ())
         if result.returncode == 0:
             print('包安装成功~')
+            if compile_pyc: self.submit_compile(python_path)
             return super().form_valid(form)
         else:
             print('设置的源安装不成功。尝试使用官方安装源。。。')
             cmd.append('-i')
             cmd.append(pypi_url)
-            result = run_command(cmd)
+            result = run_command(cmd, env=pip_environ())
             if result.returncode == 0:
                 print('官方源 包安装成功~')
+                if compile_pyc: self.submit_compile(python_path)
                 return super().form_valid(form)
             else:
                 print('安装失败~')
@@ -132,26 +283,37 @@ class PackageInstallMixin(PythonRunMixin, FormView):
 
 
 class PackageSearchView(JsonView):
+    """
+    获取包的可用版本，数据来自按包缓存的 Simple API 查询结果
+    """
     def get(self, request, *args, **kwargs):
-        package_name = request.GET.get('package_name')
-        if package_name:
-            cmd = [project_python_path, "-m", 'pip', 'index', 'versions', package_name]
-            result = run_command(cmd)
-            if result.returncode == 0:
-                context = {'status': 'success'}
-                version_option_html = '<option value="latest">自动适配最新版本</option>'
-                version_str = ''
-                for line in result.stdout.split('\n'):
-                    if line.startswith('Available versions'):
-                        version_str = line.split(':')[1].strip()
-                        break
-                for version in version_str.split(','):
-                    version_option_html += f'<option value="{version}">{version}</option>'
-                context['message'] = version_option_html
-                return self.render_to_json_response(context)
-            else:
-                return self.render_to_json_error(message=f"没有找到 {package_name} 名称的包! </br>错误信息为：{result.stderr}")
-        return self.render_to_json_error(message="参数错误")
+        from .pypi import pypi_resolver, sort_versions
+        from .helper import get_query_pypi
+
+        package_name = request.GET.get('package_name', '').strip()
+        if not package_name:
+            return self.render_to_json_error(message="参数错误")
+        try:
+            releases = pypi_resolver.resolve(get_query_pypi(), [package_name]).get(canonicalize_name(package_name))
+        except Exception as e:
+            return self.render_to_json_error(message=f"查询 {package_name} 失败! </br>错误信息为：{e}")
+        if not releases:
+            return self.render_to_json_error(message=f"没有找到 {package_name} 名称的包!")
+        return self.render_to_json_response({'status': 'success', 'versions': sort_versions(releases)})
+
+
+class PackageSuggestView(JsonView):
+    """
+    包名自动补全，包名索引不存在或过期时在后台更新
+    """
+    def get(self, request, *args, **kwargs):
+        from .nameindex import get_name_index, ensure_name_index
+        from .helper import get_query_pypi
+
+        index_url = get_query_pypi()
+        job = ensure_name_index(index_url)
+        names = get_name_index(index_url).search(request.GET.get('q', ''), limit=20)
+        return self.render_to_json_response({'status': 'success', 'names': names, 'building': bool(job)})
 
 
 class PackageUninstallMixin(PythonRunMixin, RedirectView):
@@ -187,24 +349,71 @@ class PackageUpgradeMixin(PythonRunMixin, RedirectView):
         return super().get(request, *args, **kwargs)
 
 
-from .forms import PackagePipExportForm
-class PackagePipExportView(PythonRunMixin, FormView):
-    form_class = PackagePipExportForm
-    template_name = 'envs_python/package_export.html'
+class PackageBatchUpgradeMixin(PythonRunMixin, JsonView):
+    """
+    批量升级选中的包，没有选择时升级全部可升级的包，在后台任务中执行
+    """
+    def post(self, request, *args, **kwargs):
+        from jiefoundation.jobs import submit_job
+        from .helper import batch_upgrade_task, resolve_installed_names
 
-    def get_success_url(self):
-        return reverse_lazy(f'{self.get_app_namespace()}:package_list', kwargs={'version': self.kwargs.get('version')})
+        python_path = self.get_python_path()
+        if not python_path or not os.path.exists(python_path):
+            return self.render_to_json_error('Python解释器路径不存在~')
+        packages, invalid = resolve_installed_names(python_path, request.POST.getlist('packages'))
+        if invalid:
+            return self.render_to_json_error(f'以下包未安装或名称无效：{", ".join(invalid)}')
+        title = f'升级 {len(packages)} 个包' if packages else '升级全部可升级的包'
+        job = submit_job(
+            f'envs_python:upgrade:{python_path}', title, batch_upgrade_task, python_path, packages
+        )
+        return self.render_to_json_job(job)
+
+
+class PackageExportMixin(PythonRunMixin, JsonView):
+    """
+    导出 requirements.txt
+    """
+    def post(self, request, *args, **kwargs):
+        from .requirements import export_requirements
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['app_namespace'] = self.get_app_namespace()
-        context['env_info'] = self.get_env_info()
-        return context
+        python_path = self.get_python_path()
+        if not python_path or not os.path.exists(python_path):
+            return self.render_to_json_error('Python解释器路径不存在~')
+        form = PackagePipExportForm(request.POST)
+        if not form.is_valid():
+            return self.render_to_json_error(' '.join(error for errors in form.errors.values() for error in errors))
+        try:
+            save_path, count, missing = export_requirements(
+                python_path, form.cleaned_data['save_path'], form.cleaned_data['with_hashes']
+            )
+        except Exception as e:
+            return self.render_to_json_error(f'导出失败：{e}')
+        message = f'已导出 {count} 个包到 {save_path}'
+        if missing:
+            message += f'，以下包没有找到摘要：{", ".join(missing)}'
+        return self.render_to_json_success(message)
+
+
+class PackageImportMixin(PythonRunMixin, JsonView):
+    """
+    按 requirements 文件安装，先并发下载到本地 wheelhouse 再离线安装，在后台任务中执行
+    """
+    def post(self, request, *args, **kwargs):
+        from jiefoundation.jobs import submit_job
+        from .requirements import import_requirements_task
 
-    def form_valid(self, form):
-        save_path = form.cleaned_data.get('save_path')
         python_path = self.get_python_path()
-        cmd = [python_path, "-m", 'pip', 'freeze ', '>', f'{save_path}requirements.txt']
+        if not python_path or not os.path.exists(python_path):
+            return self.render_to_json_error('Python解释器路径不存在~')
+        form = PackageRequirementsImportForm(request.POST)
+        if not form.is_valid():
+            return self.render_to_json_error(' '.join(error for errors in form.errors.values() for error in errors))
+        job = submit_job(
+            f'envs_python:import:{python_path}', '导入包列表', import_requirements_task,
+            python_path, form.cleaned_data['requirements_file']
+        )
+        return self.render_to_json_job(job)
 
 
 class PackageDetailView(JsonView):
@@ -14,6 +14,7 @@ config_file_path =  settings.DATA_ROOT / 'envs_python_installer' / 'config.json'
 project_python_path = settings.PYTHON_ROOT / 'python.exe'
 tools_pip_path = settings.PYTHON_ROOT / 'Scripts' / 'pip.exe'
 python_cache_dir = app_base_path / 'cache'
+interpreters_cache_path = python_cache_dir / 'interpreters.json'
 
 py_ini_path = os.path.join(os.environ.get('LOCALAPPDATA'), 'py.ini')
 
@@ -0,0 +1,197 @@
+"""
+已安装的 Python 解释器发现
+
+不再执行 py --list-paths 和每个解释器的 python -V：
+- 直接枚举 PEP 514 注册表项 Software\\Python\\PythonCore（HKCU、HKLM 64 位和 32 位视图）；
+- 每个解释器最多执行一次探测脚本，一次输出版本、位数、prefix、site-packages 和 pip 版本，
+  结果按 python.exe 的大小和修改时间缓存在磁盘上，文件未变化时不启动任何进程；
+- pip 升级不会改变 python.exe，命中缓存时从 site-packages 下 pip 的 dist-info 重新读取 pip 版本；
+- py launcher 的默认版本按 launcher 的规则读取 PY_PYTHON 环境变量和 py.ini，不执行 py -V。
+"""
+import configparser
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from jiefoundation.utils import run_command
+from jiefoundation.jsonstore import read_json, update_json
+
+from .config import interpreters_cache_path, py_ini_path, py_path
+
+PYTHON_CORE_KEY = r'Software\Python\PythonCore'
+
+PROBE_SCRIPT = (
+    "import json, platform, struct, sys, sysconfig\n"
+    "try:\n"
+    "    from importlib.metadata import version\n"
+    "    pip_version = version('pip')\n"
+    "except Exception:\n"
+    "    try:\n"
+    "        import pip\n"
+    "        pip_version = pip.__version__\n"
+    "    except Exception:\n"
+    "        pip_version = ''\n"
+    "print(json.dumps({'version': platform.python_version(), 'arch': struct.calcsize('P') * 8, "
+    "'prefix': sys.prefix, 'site_packages': sysconfig.get_paths()['purelib'], 'pip_version': pip_version}))"
+)
+
+_lock = threading.Lock()
+
+
+def registry_interpreters():
+    """
+    枚举注册表中登记的解释器
+
+    :return: [{'tag', 'executable', 'folder', 'registry'}, ...]，同一个 python.exe 只出现一次
+    """
+    import winreg
+
+    views = [
+        ('HKCU', winreg.HKEY_CURRENT_USER, 0),
+        ('HKLM', winreg.HKEY_LOCAL_MACHINE, winreg.KEY_WOW64_64KEY),
+        ('HKLM-32', winreg.HKEY_LOCAL_MACHINE, winreg.KEY_WOW64_32KEY),
+    ]
+    interpreters = []
+    seen = set()
+    for registry, hive, view in views:
+        try:
+            core = winreg.OpenKey(hive, PYTHON_CORE_KEY, 0, winreg.KEY_READ | view)
+        except OSError:
+            continue
+        with core:
+            index = 0
+            while True:
+                try:
+                    tag = winreg.EnumKey(core, index)
+                except OSError:
+                    break
+                index += 1
+                try:
+                    with winreg.OpenKey(core, rf'{tag}\InstallPath') as install_key:
+                        folder = winreg.QueryValueEx(install_key, '')[0]
+                        try:
+                            executable = winreg.QueryValueEx(install_key, 'ExecutablePath')[0]
+                        except OSError:
+                            executable = os.path.join(folder, 'python.exe')
+                except OSError:
+                    continue
+                key = os.path.normcase(os.path.abspath(executable))
+                if key in seen or not os.path.exists(executable):
+                    continue
+                seen.add(key)
+                interpreters.append({
+                    'tag': tag,
+                    'executable': executable,
+                    'folder': os.path.dirname(executable),
+                    'registry': registry,
+                })
+    return interpreters
+
+
+def _signature(executable):
+    stat = os.stat(executable)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _installed_pip_version(site_packages):
+    """从 site-packages 下 pip 的 dist-info 读取 pip 版本，找不到时返回 None"""
+    try:
+        entries = os.listdir(site_packages)
+    except OSError:
+        return None
+    for entry in entries:
+        name, ext = os.path.splitext(entry)
+        if ext.lower() != '.dist-info' or name.split('-', 1)[0].lower() != 'pip':
+            continue
+        try:
+            with open(os.path.join(site_packages, entry, 'METADATA'), encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if not line.strip():
+                        break
+                    if line.lower().startswith('version:'):
+                        return line.split(':', 1)[1].strip()
+        except OSError:
+            pass
+        return name.split('-', 1)[1] if '-' in name else None
+    return None
+
+
+def probe_interpreter(executable):
+    """
+    获取解释器信息，python.exe 未变化时使用缓存，pip 版本每次从 dist-info 重新读取
+
+    :return: {'version', 'arch', 'prefix', 'site_packages', 'pip_version'}，探测失败时返回 None
+    """
+    key = os.path.normcase(os.path.abspath(executable))
+    signature = _signature(executable)
+    cached = read_json(interpreters_cache_path, {}).get(key)
+    if cached and cached['signature'] == signature:
+        probe = dict(cached['probe'])
+        pip_version = _installed_pip_version(probe['site_packages'])
+        if pip_version is not None:
+            probe['pip_version'] = pip_version
+        return probe
+    result = run_command([executable, '-c', PROBE_SCRIPT])
+    if result.returncode != 0:
+        print(f'获取解释器 {executable} 信息失败: {result.stderr}')
+        return None
+    try:
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        print(f'解析解释器 {executable} 信息失败: {result.stdout}')
+        return None
+    with update_json(interpreters_cache_path, {}) as data:
+        data[key] = {'signature': signature, 'probe': probe}
+    return probe
+
+
+def _py_ini_default():
+    """py.ini 中 [defaults] python 的值，用户目录下的配置优先"""
+    for path in (py_ini_path, os.path.join(os.path.dirname(py_path), 'py.ini')):
+        if not path or not os.path.exists(path):
+            continue
+        parser = configparser.ConfigParser()
+        try:
+            parser.read(path, encoding='utf-8')
+        except (configparser.Error, UnicodeDecodeError):
+            continue
+        if parser.has_option('defaults', 'python'):
+            return parser.get('defaults', 'python').strip()
+    return ''
+
+
+def py_default_version(versions):
+    """
+    py launcher 默认使用的版本：PY_PYTHON 环境变量 > py.ini > 最新版本
+
+    :param versions: 已安装的版本号列表，如 ['3.12.1', '3.11.7']
+    :return: 其中被选中的版本号，没有时返回空字符串
+    """
+    requested = os.environ.get('PY_PYTHON') or _py_ini_default()
+    # 3.12-32 这样的写法只取版本部分
+    requested = requested.split('-', 1)[0]
+
+    def sort_key(version):
+        return tuple(int(part) if part.isdigit() else 0 for part in version.split('.'))
+
+    candidates = sorted(versions, key=sort_key, reverse=True)
+    if requested:
+        matched = [version for version in candidates
+                   if version == requested or version.startswith(requested + '.')]
+        if matched:
+            return matched[0]
+    return candidates[0] if candidates else ''
+
+
+def discover_interpreters():
+    """
+    已安装的解释器及其信息，未缓存的解释器并发探测
+
+    :return: [{'tag', 'executable', 'folder', 'registry', 'version', 'arch', 'prefix', 'site_packages', 'pip_version'}]
+    """
+    interpreters = registry_interpreters()
+    with _lock:
+        with ThreadPoolExecutor(max_workers=max(min(len(interpreters), 8), 1)) as executor:
+            probes = list(executor.map(lambda item: probe_interpreter(item['executable']), interpreters))
+    return [dict(item, **probe) for item, probe in zip(interpreters, probes) if probe]
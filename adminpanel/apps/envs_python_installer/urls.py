@@ -20,6 +20,10 @@ urlpatterns = [
     path('package/install/', views.PackageInstallView.as_view(), name='package_install'),
     path('package/uninstall/<str:package>/', views.PackageUninstallView.as_view(), name='package_uninstall'),
     path('package/upgrade/<str:package>/', views.PackageUpgradeView.as_view(), name='package_upgrade'),
+    path('package/latest/', views.PackageLatestView.as_view(), name='package_latest'),
+    path('package/upgrade/', views.PackageBatchUpgradeView.as_view(), name='package_batch_upgrade'),
+    path('package/export/', views.PackageExportView.as_view(), name='package_export'),
+    path('package/import/', views.PackageImportView.as_view(), name='package_import'),
 
     # path('package/list/<str:version>/', views.PackageListView.as_view(), name='package_list'),
     # path('package/install/<str:version>/', views.PackageInstallView.as_view(), name='package_install'),
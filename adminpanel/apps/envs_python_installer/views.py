@@ -16,6 +16,11 @@ from jiefoundation.utils import (
 )
 from panelcore.helper import set_reg_user_env, get_reg_user_env
 from jiefoundation.jiebase import JsonView
+from jiefoundation.jobs import submit_job
+from jiefoundation.pyworker import worker_pool
+from jiefoundation.downloader import download, DownloadError, ChecksumError
+from jiefoundation.hashing import verify_file
+from jiefoundation.jsonstore import read_json, write_json, update_json
 from apps.envs_python.helper import get_default_env_python
 from apps.envs_python.views import EnvsPythonMixin
 
@@ -68,8 +73,7 @@ class ConfigView(PythonInstallerMixin, FormView):
     def form_valid(self, form):
         install_folder = form.cleaned_data.get('install_folder')
         download_source = form.cleaned_data.get('download_source')
-        with open(config_file_path, 'w', encoding='utf-8') as f:
-            json.dump({'install_folder': install_folder, 'download_source': download_source}, f, ensure_ascii=False, indent=4)
+        write_json(config_file_path, {'install_folder': install_folder, 'download_source': download_source})
         return super().form_valid(form)
 
 
@@ -79,8 +83,9 @@ class PythonListView(PythonInstallerMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['pythons'] = python_list_paths()
-        with open(installed_file_path, 'w', encoding='utf-8') as f:
-            json.dump(context['pythons'], f, ensure_ascii=False, indent=4)
+        # 只在列表变化时写入
+        if read_json(installed_file_path, {}) != context['pythons']:
+            write_json(installed_file_path, context['pythons'])
         context['default_python'] = get_default_env_python()
         return context
 
@@ -98,19 +103,13 @@ class SetPyDefaultView(PythonInstallerMixin, RedirectView):
             config_path = os.path.join(local_app_data, 'py.ini')
             with open(config_path, 'w') as configfile:
                 config.write(configfile)
-            installed_path = {}
-
-            with open(installed_file_path, 'r', encoding='utf-8') as f:
-                installed_path = json.load(f)
+            with update_json(installed_file_path, {}) as installed_path:
                 for key, value in installed_path.items():
                     if key != get_version:
                         installed_path[key]['is_py_default'] = False
                     else:
                         installed_path[key]['is_py_default'] = True
 
-            with open(installed_file_path, 'w', encoding='utf-8') as f:
-                json.dump(installed_path, f, ensure_ascii=False, indent=4)
-
         return super().get(request, *args, **kwargs)
 
 
@@ -129,8 +128,7 @@ class SetEnvironDefaultView(PythonInstallerMixin, RedirectView):
                 else:
                     user_path_list.remove('')
 
-            with open(installed_file_path, 'r', encoding='utf-8') as f:
-                installed_path = json.load(f)
+            installed_path = read_json(installed_file_path, {})
 
             installed_dir = installed_path[version]['folder'].rstrip('/').replace('/', '\\')
             user_path_list.insert(0, installed_dir)
@@ -166,8 +164,7 @@ class PythonUninstallView(PythonInstallerMixin, FormView):
         accept = form.cleaned_data.get('accept')
 
         if accept:
-            with open(installed_file_path, 'r', encoding='utf-8') as f:
-                install_versions = json.load(f)
+            install_versions = read_json(installed_file_path, {})
             if install_versions[version]:
                 installed_info = install_versions[version]
                 # version_info = get_python_versions(version)
@@ -191,6 +188,8 @@ class PythonUninstallView(PythonInstallerMixin, FormView):
                                 os.environ.get('LOCALAPPDATA')) / 'Package Cache' / key_value / install_file_name
                             if system_cache_file.exists():
                                 cache_file_path = system_cache_file
+                # 卸载程序和删除目录都需要先结束占用该解释器的助手进程
+                worker_pool.release(installed_folder)
                 try:
                     result = run_command([str(cache_file_path), '/uninstall', '/passive', '/simple'])
                     if result.returncode == 0:
@@ -198,11 +197,8 @@ class PythonUninstallView(PythonInstallerMixin, FormView):
                         if rm_folder:
                             if os.path.exists(installed_folder): shutil.rmtree(installed_folder)
                         # 删除安装信息
-                        with open(installed_file_path, 'r', encoding='utf-8') as f:
-                            installed_path = json.load(f)
-                            installed_path.pop(version)
-                        with open(installed_file_path, 'w', encoding='utf-8') as f:
-                            json.dump(installed_path, f, ensure_ascii=False, indent=4)
+                        with update_json(installed_file_path, {}) as installed_path:
+                            installed_path.pop(version, None)
                         # 如果是py默认，重置默认
                         if installed_info['is_py_default']:
                             if os.path.exists(py_ini_path): os.remove(py_ini_path)
@@ -245,6 +241,39 @@ class PythonInstallView(PythonInstallerMixin, TemplateView):
         return context
 
 
+def download_task(job, download_url, python_cache_file, version_info):
+    """
+    后台任务：分段下载Python安装程序，下载时同步计算md5/sha256完成校验
+    """
+    job.set_stage('download', '下载Python安装程序')
+    print(f'下载地址：{download_url}')
+    print('开始下载。。')
+    expected = {'md5': version_info.get('md5sum'), 'sha256': version_info.get('sha256')}
+    if not any(expected.values()):
+        raise RuntimeError('文件校验失败！请更换下载源重试~')
+    if not python_cache_file.exists():
+        try:
+            download(
+                download_url, python_cache_file, expected=expected,
+                progress=lambda done, total: job.update(bytes_done=done, bytes_total=total),
+                cancel_check=job.check_cancelled,
+            )
+        except ChecksumError as e:
+            print(e)
+            raise RuntimeError('文件校验失败！请更换下载源重试~')
+        except DownloadError as e:
+            print(e)
+            raise RuntimeError("存在下载地址错误或者网络问题！请更换下载源重试~")
+    else:
+        job.set_stage('check', '校验安装程序')
+        if not verify_file(python_cache_file, expected):
+            python_cache_file.unlink()
+            raise RuntimeError('文件校验失败！请更换下载源重试~')
+
+    print('下载完成。。')
+    return {'message': '下载完成~'}
+
+
 class PythonDownloadView(JsonView):
 
     def post(self, request, *args, **kwargs):
@@ -253,36 +282,26 @@ class PythonDownloadView(JsonView):
         download_source = get_download_site(get_config('download_source'))['url_prefix']
         download_url = f'{download_source}{version}/{get_versions["installer_file_name"]}'
         python_cache_file = python_cache_dir / get_versions['installer_file_name']
-        print(f'下载地址：{download_url}')
-        print('开始下载。。')
-        if not python_cache_file.exists():
-            try:
-                with requests.get(download_url, stream=True) as r:
-                    r.raise_for_status()
-                    with open(python_cache_file, 'wb') as f:
-                        for chunk in r.iter_content(chunk_size=8192):
-                            if chunk: f.write(chunk)
-            except requests.exceptions.RequestException as e:
-                return self.render_to_json_error("存在下载地址错误或者网络问题~")
-
-        with requests.get(download_url, stream=True) as r:
-            r.raise_for_status()
-            with open(python_cache_file, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):  # 分块读取文件
-                    if chunk: f.write(chunk)
-
-        check_file = False
-        if 'md5sum' in get_versions:
-            if get_versions['md5sum'] == get_file_md5(python_cache_file):
-                check_file = True
-        if 'sha256' in get_versions:
-            check_file = check_sha256(python_cache_file, get_versions['sha256'])
-
-        if not check_file:
-            return self.render_to_json_error('文件校验失败！请更换下载源重试~')
-
-        print('下载完成。。')
-        return self.render_to_json_response({'message': '下载完成~'})
+        job = submit_job(
+            f'{app_name}:download:{version}', f'下载 {get_versions["installer_file_name"]}', download_task,
+            download_url, python_cache_file, get_versions
+        )
+        return self.render_to_json_job(job)
+
+
+def install_task(job, python_cache_file, install_folder):
+    """
+    后台任务：以管理员权限静默运行Python安装程序，等待安装结束
+    """
+    job.set_stage('install', '运行Python安装程序')
+    print('开始安装。。。')
+    windows_api_blocking(
+        executable=str(python_cache_file),
+        parameters=f'/passive InstallAllUsers=1 TargetDir="{install_folder}"',
+        operation="runas",
+    )
+    print('安装完成。。。')
+    return {'message': '安装成功~'}
 
 
 class RunPythonInstallView(JsonView):
@@ -295,18 +314,15 @@ class RunPythonInstallView(JsonView):
             folder,
             f'Python{version_info["version_major"]}{version_info["version_minor"]}'
         )
-        print('开始安装。。。')
         python_cache_file = python_cache_dir / version_info['installer_file_name']
-        try:
-            windows_api_blocking(
-                executable=str(python_cache_file),
-                parameters=f'/passive InstallAllUsers=1 TargetDir="{install_folder}"',
-                operation="runas",
-            )
-            print('安装完成。。。')
-            return self.render_to_json_response({'status':'success', 'message': '安装成功~'})
-        except Exception as e:
-            return self.render_to_json_error(str(e))
+        if not python_cache_file.exists():
+            return self.render_to_json_error('请先下载安装程序！')
+        job = submit_job(
+            f'{app_name}:install:{version}', f'安装 Python {version}', install_task,
+            python_cache_file, install_folder
+        )
+        return self.render_to_json_job(job)
+
 
 class ClearCacheView(RedirectView):
     url = reverse_lazy(f'{app_name}:python_list')
@@ -417,3 +433,35 @@ class PackageUpgradeView(PackageUpgradeMixin):
 
     def get_python_path(self):
         return ensure_path_end_separator(get_installed_python(self.request.GET.get('uid'))['folder']) + 'python.exe'
+
+
+from apps.envs_python.views import PackageLatestMixin
+class PackageLatestView(PackageLatestMixin):
+    app_namespace = app_name
+
+    def get_python_path(self):
+        return ensure_path_end_separator(get_installed_python(self.request.GET.get('uid'))['folder']) + 'python.exe'
+
+
+from apps.envs_python.views import PackageBatchUpgradeMixin
+class PackageBatchUpgradeView(PackageBatchUpgradeMixin):
+    app_namespace = app_name
+
+    def get_python_path(self):
+        return ensure_path_end_separator(get_installed_python(self.request.GET.get('uid'))['folder']) + 'python.exe'
+
+
+from apps.envs_python.views import PackageExportMixin
+class PackageExportView(PackageExportMixin):
+    app_namespace = app_name
+
+    def get_python_path(self):
+        return ensure_path_end_separator(get_installed_python(self.request.GET.get('uid'))['folder']) + 'python.exe'
+
+
+from apps.envs_python.views import PackageImportMixin
+class PackageImportView(PackageImportMixin):
+    app_namespace = app_name
+
+    def get_python_path(self):
+        return ensure_path_end_separator(get_installed_python(self.request.GET.get('uid'))['folder']) + 'python.exe'
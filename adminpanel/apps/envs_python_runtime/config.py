@@ -27,4 +27,7 @@ download_site_json_url = [
 create_type = {
     'install': "安装",
     'import': "导入",
-}
\ No newline at end of file
+}
+
+# 运行环境模板目录，位于安装目录下，与环境在同一分区时可以使用硬链接
+template_dirname = '.templates'
@@ -83,3 +83,16 @@ class PythonForm(FormBase):
             attrs={'class': 'form-control', 'readonly':'True', 'lay-verify': 'required', 'lay-reqtext':'路径不能为空~'},
         )
     )
+
+
+class PythonInstallForm(PythonForm):
+    """
+    安装Python表单，增加安装后预编译选项
+    """
+    compile_pyc = forms.BooleanField(
+        label="预编译",
+        required=False,
+        initial=True,
+        help_text='安装后在后台并行编译标准库和 site-packages 的 .pyc（跳过测试目录），加快首次导入',
+        widget=forms.CheckboxInput(attrs={'lay-skin': 'primary'})
+    )
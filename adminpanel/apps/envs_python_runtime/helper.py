@@ -7,20 +7,16 @@ from .config import (
     user_installed_json, project_python_path
 )
 from jiefoundation.utils import run_command
+from jiefoundation.jsonstore import read_json, write_json
 
 def get_user_config(config_name=None):
-    if not os.path.exists(user_config_json):
-        with open(user_config_json, 'w', encoding='utf-8') as f:
-            json.dump({}, f, ensure_ascii=False, indent=4)
-    with open(user_config_json, 'r', encoding='utf-8') as f:
-        configs = json.load(f)
+    configs = read_json(user_config_json, {})
     if config_name and config_name in configs: return configs[config_name]
     return configs
 
 
 def get_downloadsite(site_name=None):
-    with open(download_site_file, 'r', encoding='utf-8') as f:
-        downloadsites = json.load(f)
+    downloadsites = read_json(download_site_file)
     if site_name and site_name in downloadsites: return downloadsites[site_name]
     return downloadsites
 
@@ -69,8 +65,7 @@ def update_version_info():
             reverse=True
         )
         sorted_versions = dict(sorted_versions_list)
-        with open(versions_json, 'w', encoding='utf-8') as f:
-            json.dump(sorted_versions, f, ensure_ascii=False, indent=4)
+        write_json(versions_json, sorted_versions)
     except Exception as e:
         print(f"更新版本信息时出错: {e}")
 
@@ -78,8 +73,7 @@ def get_versions(version=None):
     """
     读取版本信息json文件，返回字典
     """
-    with open(versions_json, 'r', encoding='utf-8') as f:
-        versions = json.load(f)
+    versions = read_json(versions_json)
     if version and version in versions:
         return versions[version]
     return versions
@@ -89,8 +83,7 @@ def get_installed(unique_identifier=None):
     """
     读取已安装的版本信息json文件，返回字典
     """
-    with open(user_installed_json, 'r', encoding='utf-8') as f:
-        installed = json.load(f)
+    installed = read_json(user_installed_json, {})
     for unique_name, info in installed.items():
         installed[unique_name]['folder'] = installed[unique_name]['folder'].replace('\\', '/')
         installed[unique_name]['is_path'] = os.path.exists(info['folder'])
@@ -129,27 +122,23 @@ def get_installed_sorted():
     return dict(sorted_items)
 
 def get_default_pypi():
-    result = run_command(f"{project_python_path} -m pip config get global.index-url")
-    if result['returncode'] == 1:
-        return "https://pypi.org/simple"
-    else:
-        return result['stdout'].strip()
+    from apps.envs_python.helper import get_default_pypi
+    return get_default_pypi()
 
 
 def get_pypi_list():
     pypi_list = {}
     default_pypi = get_default_pypi()
 
-    with open(pypi_json, 'r', encoding='utf-8') as f:
-        pypis = json.load(f)
-        for name, pypi in pypis.items():
-            if pypi['url'] == default_pypi:
-                is_default = True
-            else:
-                is_default = False
-            pypi_list[name] = {
-                'title': pypi['title'],
-                'url': pypi['url'],
-                'is_default': is_default,
-            }
+    pypis = read_json(pypi_json)
+    for name, pypi in pypis.items():
+        if pypi['url'].rstrip('/') == default_pypi:
+            is_default = True
+        else:
+            is_default = False
+        pypi_list[name] = {
+            'title': pypi['title'],
+            'url': pypi['url'],
+            'is_default': is_default,
+        }
     return pypi_list
\ No newline at end of file
@@ -0,0 +1,294 @@
+"""
+从 wheel 安装 pip
+
+不再执行几万行、内嵌 base85 数据的 get-pip.py，直接把 pip（Python 3.12 以下还有 setuptools）的 wheel
+解压到新运行环境的 site-packages，并自己写入 RECORD、INSTALLER 和 Scripts 下的启动器：
+- wheel 优先使用新环境自带的 Lib/ensurepip/_bundled，其次是本地缓存，都没有时从索引下载到缓存；
+- Windows 启动器与 pip 相同：distlib 的 t64.exe / t32.exe / t64-arm.exe + shebang + 包含 __main__.py 的 zip；
+- 失败时由调用方回退到 get-pip.py。
+"""
+import base64
+import csv
+import hashlib
+import io
+import os
+import re
+import struct
+import zipfile
+from email.parser import Parser
+
+try:
+    from packaging.specifiers import SpecifierSet, InvalidSpecifier
+    from packaging.version import Version, InvalidVersion
+except ImportError:
+    from pip._vendor.packaging.specifiers import SpecifierSet, InvalidSpecifier
+    from pip._vendor.packaging.version import Version, InvalidVersion
+
+from .config import cache_dir
+
+wheel_cache_dir = cache_dir / 'wheels'
+
+SCRIPT_TEMPLATE = '''# -*- coding: utf-8 -*-
+import re
+import sys
+from {module} import {import_name}
+if __name__ == '__main__':
+    sys.argv[0] = re.sub(r'(-script\\.pyw|\\.exe)?$', '', sys.argv[0])
+    sys.exit({func}())
+'''
+
+# PE 文件头中的机器类型
+PE_MACHINE_LAUNCHERS = {0x14c: 't32.exe', 0x8664: 't64.exe', 0xaa64: 't64-arm.exe'}
+
+
+class BootstrapError(Exception):
+    pass
+
+
+def _record_hash(data):
+    digest = hashlib.sha256(data).digest()
+    return 'sha256=' + base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+def _wheel_info(path):
+    """
+    :return: (项目名, 版本, Requires-Python)
+    """
+    name, version = os.path.basename(path).split('-')[:2]
+    with zipfile.ZipFile(path) as archive:
+        metadata_name = next(
+            (item for item in archive.namelist() if item.endswith('.dist-info/METADATA') and item.count('/') == 1), None
+        )
+        if metadata_name is None:
+            raise BootstrapError(f'{path} 不是有效的 wheel 文件')
+        metadata = Parser().parsestr(archive.read(metadata_name).decode('utf-8'), headersonly=True)
+    return name.lower(), version, metadata.get('Requires-Python') or ''
+
+
+def _compatible(requires_python, python_version):
+    if not requires_python:
+        return True
+    try:
+        return SpecifierSet(requires_python).contains(python_version, prereleases=True)
+    except InvalidSpecifier:
+        return True
+
+
+def _version_key(version):
+    try:
+        return Version(version)
+    except InvalidVersion:
+        return Version('0')
+
+
+def find_wheel(project, python_version, folder):
+    """
+    找到可用的 wheel：新环境自带的 ensurepip > 本地缓存 > 从索引下载
+
+    :param folder: 新运行环境目录
+    :return: wheel 路径，找不到时返回 None
+    """
+    candidates = []
+    for search_dir in (os.path.join(folder, 'Lib', 'ensurepip', '_bundled'), str(wheel_cache_dir)):
+        if not os.path.isdir(search_dir):
+            continue
+        for filename in os.listdir(search_dir):
+            if not (filename.lower().startswith(project + '-') and filename.endswith('-none-any.whl')):
+                continue
+            path = os.path.join(search_dir, filename)
+            try:
+                name, version, requires_python = _wheel_info(path)
+            except (BootstrapError, zipfile.BadZipFile, OSError):
+                continue
+            if name == project and _compatible(requires_python, python_version):
+                candidates.append((_version_key(version), path))
+        if candidates:
+            # 自带的 wheel 与解释器版本配套，优先使用
+            return max(candidates)[1]
+    return download_wheel(project, python_version)
+
+
+def download_wheel(project, python_version):
+    """从当前 pip 配置的索引下载最新的兼容 wheel 到缓存目录"""
+    from jiefoundation.downloader import download
+    from apps.envs_python.pypiproxy import fetch_project
+
+    try:
+        record = fetch_project(project)
+    except Exception as e:
+        print(f'获取 {project} 的下载地址失败: {e}')
+        return None
+    if not record:
+        return None
+    best = None
+    for link in record['links']:
+        filename = link['filename']
+        if link['yanked'] or not filename.endswith('-none-any.whl') or not filename.lower().startswith(project + '-'):
+            continue
+        version = _version_key(filename.split('-')[1])
+        if version.is_prerelease or not _compatible(link['requires_python'], python_version):
+            continue
+        if best is None or version > best[0]:
+            best = (version, link)
+    if best is None:
+        return None
+    link = best[1]
+    os.makedirs(wheel_cache_dir, exist_ok=True)
+    path = os.path.join(wheel_cache_dir, link['filename'])
+    download(link['url'], path, expected={'sha256': link['sha256']}, segments=1)
+    return path
+
+
+def _launcher(python_exe):
+    """按 python.exe 的机器类型选择 distlib 启动器，非 Windows 可执行文件时返回 None"""
+    try:
+        with open(python_exe, 'rb') as f:
+            header = f.read(1024)
+        if header[:2] != b'MZ':
+            return None
+        pe_offset = struct.unpack_from('<I', header, 0x3c)[0]
+        with open(python_exe, 'rb') as f:
+            f.seek(pe_offset)
+            signature = f.read(6)
+        if signature[:4] != b'PE\0\0':
+            return None
+        return PE_MACHINE_LAUNCHERS.get(struct.unpack('<H', signature[4:6])[0])
+    except (OSError, struct.error):
+        return None
+
+
+def _script_bytes(python_exe, launcher_data, module, func):
+    import_name = func.split('.')[0]
+    source = SCRIPT_TEMPLATE.format(module=module, import_name=import_name, func=func)
+    if launcher_data is None:
+        return f'#!{python_exe}\n{source}'.encode('utf-8')
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, 'w') as archive:
+        archive.writestr('__main__.py', source.encode('utf-8'))
+    shebang = f'#!"{python_exe}"\r\n'.encode('utf-8')
+    return launcher_data + shebang + stream.getvalue()
+
+
+def _console_scripts(entry_points_text, python_version):
+    """
+    entry_points.txt 中的 console_scripts
+
+    :return: [(脚本名, 模块, 函数)]，pip3.12 这样带版本号的名称改为目标解释器的版本
+    """
+    scripts = []
+    section = None
+    major_minor = '.'.join(python_version.split('.')[:2])
+    for line in entry_points_text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(('#', ';')):
+            continue
+        if line.startswith('['):
+            section = line.strip('[]').strip()
+            continue
+        if section != 'console_scripts' or '=' not in line:
+            continue
+        name, target = (part.strip() for part in line.split('=', 1))
+        module, _, func = target.partition(':')
+        name = re.sub(r'^(pip|easy_install-)\d\.\d+$', rf'\g<1>{major_minor}', name)
+        scripts.append((name, module.strip(), func.split('[')[0].strip()))
+    # 与 pip 安装自己时一致，补充 pip3.12 这样带版本号的启动器
+    names = [name for name, module, func in scripts]
+    if 'pip3' in names and f'pip{major_minor}' not in names:
+        scripts.append((f'pip{major_minor}',) + scripts[names.index('pip3')][1:])
+    return scripts
+
+
+def install_wheel(wheel_path, folder, python_version):
+    """
+    把纯 Python wheel 安装到运行环境
+
+    :param folder: 运行环境目录（python.exe 所在目录）
+    :return: 安装的文件数
+    """
+    folder = os.path.abspath(folder)
+    site_packages = os.path.join(folder, 'Lib', 'site-packages')
+    scripts_dir = os.path.join(folder, 'Scripts')
+    python_exe = os.path.join(folder, 'python.exe')
+    records = []
+
+    def write_file(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        relative = os.path.relpath(path, site_packages).replace(os.sep, '/')
+        records.append((relative, _record_hash(data), str(len(data))))
+
+    with zipfile.ZipFile(wheel_path) as archive:
+        dist_info = next(
+            (item.split('/')[0] for item in archive.namelist() if item.split('/')[0].endswith('.dist-info')), None
+        )
+        if dist_info is None:
+            raise BootstrapError(f'{wheel_path} 中没有 .dist-info 目录')
+        wheel_meta = Parser().parsestr(archive.read(f'{dist_info}/WHEEL').decode('utf-8'), headersonly=True)
+        if (wheel_meta.get('Root-Is-Purelib') or '').strip().lower() != 'true':
+            raise BootstrapError(f'{wheel_path} 不是纯 Python 包')
+        data_dir = dist_info[:-len('.dist-info')] + '.data'
+        for info in archive.infolist():
+            if info.is_dir() or info.filename == f'{dist_info}/RECORD':
+                continue
+            parts = info.filename.split('/')
+            if '..' in parts or info.filename.startswith('/'):
+                raise BootstrapError(f'wheel 中的路径不安全: {info.filename}')
+            if parts[0] == data_dir:
+                # .data/scripts 放到 Scripts，.data/purelib 和 platlib 放到 site-packages，其余放到环境目录
+                target_root = {'scripts': scripts_dir, 'purelib': site_packages, 'platlib': site_packages}.get(
+                    parts[1], folder
+                )
+                target = os.path.join(target_root, *parts[2:])
+            else:
+                target = os.path.join(site_packages, *parts)
+            write_file(target, archive.read(info))
+        entry_points = ''
+        if f'{dist_info}/entry_points.txt' in archive.namelist():
+            entry_points = archive.read(f'{dist_info}/entry_points.txt').decode('utf-8')
+
+    launcher_name = _launcher(python_exe)
+    launcher_data = None
+    if launcher_name:
+        launcher_path = os.path.join(site_packages, 'pip', '_vendor', 'distlib', launcher_name)
+        if not os.path.exists(launcher_path):
+            raise BootstrapError(f'找不到启动器 {launcher_name}')
+        with open(launcher_path, 'rb') as f:
+            launcher_data = f.read()
+    for name, module, func in _console_scripts(entry_points, python_version):
+        script_name = name + ('.exe' if launcher_data is not None else '')
+        write_file(os.path.join(scripts_dir, script_name), _script_bytes(python_exe, launcher_data, module, func))
+
+    write_file(os.path.join(site_packages, dist_info, 'INSTALLER'), b'pip\n')
+    record_path = os.path.join(site_packages, dist_info, 'RECORD')
+    records.append((f'{dist_info}/RECORD', '', ''))
+    with open(record_path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerows(records)
+    return len(records)
+
+
+def bootstrap_pip(folder, python_version, job=None):
+    """
+    安装 pip，Python 3.12 以下同时安装 setuptools（与 get-pip.py 一致）
+
+    :return: 已安装的 wheel 文件名列表
+    :raises BootstrapError: 找不到 wheel 或安装失败，调用方回退到 get-pip.py
+    """
+    if not os.path.isdir(os.path.join(folder, 'Lib')):
+        raise BootstrapError('运行环境中没有 Lib 目录')
+    version_info = tuple(int(part) for part in python_version.split('.')[:2])
+    # pip 必须最先安装，其他包的启动器来自 pip 自带的 distlib
+    projects = ['pip'] + (['setuptools'] if version_info < (3, 12) else [])
+    installed = []
+    for project in projects:
+        wheel_path = find_wheel(project, python_version, folder)
+        if wheel_path is None:
+            if project == 'pip':
+                raise BootstrapError('找不到可用的 pip wheel')
+            print(f'找不到可用的 {project} wheel，跳过')
+            continue
+        if job:
+            job.update(f'安装 {os.path.basename(wheel_path)}')
+        install_wheel(wheel_path, folder, python_version)
+        installed.append(os.path.basename(wheel_path))
+    return installed
@@ -0,0 +1,324 @@
+"""
+运行环境模板
+
+同一个版本再次安装时不再重新解压压缩包、安装 pip：
+- 每个版本第一次安装时解压并安装 pip 到模板目录（安装目录下的 .templates\\<版本>），模板本身不作为环境使用；
+- 新环境按模板创建：标准库、DLL 等不会被修改的文件使用硬链接，会被修改的 site-packages 和 Scripts 复制一份，
+  Scripts 中启动器的 shebang 改为新环境的 python.exe；
+- 安装目录与模板不在同一个分区、不支持硬链接时改为复制，仍然省去解压和安装 pip；
+- 环境使用的模板记录在安装信息的 template 字段，仍有环境使用时不能删除模板。
+  卸载环境只删除环境目录中的链接，不影响模板和其他环境。
+"""
+import csv
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from jiefoundation.jsonstore import read_json, write_json, update_json
+from jiefoundation.pyworker import worker_pool
+
+from .config import template_dirname
+from .helper import get_user_config, get_installed
+
+# 复制而不是硬链接的路径（相对于环境目录），这些文件会被 pip 等工具原地修改
+MUTABLE_PATHS = ('Lib/site-packages', 'Scripts')
+# 模板创建完成后写入，没有该文件的模板目录视为未完成
+MANIFEST_NAME = '.jie_template.json'
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _version_lock(version):
+    with _locks_lock:
+        lock = _locks.get(version)
+        if lock is None:
+            lock = _locks[version] = threading.Lock()
+        return lock
+
+
+def template_root():
+    install_folder = get_user_config().get('install_folder')
+    if not install_folder:
+        raise RuntimeError('请先设置安装目录~')
+    return Path(install_folder) / template_dirname
+
+
+def _template_info(folder):
+    manifest_path = folder / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    manifest = read_json(manifest_path)
+    manifest['folder'] = str(folder).replace('\\', '/')
+    try:
+        # python.exe 的链接数减去模板自身，即磁盘上仍与模板共享文件的环境数
+        manifest['links'] = os.stat(folder / 'python.exe').st_nlink - 1
+    except OSError:
+        manifest['links'] = 0
+    manifest['installs'] = [
+        uid for uid, info in get_installed().items() if info.get('template') == manifest['version'] and info['is_path']
+    ]
+    return manifest
+
+
+def get_template(version, version_info=None):
+    """
+    已创建的模板
+
+    :param version_info: 传入时安装包与模板不一致（版本信息更新过）视为没有模板
+    :return: 模板信息，没有时返回 None
+    """
+    try:
+        info = _template_info(template_root() / version)
+    except RuntimeError:
+        return None
+    if info and version_info and (info['file_name'], info['sha256']) != (
+            version_info['file_name'], version_info['sha256']):
+        return None
+    return info
+
+
+def list_templates():
+    try:
+        root = template_root()
+    except RuntimeError:
+        return []
+    if not root.is_dir():
+        return []
+    templates = []
+    for folder in sorted(root.iterdir(), reverse=True):
+        if folder.is_dir():
+            info = _template_info(folder)
+            if info:
+                templates.append(info)
+    return templates
+
+
+def prepare_runtime(job, version_info, install_file_path, folder):
+    """
+    解压 Python 压缩包并安装 pip
+
+    :return: 提示信息，pip 安装失败时不为空
+    """
+    from jiefoundation.utils import extract_from_zip, run_command
+    from .config import app_data_dir
+
+    job.set_stage('unzip', '解压Python安装包')
+
+    def report(files_done, files_total, bytes_done, bytes_total):
+        job.check_cancelled()
+        job.update(files_done=files_done, files_total=files_total, bytes_done=bytes_done, bytes_total=bytes_total)
+
+    print('解压，请稍候....')
+    suffix = Path(install_file_path).suffix.lower()
+    if suffix == '.zip':
+        extract_from_zip(install_file_path, extract_to=folder, progress=report)
+    elif suffix == '.nupkg':
+        # nupkg 包中只需要 tools/ 目录，直接解压到安装目录
+        extract_from_zip(install_file_path, extract_to=folder, progress=report, prefix='tools/')
+    else:
+        raise RuntimeError(f'不支持的安装包格式：{Path(install_file_path).name}')
+
+    job.set_stage('pip', '安装pip')
+    version_split = version_info['sort_version'].split('.')
+    version_major = int(version_split[0])
+    version_minor = int(version_split[1])
+    print('开始安装pip')
+    try:
+        from .pipbootstrap import bootstrap_pip
+        bootstrap_pip(folder, version_info['sort_version'], job)
+    except Exception as e:
+        print(f'从 wheel 安装 pip 失败，改用 get-pip.py：{e}')
+        # 3.8 及以下使用对应版本的 get-pip
+        get_pip_file = app_data_dir / 'get-pip' / 'get-pip.py'
+        if version_major == 3 and version_minor <= 8:
+            get_pip_file = app_data_dir / 'get-pip' / f'get-pip-{version_major}.{version_minor}.py'
+        python_interpreter = Path(folder) / 'python.exe'
+        result = run_command(
+            [python_interpreter, get_pip_file, '--no-warn-script-location'],
+            cwd=folder
+        )
+        if result.returncode != 0:
+            print('选中源安装pip失败，尝试使用官方源安装pip')
+            result = run_command(
+                [python_interpreter, get_pip_file, '--no-warn-script-location', '-i', 'https://pypi.org/simple'],
+                cwd=folder
+            )
+            if result.returncode != 0:
+                return f'安装 pip 失败！请在包管理里尝试重新安装或者升级！错误信息：{result.stderr}~'
+    return ''
+
+
+def _tree_size(folder):
+    """:return: (文件数, 总大小)"""
+    files = size = 0
+    for root, dirs, filenames in os.walk(folder):
+        for filename in filenames:
+            files += 1
+            size += os.path.getsize(os.path.join(root, filename))
+    return files, size
+
+
+def ensure_template(job, version, version_info, install_file_path, compile_pyc=False):
+    """
+    获取版本对应的模板，还没有时用安装包创建
+
+    :param compile_pyc: 模板还没有预编译时预编译，之后按模板创建的环境直接带有 .pyc
+    :return: 模板信息
+    :raises RuntimeError: 没有安装包或 pip 安装失败，调用方改为直接安装
+    """
+    from apps.envs_python.bytecompile import compile_task, cache_tag, supports_version
+
+    with _version_lock(version):
+        template = get_template(version, version_info) or _build_template(job, version, version_info, install_file_path)
+        if compile_pyc and not template.get('compiled') and supports_version(template['sort_version']):
+            folder = Path(template['folder'])
+            try:
+                compile_task(job, folder / 'python.exe', [folder / 'Lib'], cache_tag(version=template['sort_version']))
+            except OSError as e:
+                # 预编译是可选的，失败时模板照常使用
+                print(f'预编译模板 {version} 失败：{e}')
+                return template
+            with update_json(folder / MANIFEST_NAME, {}) as manifest:
+                manifest['compiled'] = True
+                manifest['files'], manifest['size'] = _tree_size(folder)
+            template = get_template(version)
+        return template
+
+
+def _build_template(job, version, version_info, install_file_path):
+    """用安装包创建模板，调用方持有版本锁"""
+    if not Path(install_file_path).exists():
+        raise RuntimeError('请先下载安装包！')
+    folder = template_root() / version
+    # 未完成或与安装包不一致的旧模板直接重建，已有环境使用的是各自的链接，不受影响
+    worker_pool.release(folder)
+    shutil.rmtree(folder, ignore_errors=True)
+    try:
+        warning = prepare_runtime(job, version_info, install_file_path, str(folder))
+        if warning:
+            raise RuntimeError(warning)
+        files, size = _tree_size(folder)
+        write_json(folder / MANIFEST_NAME, {
+            'version': version,
+            'sort_version': version_info['sort_version'],
+            'file_name': version_info['file_name'],
+            'sha256': version_info['sha256'],
+            'python_exe': os.path.join(os.path.abspath(folder), 'python.exe'),
+            'files': files,
+            'size': size,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+    except BaseException:
+        shutil.rmtree(folder, ignore_errors=True)
+        raise
+    return get_template(version)
+
+
+def _is_mutable(relative):
+    relative = relative.replace(os.sep, '/').lower()
+    return any(relative == path.lower() or relative.startswith(path.lower() + '/') for path in MUTABLE_PATHS)
+
+
+def _retarget_scripts(template, folder):
+    """
+    把复制过来的启动器中模板的 python.exe 路径改为新环境的，并更新 RECORD 中对应的哈希和大小
+    """
+    from .pipbootstrap import _record_hash
+
+    old_exe = template['python_exe'].encode('utf-8')
+    new_exe = os.path.join(os.path.abspath(folder), 'python.exe').encode('utf-8')
+    scripts_dir = os.path.join(folder, 'Scripts')
+    if not os.path.isdir(scripts_dir):
+        return
+    rewritten = {}
+    for entry in os.scandir(scripts_dir):
+        if not entry.is_file():
+            continue
+        with open(entry.path, 'rb') as f:
+            data = f.read()
+        if old_exe not in data:
+            continue
+        data = data.replace(old_exe, new_exe)
+        with open(entry.path, 'wb') as f:
+            f.write(data)
+        rewritten[os.path.normcase(entry.path)] = (_record_hash(data), str(len(data)))
+    if not rewritten:
+        return
+
+    site_packages = os.path.join(folder, 'Lib', 'site-packages')
+    for entry in os.scandir(site_packages):
+        record_path = os.path.join(entry.path, 'RECORD')
+        if not entry.name.endswith('.dist-info') or not os.path.exists(record_path):
+            continue
+        with open(record_path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        changed = False
+        for row in rows:
+            key = os.path.normcase(os.path.normpath(os.path.join(site_packages, row[0]))) if row else None
+            if key in rewritten and len(row) >= 3:
+                row[1], row[2] = rewritten[key]
+                changed = True
+        if changed:
+            with open(record_path, 'w', encoding='utf-8', newline='') as f:
+                csv.writer(f, lineterminator='\n').writerows(rows)
+
+
+def materialize(job, template, folder):
+    """
+    按模板创建环境
+
+    :return: 是否使用了硬链接（False 表示全部复制）
+    """
+    source = Path(template['folder'])
+    job.set_stage('link', '按模板创建环境')
+    files = []
+    for root, dirs, filenames in os.walk(source):
+        relative_root = os.path.relpath(root, source)
+        os.makedirs(os.path.normpath(os.path.join(folder, relative_root)), exist_ok=True)
+        for filename in filenames:
+            relative = os.path.normpath(os.path.join(relative_root, filename))
+            if relative != MANIFEST_NAME:
+                files.append(relative)
+
+    linked = True
+    try:
+        for index, relative in enumerate(files, 1):
+            src = os.path.join(source, relative)
+            dest = os.path.join(folder, relative)
+            if linked and not _is_mutable(relative):
+                try:
+                    os.link(src, dest)
+                except OSError as e:
+                    # 跨分区或文件系统不支持硬链接
+                    print(f'无法创建硬链接，改为复制：{e}')
+                    linked = False
+                    shutil.copy2(src, dest)
+            else:
+                shutil.copy2(src, dest)
+            if index % 200 == 0 or index == len(files):
+                job.check_cancelled()
+                job.update(files_done=index, files_total=len(files))
+        _retarget_scripts(template, folder)
+    except BaseException:
+        shutil.rmtree(folder, ignore_errors=True)
+        raise
+    return linked
+
+
+def delete_template(version):
+    """
+    删除模板
+
+    :raises RuntimeError: 模板不存在或仍有环境使用
+    """
+    with _version_lock(version):
+        template = get_template(version)
+        if template is None:
+            raise RuntimeError('模板不存在~')
+        if template['installs']:
+            raise RuntimeError(f'仍有 {len(template["installs"])} 个环境使用该模板，请先卸载这些环境~')
+        worker_pool.release(template['folder'])
+        shutil.rmtree(template['folder'])
@@ -17,6 +17,7 @@ urlpatterns = [
     path('python/del/', views.PythonDeleteView.as_view(), name='delete'),
     path('python/name/edit/<str:uuid>/', views.NameEditView.as_view(), name='name_edit'),
     path('clearcache/', views.ClearCacheView.as_view(), name='clearcache'),
+    path('template/del/<str:version>/', views.TemplateDeleteView.as_view(), name='template_delete'),
     path('default/set/<str:version>/', views.SetDefaultView.as_view(), name='default_set'),
     path('default/reset/', views.ResetDefaultView.as_view(), name='default_reset'),
     path('python/import/', views.ImportView.as_view(), name='import'),
@@ -24,5 +25,9 @@ urlpatterns = [
     path('package/install/', views.PackageInstallView.as_view(), name='package_install'),
     path('package/uninstall/<str:package>/', views.PackageUninstallView.as_view(), name='package_uninstall'),
     path('package/upgrade/<str:package>/', views.PackageUpgradeView.as_view(), name='package_upgrade'),
+    path('package/latest/', views.PackageLatestView.as_view(), name='package_latest'),
+    path('package/upgrade/', views.PackageBatchUpgradeView.as_view(), name='package_batch_upgrade'),
+    path('package/export/', views.PackageExportView.as_view(), name='package_export'),
+    path('package/import/', views.PackageImportView.as_view(), name='package_import'),
     path("run/component/<str:component>/<str:uuid>/", views.RunPythonComponentView.as_view(), name='run_component')
 ]
\ No newline at end of file
@@ -9,6 +9,10 @@ from django.views.generic.base import  TemplateView, RedirectView
 from django.urls import reverse_lazy
 
 from jiefoundation.jiebase import JsonView
+from jiefoundation.downloader import ChecksumError
+from jiefoundation.jobs import submit_job, find_job, JobCancelled
+from jiefoundation.jsonstore import read_json, write_json, update_json, get_lock
+from jiefoundation.pyworker import worker_pool
 from jiefoundation.utils import check_sha256, run_command, ensure_path_end_separator
 from panelcore.helper import (
     download_file_with_retry,get_reg_user_env, set_reg_user_env,
@@ -16,11 +20,11 @@ from panelcore.helper import (
 
 from apps.envs_python.views import EnvsPythonMixin
 from apps.envs_python.helper import get_default_env_python
-from .config import cache_dir, user_installed_json,app_data_dir, create_type
+from .config import cache_dir, user_installed_json, create_type
 from .helper import (
     update_version_info, get_versions, get_installed, get_user_config,get_downloadsite, user_config_json
 )
-from .forms import InstallConfigForm, UninstallForm, ImportForm, PythonForm
+from .forms import InstallConfigForm, UninstallForm, ImportForm, PythonForm, PythonInstallForm
 
 
 app_name = 'envs_python_runtime'
@@ -48,10 +52,12 @@ class PythonListView(PythonRuntimeMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         from .helper import get_installed_sorted
+        from .runtimetemplate import list_templates
         context = super().get_context_data(**kwargs)
         context['page_title'] = '压缩包安装管理'
         context['python_list'] = get_installed_sorted()
         context['default_env_python'] = get_default_env_python()
+        context['templates'] = list_templates()
         return context
 
 
@@ -100,8 +106,7 @@ class InstallConfigView(PythonRuntimeMixin, FormView):
             'install_source': get_downloadsite(install_source),
             'check_file': check_file
         }
-        with open(user_config_json, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=4)
+        write_json(user_config_json, config)
         messages.success(self.request, "配置已保存")
         return super().form_valid(form)
 
@@ -132,6 +137,24 @@ class VersionsListView(PythonRuntimeMixin, TemplateView):
         return context
 
 
+class TemplateDeleteView(RedirectView):
+    """
+    删除运行环境模板，仍有环境使用时不能删除
+    """
+    url = reverse_lazy(f'{app_name}:python_list')
+
+    def get(self, request, *args, **kwargs):
+        from .runtimetemplate import delete_template
+
+        version = kwargs.get('version')
+        try:
+            delete_template(version)
+            messages.success(request, f'模板 {version} 已删除~')
+        except (RuntimeError, OSError) as e:
+            messages.error(request, f'删除模板失败！{e}')
+        return super().get(request, *args, **kwargs)
+
+
 class VersionsRefreshView(RedirectView):
     """
     版本刷新视图类
@@ -162,6 +185,34 @@ class ClearCacheView(RedirectView):
         return super().get(request, *args, **kwargs)
 
 
+def download_task(job, version, download_url, install_file_path, sha256, check_file):
+    """
+    后台任务：下载Python安装压缩包，下载时同步计算sha256完成校验
+    """
+    from .runtimetemplate import get_template
+
+    job.set_stage('download', '下载Python安装包')
+    if get_template(version, get_versions(version)):
+        # 已有模板时安装不需要安装包
+        return {'file_name': install_file_path.name, 'template': True}
+    expected = {'sha256': sha256} if check_file else None
+    if not install_file_path.exists():
+        try:
+            download = download_file_with_retry(
+                download_url, install_file_path, expected=expected,
+                progress=lambda done, total: job.update(bytes_done=done, bytes_total=total),
+                cancel_check=job.check_cancelled,
+            )
+        except ChecksumError:
+            raise RuntimeError('下载文件sha256校验失败~请换地址或者清理缓存后再重试！')
+        if not download: raise RuntimeError('下载失败~请刷新重试、更换下载源或者选择较低的的版本安装！')
+    elif check_file and sha256:
+        job.set_stage('check', '校验安装包')
+        if not check_sha256(install_file_path, sha256):
+            raise RuntimeError('下载文件sha256校验失败~请换地址或者清理缓存后再重试！')
+    return {'file_name': install_file_path.name}
+
+
 class DownloadView(JsonView):
     """
     下载安装压缩包
@@ -180,21 +231,18 @@ class DownloadView(JsonView):
                 'https://www.python.org/ftp/python/', ensure_path_end_separator(get_user_config('install_source')['url-prefix'])
             )
         sha256 = version_info['sha256']
-        if not install_file_path.exists():
-            download = download_file_with_retry(download_url, install_file_path)
-            if not download: return self.render_to_json_error('下载失败~请刷新重试、更换下载源或者选择较低的的版本安装！')
-        if user_config['check_file']:
-            if sha256:
-                if not check_sha256(install_file_path, sha256):
-                    return self.render_to_json_error('下载文件sha256校验失败~请换地址或者清理缓存后再重试！')
-        return self.render_to_json_success('下载成功')
+        job = submit_job(
+            f'{app_name}:download:{version}', f'下载 {version_info["file_name"]}', download_task,
+            version, download_url, install_file_path, sha256, user_config['check_file']
+        )
+        return self.render_to_json_job(job)
 
 
 class PythonInstallView(PythonRuntimeMixin, FormView):
     """
     Python安装表单
     """
-    form_class = PythonForm
+    form_class = PythonInstallForm
     template_name = f'{app_name}/python_install.html'
     success_url = reverse_lazy(f'{app_name}:python_list')
 
@@ -240,91 +288,98 @@ class PythonInstallView(PythonRuntimeMixin, FormView):
         return context
 
 
+def install_task(job, name, version, version_info, install_file_path, folder, compile_pyc=False):
+    """
+    后台任务：按模板创建环境（没有模板时先用安装包创建模板）并写入安装记录，模板不可用时直接解压安装
+
+    :param compile_pyc: 安装后预编译字节码，使用模板时只需要预编译模板一次；Python 2 忽略
+    """
+    from apps.envs_python.bytecompile import compile_task, cache_tag, supports_version
+    from .runtimetemplate import ensure_template, materialize, prepare_runtime
+
+    extract_path = Path(folder)
+    try:
+        template = ensure_template(job, version, version_info, install_file_path, compile_pyc)
+    except JobCancelled:
+        raise
+    except Exception as e:
+        print(f'准备 {version} 模板失败，直接安装：{e}')
+        template = None
+
+    warning = ''
+    linked = False
+    if template:
+        linked = materialize(job, template, folder)
+    else:
+        warning = prepare_runtime(job, version_info, install_file_path, folder)
+    compile_result = None
+    if compile_pyc and not supports_version(version_info['sort_version']):
+        print(f'{version} 不预编译字节码')
+    elif compile_pyc:
+        # 模板已预编译时 .pyc 随模板一起创建，这里只会检查不会再编译
+        try:
+            compile_result = compile_task(
+                job, extract_path / 'python.exe', [extract_path / 'Lib'], cache_tag(version=version_info['sort_version'])
+            )
+        except OSError as e:
+            warning = (warning + '\n' if warning else '') + f'预编译失败，不影响使用：{e}'
+
+    version_split = version_info['sort_version'].split('.')
+    unique_identifier = str(uuid.uuid4())
+    with update_json(user_installed_json, {}) as installed_python:
+        installed_python[unique_identifier] = {
+            'name': name,
+            'version': version,
+            'folder': ensure_path_end_separator(str(extract_path).replace('\\', '/')),
+            'create_type': 'install',
+            'create_type_title': create_type['install'],
+            'version_major': int(version_split[0]),
+            'version_minor': int(version_split[1]),
+            'version_patch': int(version_split[2]),
+            'template': version if template else '',
+            'linked': linked,
+        }
+    return {'warning': warning, 'compile': compile_result}
+
+
 class InstallView(JsonView):
     """
     安装python
     """
     def post(self, request, *args, **kwargs):
+        from .runtimetemplate import get_template
+
         name = request.POST.get('name').strip()
         version = request.POST.get('version')
         folder = request.POST.get('folder').replace("\\", "/")
         if not name:  name = version
 
+        job = find_job(f'{app_name}:install:{folder}')
+        if job:
+            return self.render_to_json_job(job)
+
         version_info = get_versions(version)
         install_file_path = cache_dir / version_info['file_name']
         user_config = get_user_config()
         install_folder = Path(folder)
         sha256 = version_info['sha256']
 
-        if not install_file_path.exists():
-            return self.render_to_json_error('请先下载安装包！')
-        if user_config['check_file']:
-            if sha256:
-                if not check_sha256(install_file_path, version_info['sha256']):
-                    return self.render_to_json_error('安装时sha256校验失败！')
-        # try:
-        extract_path = install_folder
-        if extract_path.exists():
+        # 已有模板时不再使用安装包
+        if not get_template(version, version_info):
+            if not install_file_path.exists():
+                return self.render_to_json_error('请先下载安装包！')
+            if user_config['check_file']:
+                if sha256:
+                    if not check_sha256(install_file_path, version_info['sha256']):
+                        return self.render_to_json_error('安装时sha256校验失败！')
+        if install_folder.exists():
             return self.render_to_json_error('该版本已存在！')
 
-        from jiefoundation.utils import extract_from_zip, move_and_rename_folder
-
-        print('解压，请稍候....')
-        result = False
-        if Path(install_file_path).suffix.lower() == '.zip':
-            result = extract_from_zip(install_file_path, extract_to=folder)
-        if Path(install_file_path).suffix.lower() == '.nupkg':
-            install_dir =os.path.dirname(folder)
-            folder_name = folder.split('/')[-1]
-            version_tmp_path = cache_dir / folder_name
-
-            if version_tmp_path.exists():
-                shutil.rmtree(version_tmp_path)
-            result = extract_from_zip(install_file_path, extract_to=version_tmp_path )
-            if result:
-                move_and_rename_folder(version_tmp_path / 'tools', install_dir, new_name=folder_name)
-                shutil.rmtree(version_tmp_path)
-
-        if result:
-            version_split = version_info['sort_version'].split('.')
-            version_major = int(version_split[0])
-            version_minor = int(version_split[1])
-            get_pip_file = app_data_dir / 'get-pip' / 'get-pip.py'
-            if version_minor == 3 and version_major <= 8:
-                get_pip_file = app_data_dir / 'get-pip' / f'get-pip-{version_major}.{version_minor}.py'
-            print('开始安装pip')
-            python_interpreter = Path(folder) / 'python.exe'
-            result = run_command(
-                [python_interpreter, get_pip_file, '--no-warn-script-location'],
-                cwd=folder
-            )
-            if result.returncode != 0:
-                print('选中源安装pip失败，尝试使用官方源安装pip')
-                result = run_command(
-                    [python_interpreter, get_pip_file, '--no-warn-script-location', '-i', 'https://pypi.org/simple'],
-                    cwd=folder
-                )
-                if result.returncode != 0:
-                    messages.warning(self.request, f'安装 pip 失败！请在包管理里尝试重新安装或者升级！错误信息：{result.stderr}~')
-            installed_python = {}
-            with open(user_installed_json, 'r', encoding='utf-8') as f:
-                installed_python = json.load(f)
-            unique_identifier = str(uuid.uuid4())
-            installed_python[unique_identifier] = {
-                'name': name,
-                'version': version,
-                'folder': ensure_path_end_separator(str(extract_path).replace('\\', '/')),
-                'create_type': 'install',
-                'create_type_title': create_type['install'],
-                'version_major': int(version_split[0]),
-                'version_minor': int(version_split[1]),
-                'version_patch': int(version_split[2]),
-            }
-            with open(user_installed_json, 'w', encoding='utf-8') as f:
-                json.dump(installed_python, f, ensure_ascii=False, indent=4)
-        return self.render_to_json_success('安装成功~')
-        # except Exception as e:
-        #     return self.render_to_json_error(f'解压失败: {str(e)}')
+        job = submit_job(
+            f'{app_name}:install:{folder}', f'安装 {name}', install_task,
+            name, version, version_info, install_file_path, folder, bool(request.POST.get('compile_pyc'))
+        )
+        return self.render_to_json_job(job)
 
 
 class NameEditView(PythonRuntimeMixin, FormView):
@@ -365,11 +420,12 @@ class NameEditView(PythonRuntimeMixin, FormView):
     def form_valid(self, form):
         unique_identifier = self.kwargs.get('uuid')
         name = form.cleaned_data.get('name')
-        installed_dict = get_installed()
+        with get_lock(user_installed_json):
+            installed_dict = read_json(user_installed_json, {})
+            if unique_identifier in installed_dict:
+                installed_dict[unique_identifier]['name'] = name
+                write_json(user_installed_json, installed_dict)
         if unique_identifier in installed_dict:
-            installed_dict[unique_identifier]['name'] = name
-            with open(user_installed_json, 'w', encoding='utf-8') as f:
-                json.dump(installed_dict, f, ensure_ascii=False, indent=4)
             messages.success(self.request, '环境标题修改成功~')
         else:
             form.add_error('name', '没有找到需要修改的环境~')
@@ -423,7 +479,8 @@ class UninstallView(PythonRuntimeMixin, FormView):
         installed_info = get_installed(version)
 
         if os.path.exists(installed_info['folder']):
-            # 删除安装目录
+            # 删除安装目录，先结束占用该目录下解释器的助手进程
+            worker_pool.release(installed_info['folder'])
             shutil.rmtree(installed_info['folder'])
         else:
             if 'name' in installed_info:
@@ -442,11 +499,8 @@ class UninstallView(PythonRuntimeMixin, FormView):
         set_reg_user_env('PATH', ';'.join(get_user_env))
 
         # 删除安装信息
-        with open(user_installed_json, 'r', encoding='utf-8') as f:
-            installed_python = json.load(f)
-        del installed_python[version]
-        with open(user_installed_json, 'w', encoding='utf-8') as f:
-            json.dump(installed_python, f, ensure_ascii=False, indent=4)
+        with update_json(user_installed_json, {}) as installed_python:
+            installed_python.pop(version, None)
 
         return super().form_valid(form)
 
@@ -485,12 +539,13 @@ class ImportView(PythonRuntimeMixin, FormView):
         if import_dir and os.path.exists(import_dir):
             import_python_file = os.path.join(import_dir, 'python.exe')
             if os.path.exists(import_python_file):
-                version_str = ''
-                result = run_command([import_python_file, '-V'])
-                if result.stdout:version_str = result.stdout
-                if result.stderr:version_str = result.stderr
-                import_version = version_str.split(maxsplit=1)[1].strip()
-                
+                from jiefoundation.pyworker import interpreter_version, WorkerError
+                try:
+                    import_version = interpreter_version(import_python_file)
+                except WorkerError as e:
+                    form.add_error('import_dir', f'无法运行所选目录中的 python.exe：{e}')
+                    return super().form_invalid(form)
+
                 import_version_list = import_version.split('.')
                 import_name = f'Python-{import_version}'
                 installed_dict = get_installed()
@@ -508,8 +563,7 @@ class ImportView(PythonRuntimeMixin, FormView):
                         'version_minor': int(import_version_list[1]),
                         'version_patch': int(import_version_list[2]),
                     }
-                    with open(user_installed_json, 'w', encoding='utf-8') as f:
-                        json.dump(installed_dict, f, ensure_ascii=False, indent=4)
+                    write_json(user_installed_json, installed_dict)
                 else:
                     form.add_error('import_dir', '存在已安装路径记录！请检查是否选择错误~')
                     return super().form_invalid(form)
@@ -603,6 +657,38 @@ class PackageUpgradeView(PackageUpgradeMixin):
         return ensure_path_end_separator(get_installed(self.request.GET.get('uid'))['folder']) + 'python.exe'
 
 
+from apps.envs_python.views import PackageLatestMixin
+class PackageLatestView(PackageLatestMixin):
+    app_namespace = app_name
+
+    def get_python_path(self):
+        return ensure_path_end_separator(get_installed(self.request.GET.get('uid'))['folder']) + 'python.exe'
+
+
+from apps.envs_python.views import PackageBatchUpgradeMixin
+class PackageBatchUpgradeView(PackageBatchUpgradeMixin):
+    app_namespace = app_name
+
+    def get_python_path(self):
+        return ensure_path_end_separator(get_installed(self.request.GET.get('uid'))['folder']) + 'python.exe'
+
+
+from apps.envs_python.views import PackageExportMixin
+class PackageExportView(PackageExportMixin):
+    app_namespace = app_name
+
+    def get_python_path(self):
+        return ensure_path_end_separator(get_installed(self.request.GET.get('uid'))['folder']) + 'python.exe'
+
+
+from apps.envs_python.views import PackageImportMixin
+class PackageImportView(PackageImportMixin):
+    app_namespace = app_name
+
+    def get_python_path(self):
+        return ensure_path_end_separator(get_installed(self.request.GET.get('uid'))['folder']) + 'python.exe'
+
+
 class PythonDeleteView(RedirectView):
     """
     根据传入的path路径删除Python配置，不会删除实际环境
@@ -618,10 +704,8 @@ class PythonDeleteView(RedirectView):
             else:
                 name = installed_dict[uuid_name]['version']
 
-            del installed_dict[uuid_name]
-
-            with open(user_installed_json, 'w', encoding='utf-8') as f:
-                json.dump(installed_dict, f, ensure_ascii=False, indent=4)
+            with update_json(user_installed_json, {}) as installed_python:
+                installed_python.pop(uuid_name, None)
             messages.success(request, f'{name}删除成功')
         else:
             messages.error(request, '删除失败~没有找到要删除的记录~')
@@ -4,6 +4,8 @@ import shutil
 from pathlib import Path
 import xml.etree.ElementTree as ET
 
+from jiefoundation.jsonstore import read_json
+
 
 def get_dict_subkey_value_list(obj_dict, sub_key):
     return_list = []
@@ -14,9 +16,7 @@ def get_dict_subkey_value_list(obj_dict, sub_key):
 
 def get_pycharm_download():
     from .config import pycharm_download_json
-    with open(pycharm_download_json, 'r', encoding='utf-8') as f:
-        return json.load(f)
-    return {}
+    return read_json(pycharm_download_json)
 
 
 def get_pycharm_install(key_name=None):
@@ -9,6 +9,7 @@ from django.contrib import messages
 
 from jiefoundation.jiebase import JsonView
 from jiefoundation.utils import windows_api_blocking, remove_blank_lines, run_command
+from jiefoundation.pyworker import interpreter_version, worker_pool, WorkerError
 from panelcore.mixin import ProjectMixin
 
 from .forms import PycharmInstallForm, ProjectCreateForm, ProjectSetSdkForm, PycharmResetForm
@@ -574,6 +575,7 @@ class ProjectSetSdkView(ProjectPythonMixin, FormView):
                     if os.path.exists(old_sdk_path):
                         old_sdk_dir = os.path.dirname(os.path.dirname(old_sdk_path))
                         if 'Scripts' in old_sdk_path and os.path.exists(os.path.join(old_sdk_dir, 'pyvenv.cfg')):
+                            worker_pool.release(old_sdk_dir)
                             shutil.rmtree(old_sdk_dir)
 
                 sdk_name = f'{sdk_version}({project_name})-venv'
@@ -681,7 +683,11 @@ class ProjectSetSdkView(ProjectPythonMixin, FormView):
             import uuid
             from .config import sdk_new_str
             sdk_path = python_interpreter.replace('python.exe', '')
-            sdk_version = f'Python {run_command([python_interpreter, '--version']).stdout.replace("Python ", "").strip()}'
+            try:
+                sdk_version = f'Python {interpreter_version(python_interpreter)}'
+            except WorkerError as e:
+                messages.warning(self.request, f'无法获取所选解释器的版本：{e}')
+                return super().form_invalid(form)
             project_name = get_pycharm_project(project_path)['project_name']
             sdk_uuid  = str(uuid.uuid4())
             sdk_name = f'{sdk_version}({project_name})'
@@ -808,7 +814,8 @@ class PycharmSdkDeleteView(RedirectView):
 
 
 from apps.envs_python.views import (
-    PythonRunMixin, PackageListMixin, PackageInstallMixin, PackageUninstallMixin, PackageUpgradeMixin
+    PythonRunMixin, PackageListMixin, PackageInstallMixin, PackageUninstallMixin, PackageUpgradeMixin,
+    PackageLatestMixin, PackageBatchUpgradeMixin, PackageExportMixin, PackageImportMixin
 )
 
 class ProjectPythonPackageMixin(PythonRunMixin):
@@ -862,3 +869,15 @@ class PackageUninstallView(ProjectPythonPackageMixin, PackageUninstallMixin):
 
 class PackageUpgradeView(ProjectPythonPackageMixin, PackageUpgradeMixin):
     pass
+
+class PackageLatestView(ProjectPythonPackageMixin, PackageLatestMixin):
+    pass
+
+class PackageBatchUpgradeView(ProjectPythonPackageMixin, PackageBatchUpgradeMixin):
+    pass
+
+class PackageExportView(ProjectPythonPackageMixin, PackageExportMixin):
+    pass
+
+class PackageImportView(ProjectPythonPackageMixin, PackageImportMixin):
+    pass
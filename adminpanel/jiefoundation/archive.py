@@ -0,0 +1,144 @@
+"""
+ZIP 并行解压
+
+zlib 解压时会释放 GIL，把成员分给线程池解压可以用满多核；每个线程使用自己的 ZipFile 句柄。
+支持只解压某个前缀下的文件并去掉前缀（如 nupkg 包中的 tools/），
+以及 include/exclude 通配符过滤和进度回调。
+"""
+import os
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from fnmatch import fnmatch
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _match_any(path, patterns):
+    return any(fnmatch(path, pattern) or fnmatch(path.lower(), pattern.lower()) for pattern in patterns)
+
+
+def select_members(members, prefix=None, include=None, exclude=None):
+    """
+    按前缀和通配符筛选成员
+
+    :return: ([(ZipInfo, 去掉前缀后的相对路径), ...], 跳过的成员列表)
+    """
+    if prefix:
+        prefix = prefix.replace('\\', '/').rstrip('/') + '/'
+    selected = []
+    skipped = []
+    for member in members:
+        name = member.filename.replace('\\', '/')
+        if prefix:
+            if not name.startswith(prefix):
+                continue
+            name = name[len(prefix):]
+        if not name or name.endswith('/'):
+            if name:
+                selected.append((member, name))
+            continue
+        if include and not _match_any(name, include):
+            skipped.append(member)
+            continue
+        if exclude and _match_any(name, exclude):
+            skipped.append(member)
+            continue
+        selected.append((member, name))
+    return selected, skipped
+
+
+def _target_path(root, name):
+    """计算目标路径，拒绝绝对路径和 .. 跳出目标目录"""
+    parts = [part for part in name.split('/') if part not in ('', '.')]
+    if not parts or '..' in parts or ':' in parts[0]:
+        raise ValueError(f'ZIP 中存在非法路径: {name}')
+    target = os.path.normpath(os.path.join(root, *parts))
+    if os.path.commonpath([root, target]) != root:
+        raise ValueError(f'ZIP 中存在非法路径: {name}')
+    return target
+
+
+def extract_zip(zip_path, extract_to, prefix=None, include=None, exclude=None, progress=None, workers=None):
+    """
+    并行解压 ZIP 文件
+
+    :param zip_path: ZIP 文件路径
+    :param extract_to: 解压目标目录
+    :param prefix: 只解压该前缀下的文件，并去掉前缀，如 'tools/'
+    :param include: 只解压匹配的文件（相对去掉前缀后的路径），如 ['bin/*']
+    :param exclude: 不解压匹配的文件，如 ['*.pdb', 'lib/*.lib']
+    :param progress: 进度回调 progress(files_done, files_total, bytes_done, bytes_total)，抛出异常中断解压
+    :param workers: 线程数，默认按CPU核数
+    :return: {'files': 解压文件数, 'bytes': 解压字节数, 'skipped_files': 跳过文件数, 'skipped_bytes': 跳过字节数}
+    """
+    root = os.path.abspath(extract_to)
+    os.makedirs(root, exist_ok=True)
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        selected, skipped = select_members(zip_ref.infolist(), prefix, include, exclude)
+
+    files = []
+    folders = set()
+    for member, name in selected:
+        target = _target_path(root, name)
+        if member.is_dir():
+            folders.add(target)
+        else:
+            folders.add(os.path.dirname(target))
+            files.append((member, target))
+    for folder in sorted(folders):
+        os.makedirs(folder, exist_ok=True)
+
+    # 大文件先解压，线程间负载更均衡
+    files.sort(key=lambda item: item[0].file_size, reverse=True)
+    bytes_total = sum(member.file_size for member, target in files)
+    result = {
+        'files': len(files),
+        'bytes': bytes_total,
+        'skipped_files': len(skipped),
+        'skipped_bytes': sum(member.file_size for member in skipped),
+    }
+    if not files:
+        return result
+
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+    stop = threading.Event()
+
+    def extract_one(member, target):
+        if stop.is_set():
+            return 0
+        zip_file = getattr(local, 'zip_file', None)
+        if zip_file is None:
+            zip_file = local.zip_file = zipfile.ZipFile(zip_path, 'r')
+            with handles_lock:
+                handles.append(zip_file)
+        with zip_file.open(member) as source, open(target, 'wb') as dest:
+            shutil.copyfileobj(source, dest, COPY_BUFFER_SIZE)
+        return member.file_size
+
+    if workers is None:
+        workers = min(8, os.cpu_count() or 1)
+    executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='jieunzip')
+    try:
+        pending = {executor.submit(extract_one, member, target) for member, target in files}
+        files_done = 0
+        bytes_done = 0
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                bytes_done += future.result()
+                files_done += 1
+            if progress:
+                progress(files_done, len(files), bytes_done, bytes_total)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for handle in handles:
+            handle.close()
+    return result
@@ -0,0 +1,398 @@
+"""
+断点续传、分段并行下载
+
+- 服务器支持 Range 时按分段并行下载，未完成的数据保存在 <目标文件>.part，
+  分段进度保存在 <目标文件>.part.json，重试或重启面板后从已下载的位置继续；
+- 每个分段单独重试（指数退避），共用一个连接池 Session；
+- 下载过程中按文件顺序增量计算 sha256/md5，下载完成即得到摘要，不需要再整文件读一遍；
+- 服务器不支持 Range 时退回单线程流式下载。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from jiefoundation.hashing import record_digests
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36 Edg/140.0.0.0'
+}
+
+CHUNK_SIZE = 256 * 1024
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+STATE_SAVE_INTERVAL = 2
+
+
+class DownloadError(Exception):
+    """下载失败（网络错误重试耗尽、校验失败等）"""
+
+
+class ChecksumError(DownloadError):
+    """下载完成但摘要与期望值不一致"""
+
+
+class RangeNotSatisfied(Exception):
+    """分段请求没有返回 206，远程文件可能已变化"""
+
+
+def _create_session(pool_size):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+class Downloader:
+    """
+    单个文件的下载器
+
+    :param url: 下载地址
+    :param destination: 保存路径
+    :param segments: 并行分段数
+    :param algorithms: 需要计算的摘要算法
+    :param max_retries: 每个分段的最大重试次数
+    :param timeout: 连接/读取超时秒数
+    :param progress: 进度回调 progress(bytes_done, bytes_total)
+    :param cancel_check: 取消检查回调，需要中止时抛出异常
+    """
+
+    def __init__(self, url, destination, segments=4, algorithms=('sha256', 'md5'), max_retries=3,
+                 timeout=30, progress=None, cancel_check=None, session=None):
+        self.url = url
+        self.destination = str(destination)
+        self.part_path = self.destination + '.part'
+        self.state_path = self.destination + '.part.json'
+        self.segments = max(int(segments), 1)
+        self.algorithms = tuple(algorithms)
+        self.max_retries = max(int(max_retries), 1)
+        self.timeout = timeout
+        self.progress = progress
+        self.cancel_check = cancel_check
+        self.session = session or _create_session(self.segments)
+
+        self.size = 0
+        self.etag = ''
+        self.last_modified = ''
+        self.ranges = []
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._hash_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._hashers = {}
+        self._hashed = 0
+        self._last_save = 0
+
+    # ---------- 对外接口 ----------
+
+    def run(self):
+        """
+        执行下载，成功后把 .part 改名为目标文件
+
+        :return: {'size': 文件大小, 'sha256': ..., 'md5': ...}
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.destination)), exist_ok=True)
+        self._hashers = {name: hashlib.new(name) for name in self.algorithms}
+        self._hashed = 0
+
+        supports_range = self._probe()
+        if supports_range and self.size:
+            self._load_state()
+            self._prepare_part_file()
+            self._download_segments()
+        else:
+            self._download_single()
+
+        self._advance_hash()
+        if self._hashed != self._file_size():
+            raise DownloadError(f'下载文件大小不一致：{self._file_size()}/{self.size}')
+        os.replace(self.part_path, self.destination)
+        self._remove_state()
+        digests = {name: hasher.hexdigest() for name, hasher in self._hashers.items()}
+        record_digests(self.destination, digests)
+        result = {'size': self._hashed}
+        result.update(digests)
+        return result
+
+    # ---------- 探测与状态 ----------
+
+    def _probe(self):
+        """请求第一个字节，判断服务器是否支持 Range 并取得文件大小"""
+        import requests
+
+        for attempt in range(self.max_retries):
+            self._check_cancelled()
+            try:
+                with self.session.get(self.url, headers={'Range': 'bytes=0-0'}, stream=True,
+                                      timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    self.etag = response.headers.get('ETag', '')
+                    self.last_modified = response.headers.get('Last-Modified', '')
+                    content_range = response.headers.get('Content-Range', '')
+                    if response.status_code == 206 and '/' in content_range:
+                        total = content_range.rsplit('/', 1)[1].strip()
+                        if total.isdigit():
+                            self.size = int(total)
+                            return True
+                    self.size = int(response.headers.get('Content-Length') or 0)
+                    return False
+            except requests.exceptions.RequestException as e:
+                self._retry_wait(attempt, e)
+        return False
+
+    def _load_state(self):
+        """读取上次未完成的分段信息，远程文件变化时重新开始"""
+        state = {}
+        if os.path.exists(self.state_path) and os.path.exists(self.part_path):
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+        same_file = (
+            state.get('url') == self.url and state.get('size') == self.size and
+            state.get('etag', '') == self.etag and state.get('last_modified', '') == self.last_modified
+        )
+        if same_file and state.get('ranges'):
+            self.ranges = [list(item) for item in state['ranges']]
+            print(f'继续上次的下载：{self._done_bytes()}/{self.size}')
+            return
+        self._remove_part()
+        count = min(self.segments, max(self.size // MIN_SEGMENT_SIZE, 1))
+        step = -(-self.size // count)
+        # 每个分段：[起始位置, 结束位置(不含), 已下载字节数]
+        self.ranges = [[start, min(start + step, self.size), 0] for start in range(0, self.size, step)]
+
+    def _save_state(self, force=False):
+        with self._state_lock:
+            now = time.time()
+            if not force and now - self._last_save < STATE_SAVE_INTERVAL:
+                return
+            self._last_save = now
+            with self._lock:
+                state = {
+                    'url': self.url,
+                    'size': self.size,
+                    'etag': self.etag,
+                    'last_modified': self.last_modified,
+                    'ranges': [list(item) for item in self.ranges],
+                }
+            tmp_path = self.state_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+
+    def _prepare_part_file(self):
+        if not os.path.exists(self.part_path):
+            with open(self.part_path, 'wb') as f:
+                f.truncate(self.size)
+        elif os.path.getsize(self.part_path) != self.size:
+            with open(self.part_path, 'r+b') as f:
+                f.truncate(self.size)
+        self._save_state(force=True)
+
+    def _remove_part(self):
+        for path in (self.part_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _remove_state(self):
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    # ---------- 下载 ----------
+
+    def _download_segments(self):
+        pending = [index for index, (start, end, done) in enumerate(self.ranges) if start + done < end]
+        self._report()
+        if not pending:
+            return
+        errors = []
+        with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='jiedownload') as executor:
+            futures = [executor.submit(self._download_range, index) for index in pending]
+            for future in futures:
+                try:
+                    future.result()
+                except BaseException as e:
+                    self._stop.set()
+                    errors.append(e)
+        self._save_state(force=True)
+        if errors:
+            for error in errors:
+                if not isinstance(error, (DownloadError, RangeNotSatisfied)):
+                    raise error
+            if any(isinstance(error, RangeNotSatisfied) for error in errors):
+                self._remove_part()
+                raise DownloadError('远程文件已变化，请重新下载~')
+            raise errors[0]
+
+    def _download_range(self, index):
+        import requests
+
+        attempt = 0
+        while not self._stop.is_set():
+            start, end, done = self.ranges[index]
+            if start + done >= end:
+                return
+            headers = {'Range': f'bytes={start + done}-{end - 1}'}
+            if self.etag:
+                headers['If-Range'] = self.etag
+            elif self.last_modified:
+                headers['If-Range'] = self.last_modified
+            try:
+                with self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise RangeNotSatisfied(f'分段请求返回 {response.status_code}')
+                    with open(self.part_path, 'r+b', buffering=0) as f:
+                        f.seek(start + done)
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            if self._stop.is_set():
+                                return
+                            self._check_cancelled()
+                            if not chunk:
+                                continue
+                            chunk = chunk[:end - start - done]
+                            position = start + done
+                            f.write(chunk)
+                            done += len(chunk)
+                            with self._lock:
+                                self.ranges[index][2] = done
+                            self._feed_hash(position, chunk)
+                            self._report()
+                            self._save_state()
+                            if start + done >= end:
+                                break
+                if start + done < end:
+                    raise requests.exceptions.ChunkedEncodingError('连接提前关闭')
+                self._advance_hash()
+                return
+            except requests.exceptions.RequestException as e:
+                self._retry_wait(attempt, e)
+                attempt += 1
+
+    def _download_single(self):
+        """服务器不支持 Range：单线程流式下载，失败只能从头开始"""
+        import requests
+
+        self._remove_part()
+        for attempt in range(self.max_retries):
+            self._check_cancelled()
+            self._hashers = {name: hashlib.new(name) for name in self.algorithms}
+            self._hashed = 0
+            try:
+                with self.session.get(self.url, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    self.size = int(response.headers.get('Content-Length') or 0)
+                    with open(self.part_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            self._check_cancelled()
+                            if not chunk:
+                                continue
+                            f.write(chunk)
+                            for hasher in self._hashers.values():
+                                hasher.update(chunk)
+                            self._hashed += len(chunk)
+                            self._report(self._hashed)
+                if not self.size:
+                    self.size = self._hashed
+                return
+            except requests.exceptions.RequestException as e:
+                self._retry_wait(attempt, e)
+
+    # ---------- 增量摘要 ----------
+
+    def _contiguous_end(self):
+        """从文件开头起已经连续下载完成的位置"""
+        with self._lock:
+            for start, end, done in self.ranges:
+                if start + done < end:
+                    return start + done
+            return self.size
+
+    def _feed_hash(self, position, chunk):
+        """刚写入的数据正好接在摘要游标之后时直接计算，否则等前面的分段完成后从磁盘补读"""
+        with self._hash_lock:
+            if position == self._hashed:
+                for hasher in self._hashers.values():
+                    hasher.update(chunk)
+                self._hashed += len(chunk)
+        self._advance_hash()
+
+    def _advance_hash(self):
+        target = self._contiguous_end()
+        if target <= self._hashed:
+            return
+        with self._hash_lock:
+            if target <= self._hashed:
+                return
+            with open(self.part_path, 'rb') as f:
+                f.seek(self._hashed)
+                while self._hashed < target:
+                    data = f.read(min(1024 * 1024, target - self._hashed))
+                    if not data:
+                        break
+                    for hasher in self._hashers.values():
+                        hasher.update(data)
+                    self._hashed += len(data)
+
+    # ---------- 工具 ----------
+
+    def _done_bytes(self):
+        with self._lock:
+            return sum(done for start, end, done in self.ranges)
+
+    def _file_size(self):
+        return os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+
+    def _report(self, done=None):
+        if self.progress:
+            self.progress(self._done_bytes() if done is None else done, self.size)
+
+    def _check_cancelled(self):
+        if self.cancel_check:
+            self.cancel_check()
+
+    def _retry_wait(self, attempt, error):
+        if attempt >= self.max_retries - 1:
+            print(f'下载失败，已达到最大重试次数: {error}')
+            raise DownloadError(f'下载失败: {error}')
+        print(f'下载失败 (尝试 {attempt + 1}/{self.max_retries}): {error}')
+        for _ in range(2 ** attempt * 10):
+            self._check_cancelled()
+            if self._stop.is_set():
+                return
+            time.sleep(0.1)
+
+
+def download(url, destination, expected=None, **kwargs):
+    """
+    下载文件到 destination，支持断点续传和分段并行
+
+    :param url: 下载地址
+    :param destination: 保存路径
+    :param expected: 期望的摘要，如 {'sha256': '...'}，不一致时删除文件并抛出 ChecksumError
+    :param kwargs: 参见 Downloader
+    :return: {'size': 文件大小, 'sha256': ..., 'md5': ...}
+    :raises DownloadError: 网络、文件读写等错误都转换为 DownloadError，取消任务的异常原样抛出
+    """
+    import requests
+
+    expected = {name: value for name, value in (expected or {}).items() if value}
+    algorithms = set(kwargs.pop('algorithms', ('sha256', 'md5'))) | set(expected)
+    try:
+        downloader = Downloader(url, destination, algorithms=sorted(algorithms), **kwargs)
+        result = downloader.run()
+    except (requests.exceptions.RequestException, OSError) as e:
+        raise DownloadError(f'下载失败: {e}') from e
+    for name, value in expected.items():
+        if result.get(name, '').lower() != value.lower():
+            os.remove(destination)
+            raise ChecksumError(f'下载文件{name}校验失败~请换地址或者清理缓存后再重试！')
+    return result
@@ -0,0 +1,142 @@
+"""
+文件摘要缓存
+
+计算过的摘要按 (文件名, 大小, mtime_ns, inode) 记录在文件所在目录的 .jiehash.json 中，
+文件没有变化时直接返回记录的摘要，不再重复读取整个文件；
+多个算法一次读取同时计算，读取使用 1MB 缓冲区。
+"""
+import hashlib
+import json
+import os
+import threading
+
+INDEX_FILE_NAME = '.jiehash.json'
+BUFFER_SIZE = 1024 * 1024
+
+_indexes = {}
+_lock = threading.RLock()
+
+
+def _stat_key(stat):
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'inode': stat.st_ino}
+
+
+def _index_path(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), INDEX_FILE_NAME)
+
+
+def _load_index(index_path):
+    """读取目录索引，索引文件没有变化时使用内存中的副本"""
+    try:
+        mtime_ns = os.stat(index_path).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    cached = _indexes.get(index_path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    index = {}
+    if mtime_ns is not None:
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+    _indexes[index_path] = (mtime_ns, index)
+    return index
+
+
+def _save_index(index_path, index):
+    # 只保留仍然存在的文件，避免索引无限增长
+    folder = os.path.dirname(index_path)
+    index = {name: record for name, record in index.items() if os.path.exists(os.path.join(folder, name))}
+    tmp_path = index_path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, index_path)
+        _indexes[index_path] = (os.stat(index_path).st_mtime_ns, index)
+    except OSError as e:
+        # 目录只读等情况下只缓存在内存中
+        print(f'保存文件摘要索引失败: {e}')
+        _indexes[index_path] = (None, index)
+
+
+def compute_digests(path, algorithms=('sha256',)):
+    """
+    读取一次文件，同时计算多个摘要
+
+    :return: {'sha256': ..., 'md5': ...}
+    """
+    hashers = {name: hashlib.new(name) for name in algorithms}
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            for hasher in hashers.values():
+                hasher.update(view[:size])
+    return {name: hasher.hexdigest() for name, hasher in hashers.items()}
+
+
+def file_digests(path, algorithms=('sha256',)):
+    """
+    获取文件摘要，文件未变化时直接使用索引中的记录
+
+    :param path: 文件路径
+    :param algorithms: 算法名称，如 ('sha256', 'md5')
+    :return: {'sha256': ..., 'md5': ...}
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    name = os.path.basename(path)
+    index_path = _index_path(path)
+    with _lock:
+        record = dict(_load_index(index_path).get(name) or {})
+    if {key: record.get(key) for key in ('size', 'mtime_ns', 'inode')} != _stat_key(stat):
+        record = _stat_key(stat)
+    missing = [algorithm for algorithm in algorithms if algorithm not in record]
+    if missing:
+        record.update(compute_digests(path, missing))
+        with _lock:
+            # 计算期间文件被修改时不写入索引
+            if _stat_key(os.stat(path)) == _stat_key(stat):
+                index = dict(_load_index(index_path))
+                index[name] = record
+                _save_index(index_path, index)
+    return {algorithm: record[algorithm] for algorithm in algorithms}
+
+
+def record_digests(path, digests):
+    """
+    记录已知的文件摘要（例如下载时边下载边计算得到的摘要）
+
+    :param path: 文件路径
+    :param digests: {'sha256': ..., 'md5': ...}
+    """
+    path = os.path.abspath(path)
+    record = _stat_key(os.stat(path))
+    record.update({name: value for name, value in digests.items() if name in hashlib.algorithms_available})
+    index_path = _index_path(path)
+    with _lock:
+        index = dict(_load_index(index_path))
+        index[os.path.basename(path)] = record
+        _save_index(index_path, index)
+
+
+def verify_file(path, expected):
+    """
+    校验文件摘要
+
+    :param expected: {'sha256': ...}，值为空的算法忽略
+    :return: bool
+    """
+    expected = {name: value for name, value in expected.items() if value}
+    if not expected:
+        return True
+    try:
+        digests = file_digests(path, tuple(expected))
+    except OSError:
+        return False
+    return all(digests[name].lower() == value.lower() for name, value in expected.items())
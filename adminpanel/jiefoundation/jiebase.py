@@ -55,3 +55,20 @@ class JsonView(View):
             'status': 'error',
             'message': message
         }, status=status)
+
+    def render_to_json_job(self, job, message='', status=202):
+        """
+        返回后台任务已提交的响应，页面根据 status_url 轮询任务进度，通过 cancel_url 取消任务
+        """
+        from django.middleware.csrf import get_token
+        from django.urls import reverse
+
+        # 取消任务需要 POST，提交任务的页面不一定有表单，确保响应中设置了 csrftoken cookie
+        get_token(self.request)
+        return self.render_to_json_response({
+            'status': 'success',
+            'message': message or f'{job.title} 已开始执行~',
+            'job_id': job.id,
+            'status_url': reverse('job_status', kwargs={'job_id': job.id}),
+            'cancel_url': reverse('job_cancel', kwargs={'job_id': job.id}),
+        }, status=status)
@@ -0,0 +1,316 @@
+"""
+后台任务引擎
+
+下载、解压、安装等耗时操作放到有界线程池中执行，视图只负责提交任务并立即返回任务ID，
+页面通过 JSON 状态接口轮询进度。同一个 key 的任务在运行期间只会存在一个，
+重复提交（例如刷新页面后再次点击）会直接返回正在运行的任务。
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_SUCCESS = 'success'
+JOB_ERROR = 'error'
+JOB_CANCELLED = 'cancelled'
+
+JOB_STATUS_TEXT = {
+    JOB_PENDING: '排队中',
+    JOB_RUNNING: '执行中',
+    JOB_SUCCESS: '已完成',
+    JOB_ERROR: '失败',
+    JOB_CANCELLED: '已取消',
+}
+
+ACTIVE_STATUS = (JOB_PENDING, JOB_RUNNING)
+
+
+class JobCancelled(Exception):
+    """任务被用户取消"""
+
+
+class Job:
+    """
+    单个后台任务
+
+    任务函数的第一个参数是 Job 实例，通过 set_stage()/update() 上报进度，
+    在循环中调用 check_cancelled() 响应取消请求。
+    """
+
+    def __init__(self, key, title, func, args=(), kwargs=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.title = title
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.status = JOB_PENDING
+        self.stage = ''
+        self.stages = OrderedDict()
+        self.message = ''
+        self.result = None
+        self.error = ''
+        self.logs = deque(maxlen=500)
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def is_active(self):
+        return self.status in ACTIVE_STATUS
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """请求取消任务，任务函数在下一次 check_cancelled() 时退出"""
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled(f'任务 {self.title} 已取消')
+
+    def set_stage(self, name, title=None, **progress):
+        """
+        切换到新的阶段，之前的阶段自动标记为完成
+
+        :param name: 阶段标识，如 download、unzip、install
+        :param title: 阶段显示名称
+        :param progress: 初始进度，参见 update()
+        """
+        with self._lock:
+            if self.stage and self.stage in self.stages and self.stage != name:
+                previous = self.stages[self.stage]
+                if previous['status'] == JOB_RUNNING:
+                    previous['status'] = JOB_SUCCESS
+                    previous['percent'] = 100
+            self.stage = name
+            self.stages[name] = {
+                'name': name,
+                'title': title or name,
+                'status': JOB_RUNNING,
+                'bytes_done': 0,
+                'bytes_total': 0,
+                'files_done': 0,
+                'files_total': 0,
+                'percent': 0,
+            }
+            if title:
+                self.message = title
+        if progress:
+            self.update(**progress)
+
+    def update(self, message=None, percent=None, **progress):
+        """
+        更新当前阶段的进度
+
+        :param message: 提示信息
+        :param percent: 百分比，不传时根据字节数或文件数计算
+        :param progress: bytes_done、bytes_total、files_done、files_total
+        """
+        with self._lock:
+            if message is not None:
+                self.message = message
+            if not self.stage:
+                return
+            stage = self.stages[self.stage]
+            for key in ('bytes_done', 'bytes_total', 'files_done', 'files_total'):
+                if key in progress and progress[key] is not None:
+                    stage[key] = progress[key]
+            if percent is None:
+                if stage['bytes_total']:
+                    percent = stage['bytes_done'] * 100 / stage['bytes_total']
+                elif stage['files_total']:
+                    percent = stage['files_done'] * 100 / stage['files_total']
+            if percent is not None:
+                stage['percent'] = round(min(max(percent, 0), 100), 1)
+
+    def log(self, line):
+        """追加一行任务日志（如子进程输出）"""
+        self.logs.append(line.rstrip())
+
+    def to_dict(self):
+        with self._lock:
+            stages = [dict(stage) for stage in self.stages.values()]
+            current = self.stages.get(self.stage, {})
+            return {
+                'id': self.id,
+                'key': self.key,
+                'title': self.title,
+                'status': self.status,
+                'status_text': JOB_STATUS_TEXT.get(self.status, self.status),
+                'stage': self.stage,
+                'stage_title': current.get('title', ''),
+                'percent': current.get('percent', 0),
+                'stages': stages,
+                'message': self.message,
+                'result': self.result,
+                'error': self.error,
+                'logs': list(self.logs)[-50:],
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+
+    def run(self):
+        if self.cancelled:
+            self.status = JOB_CANCELLED
+            self.finished_at = time.time()
+            return
+        self.status = JOB_RUNNING
+        self.started_at = time.time()
+        try:
+            self.result = self.func(self, *self.args, **self.kwargs)
+            with self._lock:
+                if self.stage in self.stages:
+                    self.stages[self.stage]['status'] = JOB_SUCCESS
+                    self.stages[self.stage]['percent'] = 100
+            self.status = JOB_SUCCESS
+        except JobCancelled as e:
+            self.status = JOB_CANCELLED
+            self.error = str(e)
+        except Exception as e:
+            print(f'后台任务 {self.title} 执行失败: {e}')
+            with self._lock:
+                if self.stage in self.stages:
+                    self.stages[self.stage]['status'] = JOB_ERROR
+            self.status = JOB_ERROR
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+
+
+class JobManager:
+    """
+    任务管理器：有界线程池 + 内存中的任务表
+
+    :param max_workers: 同时执行的任务数
+    :param keep_finished: 保留的已结束任务数量，超出后按时间淘汰
+    """
+
+    def __init__(self, max_workers=4, keep_finished=100):
+        self.max_workers = max_workers
+        self.keep_finished = keep_finished
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='jiejob')
+        return self._executor
+
+    def submit(self, key, title, func, *args, **kwargs):
+        """
+        提交任务，同 key 的任务正在排队或执行时直接返回该任务
+
+        :return: Job
+        """
+        with self._lock:
+            if key:
+                for job in reversed(self._jobs.values()):
+                    if job.key == key and job.is_active:
+                        return job
+            job = Job(key, title, func, args, kwargs)
+            self._jobs[job.id] = job
+            self._prune()
+            self._get_executor().submit(job.run)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def find(self, key, active_only=True):
+        """按 key 查找最近的任务"""
+        for job in reversed(list(self._jobs.values())):
+            if job.key == key and (job.is_active or not active_only):
+                return job
+        return None
+
+    def list(self, key_prefix=None, active_only=False):
+        jobs = []
+        for job in list(self._jobs.values()):
+            if key_prefix and not (job.key or '').startswith(key_prefix):
+                continue
+            if active_only and not job.is_active:
+                continue
+            jobs.append(job)
+        return jobs
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job and job.is_active:
+            job.cancel()
+            return True
+        return False
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.is_active]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            self._jobs.pop(job_id, None)
+
+
+def _create_job_manager():
+    try:
+        from django.conf import settings
+        max_workers = getattr(settings, 'JOB_MAX_WORKERS', 4)
+    except Exception:
+        max_workers = 4
+    return JobManager(max_workers=max_workers)
+
+
+job_manager = _create_job_manager()
+
+
+def submit_job(key, title, func, *args, **kwargs):
+    """提交后台任务，参见 JobManager.submit"""
+    return job_manager.submit(key, title, func, *args, **kwargs)
+
+
+def get_job(job_id):
+    return job_manager.get(job_id)
+
+
+def find_job(key, active_only=True):
+    return job_manager.find(key, active_only=active_only)
+
+
+def run_command_logged(job, args, cwd=None, env=None, encoding='utf-8', on_line=None):
+    """
+    在任务中执行命令，输出逐行写入任务日志；任务被取消时结束子进程
+
+    :param on_line: 每行输出的回调 on_line(line)
+    :return: (returncode, 输出行列表)
+    """
+    import subprocess
+
+    process = subprocess.Popen(
+        args, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, encoding=encoding, errors='replace', bufsize=1
+    )
+    lines = []
+    try:
+        for line in process.stdout:
+            line = line.rstrip()
+            if not line:
+                continue
+            lines.append(line)
+            job.log(line)
+            if on_line:
+                on_line(line)
+            if job.cancelled:
+                process.terminate()
+                break
+        process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+    job.check_cancelled()
+    return process.returncode, lines
@@ -0,0 +1,108 @@
+"""
+JSON 文档存储
+
+installed.json、config.json 等数据文件统一通过这里读写：
+- 读取结果按 (mtime_ns, size) 缓存在内存中，文件没有变化时不再重复解析，返回的是深拷贝，调用方可以随意修改；
+- 写入先写临时文件再 os.replace 替换，不会留下写了一半的文件；
+- 同一个文件的写入用锁串行化，读-改-写使用 update_json() 保证不会互相覆盖。
+"""
+import copy
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+_cache = {}
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def get_lock(path):
+    """获取文件对应的锁（可重入）"""
+    key = _key(path)
+    with _locks_lock:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.RLock()
+        return lock
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_json(path, default=None):
+    """
+    读取JSON文件
+
+    :param path: 文件路径
+    :param default: 文件不存在时写入并返回的默认值，为 None 时文件不存在直接抛出 FileNotFoundError
+    :return: 解析后的数据（深拷贝）
+    """
+    key = _key(path)
+    signature = _stat(path)
+    if signature is None:
+        if default is None:
+            raise FileNotFoundError(f'文件不存在：{path}')
+        with get_lock(path):
+            if _stat(path) is None:
+                write_json(path, default)
+        signature = _stat(path)
+    cached = _cache.get(key)
+    if cached and cached[0] == signature:
+        return copy.deepcopy(cached[1])
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    _cache[key] = (signature, data)
+    return copy.deepcopy(data)
+
+
+def write_json(path, data, indent=4):
+    """
+    原子写入JSON文件：写入同目录的临时文件后替换原文件
+    """
+    key = _key(path)
+    folder = os.path.dirname(os.path.abspath(str(path)))
+    os.makedirs(folder, exist_ok=True)
+    with get_lock(path):
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=folder)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=indent)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _cache[key] = (_stat(path), copy.deepcopy(data))
+
+
+@contextmanager
+def update_json(path, default=None):
+    """
+    读-改-写，期间持有文件锁
+
+        with update_json(installed_file_path, {}) as installed:
+            installed[key] = value
+    """
+    with get_lock(path):
+        data = read_json(path, default)
+        yield data
+        write_json(path, data)
+
+
+def invalidate(path=None):
+    """清除缓存，path 为空时清除全部"""
+    if path is None:
+        _cache.clear()
+    else:
+        _cache.pop(_key(path), None)
@@ -0,0 +1,321 @@
+"""
+解释器常驻助手进程
+
+面板经常只是为了问一个问题（版本、sys.path、已安装的包、某个模块能否导入）就启动一次目标解释器，
+Windows 下每次启动需要 100~500 毫秒。这里为每个解释器保留一个常驻的助手进程，
+通过标准输入输出按行交换 JSON（JSON-RPC 的简化形式）：
+
+    请求 {"id": 1, "method": "version", "params": {}}
+    响应 {"id": 1, "result": {...}} 或 {"id": 1, "error": "..."}
+
+- 同一个解释器的请求串行执行，不同解释器互不影响；
+- 空闲超过 idle_timeout 秒的助手进程自动退出，python.exe 被替换（大小或修改时间变化）后重新启动；
+- 助手进程崩溃或超时时结束并重启，请求重试一次。
+"""
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+# 在目标解释器中运行，需要兼容 Python 2.7 和较旧的 Python 3：不能使用 f-string，
+# 2.7 没有 importlib.util 和 importlib.invalidate_caches，按行读取标准输入不能用 for line in sys.stdin（有预读缓冲）
+WORKER_SCRIPT = r'''
+import importlib, json, sys
+
+def _invalidate_caches():
+    if hasattr(importlib, 'invalidate_caches'):
+        importlib.invalidate_caches()
+
+def _find_module(name):
+    try:
+        import importlib.util
+    except ImportError:
+        # Python 2：逐级查找包内模块，os.path 这样已导入的别名模块直接返回
+        if name in sys.modules:
+            return True
+        import imp
+        path = None
+        for part in name.split('.'):
+            module_file, path, description = imp.find_module(part, path and [path])
+            if module_file:
+                module_file.close()
+        return True
+    return importlib.util.find_spec(name) is not None
+
+def _version(params):
+    return {'version': sys.version.split()[0], 'version_info': list(sys.version_info[:3]),
+            'executable': sys.executable, 'prefix': sys.prefix, 'base_prefix': getattr(sys, 'base_prefix', sys.prefix),
+            'arch': 64 if sys.maxsize > 2 ** 32 else 32}
+
+def _sys_path(params):
+    return list(sys.path)
+
+def _distributions(params):
+    _invalidate_caches()
+    result = {}
+    try:
+        from importlib import metadata
+        for dist in metadata.distributions():
+            name = dist.metadata['Name']
+            if name and name not in result:
+                result[name] = dist.version
+    except ImportError:
+        import pkg_resources
+        for dist in pkg_resources.WorkingSet():
+            result.setdefault(dist.project_name, dist.version)
+    return result
+
+def _import_check(params):
+    _invalidate_caches()
+    result = {}
+    for name in params.get('modules', []):
+        try:
+            if params.get('do_import'):
+                importlib.import_module(name)
+                result[name] = True
+            else:
+                result[name] = _find_module(name)
+        except ImportError:
+            result[name] = False
+        except Exception as e:
+            result[name] = '{0}: {1}'.format(type(e).__name__, e)
+    return result
+
+METHODS = {'ping': lambda params: 'pong', 'version': _version, 'sys_path': _sys_path,
+           'distributions': _distributions, 'import_check': _import_check}
+
+out = sys.stdout
+sys.stdout = sys.stderr
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    if not line.strip():
+        continue
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        response = {'id': None, 'error': 'invalid request: {0}'.format(e)}
+    else:
+        try:
+            method = METHODS[request.get('method')]
+            response = {'id': request.get('id'), 'result': method(request.get('params') or {})}
+        except Exception as e:
+            response = {'id': request.get('id'), 'error': '{0}: {1}'.format(type(e).__name__, e)}
+    out.write(json.dumps(response) + '\n')
+    out.flush()
+'''
+
+IDLE_TIMEOUT = 300
+CALL_TIMEOUT = 30
+
+
+class WorkerError(Exception):
+    pass
+
+
+def _executable_signature(python_path):
+    stat = os.stat(python_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class PythonWorker:
+    """
+    一个解释器的常驻助手进程
+
+    :param python_path: 解释器路径
+    """
+
+    def __init__(self, python_path):
+        self.python_path = str(python_path)
+        self.signature = None
+        self.last_used = time.time()
+        self._process = None
+        self._responses = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def _start(self):
+        env = dict(os.environ, PYTHONIOENCODING='utf-8', PYTHONDONTWRITEBYTECODE='1')
+        kwargs = {}
+        if sys.platform == 'win32':
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        self.signature = _executable_signature(self.python_path)
+        self._process = subprocess.Popen(
+            [self.python_path, '-c', WORKER_SCRIPT],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', errors='replace', bufsize=1, env=env, **kwargs
+        )
+        self._responses = queue.Queue()
+        threading.Thread(
+            target=self._read_loop, args=(self._process, self._responses), daemon=True, name='jiepyworker'
+        ).start()
+
+    @staticmethod
+    def _read_loop(process, responses):
+        for line in process.stdout:
+            responses.put(line)
+        # 进程结束
+        responses.put(None)
+
+    def _request(self, method, params, timeout):
+        self._next_id += 1
+        request_id = self._next_id
+        self._process.stdin.write(json.dumps({'id': request_id, 'method': method, 'params': params}) + '\n')
+        self._process.stdin.flush()
+        deadline = time.time() + timeout
+        while True:
+            try:
+                line = self._responses.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                raise TimeoutError(f'助手进程 {method} 请求超时')
+            if line is None:
+                raise BrokenPipeError('助手进程已退出')
+            response = json.loads(line)
+            if response.get('id') == request_id:
+                return response
+
+    def call(self, method, timeout=CALL_TIMEOUT, **params):
+        """
+        发送请求并等待结果
+
+        :raises WorkerError: 助手进程返回错误或两次启动都失败
+        """
+        with self._lock:
+            self.last_used = time.time()
+            for attempt in range(2):
+                if not self.alive or self.signature != _executable_signature(self.python_path):
+                    self._stop()
+                    self._start()
+                try:
+                    response = self._request(method, params, timeout)
+                    break
+                except (OSError, ValueError, TimeoutError) as e:
+                    # 崩溃、输出异常或卡住时结束进程，下一次重新启动
+                    self._stop()
+                    if attempt:
+                        raise WorkerError(f'{self.python_path} 助手进程出错: {e}') from e
+            self.last_used = time.time()
+        if 'error' in response:
+            raise WorkerError(response['error'])
+        return response['result']
+
+    def _stop(self):
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            # 等进程真正退出，之后才能删除解释器所在的目录
+            process.wait()
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+class WorkerPool:
+    """
+    按解释器路径管理助手进程
+
+    :param idle_timeout: 空闲多少秒后结束助手进程
+    """
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def get(self, python_path):
+        key = os.path.normcase(os.path.abspath(str(python_path)))
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None:
+                worker = self._workers[key] = PythonWorker(python_path)
+            # 取出后马上要使用，避免在这期间被当作空闲回收
+            worker.last_used = time.time()
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_loop, daemon=True, name='jiepyworker-reaper')
+                self._reaper.start()
+            return worker
+
+    def call(self, python_path, method, timeout=CALL_TIMEOUT, **params):
+        if not os.path.exists(str(python_path)):
+            raise FileNotFoundError(f'指定的Python路径 {python_path} 无法找到~')
+        return self.get(python_path).call(method, timeout=timeout, **params)
+
+    def release(self, path):
+        """
+        结束解释器路径为 path 或位于 path 目录下的助手进程
+
+        助手进程占用着 python.exe 和 DLL，Windows 下删除运行环境、模板或虚拟环境目录之前必须先调用
+        """
+        target = os.path.normcase(os.path.abspath(str(path))).rstrip('\\/')
+        with self._lock:
+            released = [(key, worker) for key, worker in self._workers.items()
+                        if key == target or key.startswith(target + os.sep)]
+            for key, worker in released:
+                del self._workers[key]
+        for key, worker in released:
+            worker.close()
+        return len(released)
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(min(self.idle_timeout, 30))
+            now = time.time()
+            with self._lock:
+                idle = [(key, worker) for key, worker in self._workers.items()
+                        if now - worker.last_used > self.idle_timeout]
+                for key, worker in idle:
+                    del self._workers[key]
+            for key, worker in idle:
+                worker.close()
+
+    def shutdown(self):
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
+
+
+worker_pool = WorkerPool()
+
+
+def interpreter_version(python_path):
+    """
+    解释器版本号，如 3.12.1
+
+    助手进程无法运行时（如损坏的环境）改为解析 python -V 的输出，Python 2 输出在 stderr
+
+    :raises WorkerError: 两种方式都获取不到版本号
+    """
+    try:
+        return worker_pool.call(python_path, 'version')['version']
+    except WorkerError as e:
+        error = e
+    kwargs = {}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+    try:
+        result = subprocess.run(
+            [str(python_path), '-V'], capture_output=True, text=True, errors='replace', timeout=CALL_TIMEOUT, **kwargs
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        raise error
+    output = (result.stdout + result.stderr).split()
+    if len(output) >= 2 and output[0] == 'Python':
+        return output[1]
+    raise error
@@ -6,6 +6,7 @@ from django.utils.html import format_html
 
 from django.urls import reverse, reverse_lazy
 from jiefoundation.utils import url_reverse_lazy
+from jiefoundation.jsonstore import read_json
 
 register = template.Library()
 
@@ -32,8 +33,7 @@ def menu_navbar():
     file_path = settings.BASE_DIR / 'config' / 'menu_navbar.json'
     if not file_path.exists():
         return html
-    with open(file_path, 'r', encoding='utf-8') as f:
-        menus = json.load(f)
+    menus = read_json(file_path)
     if menus:
         for v in menus.values():
             html += format_html(
@@ -52,8 +52,7 @@ def menu_user(request_user):
     html = ''
     if not user_menu_json_path.exists():
         return html
-    with open(user_menu_json_path, 'r', encoding='utf-8') as f:
-        menus = json.load(f)
+    menus = read_json(user_menu_json_path)
     menu_html = ''
     if request_user:
         menu_html = '<li class="nav-item dropdown"><a class="nav-link'
@@ -78,38 +77,37 @@ def menu_main(parent_menu, current_menu):
     menu_main_path = settings.BASE_DIR / 'config' / 'menu_main.json'
     if not menu_main_path.exists():
         return menu_html
-    with open(menu_main_path, 'r', encoding='utf-8') as f:
-        menu_main = json.load(f)
-        for menu_id, menu in menu_main.items():
-            if not menu['children']:
-                menu_html += '<li class="nav-item"><a href="'
-                if 'url' in menu and menu['url']['route_name']:
-                    menu_html += url_reverse_lazy(menu['url'])
-                menu_html += '" class="nav-link'
-                if parent_menu == menu_id: menu_html += ' active'
-                menu_html += f'"><i class="nav-icon { menu["icon"] }"></i><p>{menu["title"]}</p></a>'
-                menu_html += '</li>'
+    menu_main = read_json(menu_main_path)
+    for menu_id, menu in menu_main.items():
+        if not menu['children']:
+            menu_html += '<li class="nav-item"><a href="'
+            if 'url' in menu and menu['url']['route_name']:
+                menu_html += url_reverse_lazy(menu['url'])
+            menu_html += '" class="nav-link'
+            if parent_menu == menu_id: menu_html += ' active'
+            menu_html += f'"><i class="nav-icon { menu["icon"] }"></i><p>{menu["title"]}</p></a>'
+            menu_html += '</li>'
+        else:
+            menu_html += '<li class="nav-item'
+            if parent_menu == menu_id: menu_html += ' menu-open'
+            menu_html += '"><a href="'
+            if menu['url']: menu_html += url_reverse_lazy(menu["url"])
+            menu_html += '" class="nav-link'
+            if parent_menu == menu_id: menu_html += ' active'
+            menu_html += f'"><i class="nav-icon { menu["icon"] }"></i><p>{menu["title"]}'
+            if menu['children']:
+                menu_html += '<i class="right fas fa-angle-left"></i></p></a>'
+                menu_html += '<ul class="nav nav-treeview">'
+                for child_id, child in menu['children'].items():
+                    menu_html += '<li class="nav-item"><a href="'
+                    if child['url']: menu_html += url_reverse_lazy(child["url"])
+                    menu_html += '" class="nav-link'
+                    if parent_menu == menu_id and current_menu == child_id: menu_html += ' active'
+                    menu_html += f'"><i class="far fa-circle nav-icon"></i><p>{child["title"]}</p></a>'
+                    menu_html += '</li>'
+                menu_html += '</ul>'
             else:
-                menu_html += '<li class="nav-item'
-                if parent_menu == menu_id: menu_html += ' menu-open'
-                menu_html += '"><a href="'
-                if menu['url']: menu_html += url_reverse_lazy(menu["url"])
-                menu_html += '" class="nav-link'
-                if parent_menu == menu_id: menu_html += ' active'
-                menu_html += f'"><i class="nav-icon { menu["icon"] }"></i><p>{menu["title"]}'
-                if menu['children']:
-                    menu_html += '<i class="right fas fa-angle-left"></i></p></a>'
-                    menu_html += '<ul class="nav nav-treeview">'
-                    for child_id, child in menu['children'].items():
-                        menu_html += '<li class="nav-item"><a href="'
-                        if child['url']: menu_html += url_reverse_lazy(child["url"])
-                        menu_html += '" class="nav-link'
-                        if parent_menu == menu_id and current_menu == child_id: menu_html += ' active'
-                        menu_html += f'"><i class="far fa-circle nav-icon"></i><p>{child["title"]}</p></a>'
-                        menu_html += '</li>'
-                    menu_html += '</ul>'
-                else:
-                    menu_html += '</p></a>'
-                menu_html += '</li>'
+                menu_html += '</p></a>'
+            menu_html += '</li>'
 
     return mark_safe(menu_html)
\ No newline at end of file
@@ -151,15 +151,12 @@ def run_command(args,timeout=None, shell=False,cwd=None, env=None, encoding='utf
 
 def get_file_md5(file_path):
     """
-    计算指定文件的MD5值
+    计算指定文件的MD5值，文件未变化时使用缓存的结果
     :param file_path: 文件路径
     :return: MD5值
     """
-    md5_hash = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            md5_hash.update(chunk)
-    return md5_hash.hexdigest()
+    from jiefoundation.hashing import file_digests
+    return file_digests(file_path, ('md5',))['md5']
 
 
 def list_to_dict(from_list, key):
@@ -173,7 +170,7 @@ def list_to_dict(from_list, key):
 
 def check_sha256(file_path, expected_sha256):
     """
-    检查文件的SHA256哈希值是否与预期值匹配
+    检查文件的SHA256哈希值是否与预期值匹配，文件未变化时使用缓存的结果
 
     Args:
         file_path: 文件路径
@@ -185,14 +182,9 @@ def check_sha256(file_path, expected_sha256):
     if not expected_sha256:
         return True
 
-    sha256_hash = hashlib.sha256()
+    from jiefoundation.hashing import verify_file
     try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(chunk)
-        return sha256_hash.hexdigest().lower() == expected_sha256.lower()
-    except FileNotFoundError:
-        return False
+        return verify_file(file_path, {'sha256': expected_sha256})
     except Exception:
         return False
 
@@ -299,13 +291,18 @@ def remove_trailing_separator(path, keep_root_separator=True):
     return path
 
 
-def extract_from_zip(zip_path, extract_to=None):
+def extract_from_zip(zip_path, extract_to=None, progress=None, prefix=None, include=None, exclude=None):
     """
-    使用 zipfile 解压 ZIP 文件
+    解压 ZIP 文件，成员在线程池中并行解压，参见 jiefoundation.archive.extract_zip
 
     Args:
         zip_path (str): ZIP 文件的路径
         extract_to (str, optional): 解压目标目录路径。如果为 None，则解压到 ZIP 文件同目录下
+        progress (callable, optional): 进度回调 progress(files_done, files_total, bytes_done, bytes_total)，
+            回调中抛出异常可以中断解压（如后台任务取消）
+        prefix (str, optional): 只解压该前缀下的文件并去掉前缀，如 nupkg 包中的 'tools/'
+        include (list, optional): 只解压匹配这些通配符的文件
+        exclude (list, optional): 不解压匹配这些通配符的文件
 
     Returns:
         str: 解压后的目录路径
@@ -317,6 +314,7 @@ def extract_from_zip(zip_path, extract_to=None):
     """
     import zipfile
     import os
+    from jiefoundation.archive import extract_zip
 
     # 检查 ZIP 文件是否存在
     if not os.path.exists(zip_path):
@@ -326,14 +324,8 @@ def extract_from_zip(zip_path, extract_to=None):
     if extract_to is None:
         extract_to = os.path.splitext(zip_path)[0]
 
-    # 创建解压目录（如果不存在）
-    os.makedirs(extract_to, exist_ok=True)
-
     try:
-        # 打开并解压 ZIP 文件
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_to)
-
+        extract_zip(zip_path, extract_to, prefix=prefix, include=include, exclude=exclude, progress=progress)
         print(f"成功解压 {zip_path} 到 {extract_to}")
         return extract_to
 
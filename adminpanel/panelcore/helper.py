@@ -105,50 +105,34 @@ def get_reg_system_env(env_name):
         value, _ = winreg.QueryValueEx(key, env_name)
     return value
 
-def download_file_with_retry(url, destination, chunk_size=8192, max_retries=3, timeout=30):
+def download_file_with_retry(url, destination, chunk_size=8192, max_retries=3, timeout=30, **kwargs):
     """
-    带重试机制的大文件下载
+    带重试机制的大文件下载，支持断点续传和分段并行，参见 jiefoundation.downloader
 
     参数:
         url (str): 要下载文件的URL地址
         destination (str): 文件保存的目标路径
-        chunk_size (int): 每次读取的数据块大小，默认为8192字节
+        chunk_size (int): 保留参数，分段下载使用 downloader 的块大小
         max_retries (int): 最大重试次数，默认为3次
+        kwargs: expected、progress、cancel_check 等参数原样传给 download()
 
     返回值:
         bool: 下载成功返回True，失败返回False
+
+    异常:
+        ChecksumError: 下载完成但校验失败，调用方需要给出与网络错误不同的提示
     """
-    import requests
-    import time
-
-    headers = {
-        # 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36 Edg/140.0.0.0'
-    }
-
-    for attempt in range(max_retries):
-        try:
-            # 发起GET请求，stream=True表示流式下载
-            response = requests.get(url, headers=headers, stream=True, timeout=timeout)
-            response.raise_for_status()  # 检查HTTP错误
-            # 写入文件
-            with open(destination, 'wb') as file:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:  # 过滤掉保持连接的空块
-                        file.write(chunk)
-            print("下载完成!")
-            return True
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f"下载失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                time.sleep(2 ** attempt)  # 指数退避
-            else:
-                print(f"下载失败，已达到最大重试次数: {e}")
-                return False
-        except Exception as e:
-            print(f"下载过程中发生错误: {e}")
-            return False
-    return False
+    from jiefoundation.downloader import download, DownloadError, ChecksumError
+
+    try:
+        download(url, destination, max_retries=max_retries, timeout=timeout, **kwargs)
+        print("下载完成!")
+        return True
+    except ChecksumError:
+        raise
+    except DownloadError as e:
+        print(f"下载失败: {e}")
+        return False
 
 
 def is_port_available(port):
@@ -169,13 +153,10 @@ def is_port_available(port):
 def find_available_port(start_port=3306):
     """
     从指定端口开始查找可用的端口
-    默认从3306端口开始检查
+    默认从3306端口开始检查，参见 panelcore.ports.PortAllocator
     """
-    port = start_port
-    while True:
-        if is_port_available(port):
-            return port
-        port += 1
+    from panelcore.ports import port_allocator
+    return port_allocator.next_free(start_port)
 
 
 def get_sorted(dict_list, key):
@@ -196,7 +177,7 @@ def get_sorted(dict_list, key):
 
 def get_service_status(service_name):
     """
-    获取指定 Windows 服务的当前状态（简化版）
+    获取指定 Windows 服务的当前状态，多个服务请使用 panelcore.services.get_services_status
 
     Args:
         service_name (str): Windows 服务名称
@@ -211,51 +192,8 @@ def get_service_status(service_name):
             'service_name': service_name
         }
 
-    try:
-        from jiefoundation.utils import run_command
-
-        # 查询服务状态
-        result = run_command(['sc', 'query', service_name])
-
-        if result.returncode == 0:
-            output = result.stdout.lower()
-            if 'state' in output:
-                if 'running' in output or '4 running' in output:
-                    color, status, status_text = 'success', 'running', '运行中'
-                elif 'stopped' in output or '1 stopped' in output:
-                    color, status, status_text = 'danger', 'stopped', '已停止'
-                elif 'paused' in output or '7 paused' in output:
-                    color, status, status_text = 'warning', 'paused', '已暂停'
-                elif 'start pending' in output or '2 start_pending' in output:
-                    color, status, status_text = 'success', 'starting', '正在启动'
-                elif 'stop pending' in output or '3 stop_pending' in output:
-                    color, status, status_text = 'warning', 'stopping', '正在停止'
-                else:
-                    color, status, status_text = 'secondary', 'unknown', '未知状态'
-            else:
-                color, status, status_text = 'secondary', 'unknown', '未知状态'
-
-            return {
-                'status': status,
-                'color': color,
-                'status_text': status_text,
-                'service_name': service_name
-            }
-        else:
-            return {
-                'status': 'not_found',
-                'color': 'secondary',
-                'status_text': '服务不存在',
-                'service_name': service_name
-            }
-
-    except Exception as e:
-        return {
-            'status': 'error',
-            'color': 'danger',
-            'status_text': f'查询失败: {str(e)}',
-            'service_name': service_name
-        }
+    from panelcore.services import get_services_status
+    return get_services_status([service_name])[service_name]
 
 
 def is_valid_ini_file(file_path):
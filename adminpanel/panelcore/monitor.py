@@ -0,0 +1,228 @@
+"""
+主机资源监控
+
+后台线程按固定间隔采样 CPU（总体和每个核心）、内存、磁盘 I/O、网络 I/O，
+以及面板安装的 mysqld.exe / python.exe 进程（可执行文件位于运行环境、MySQL 的安装目录下）的 CPU 和内存，
+面板自身和系统中其他的 Python 进程不统计。
+每个指标保存在固定长度的 array('d') 环形缓冲区中，长时间运行内存占用也不会增长；
+页面按时间分桶取 min/max/avg 后绘制图表。
+"""
+import math
+import os
+import threading
+import time
+from array import array
+
+MANAGED_PROCESS_NAMES = ('mysqld.exe', 'python.exe', 'pythonw.exe')
+
+
+def _normalize_folder(path):
+    return os.path.normcase(os.path.abspath(path)).rstrip('\\/') + os.sep
+
+
+def managed_folders():
+    """
+    面板安装的 Python 运行环境和 MySQL 所在目录，对应的应用没有安装时跳过
+    """
+    from django.apps import apps
+
+    folders = []
+    if apps.is_installed('apps.envs_python_runtime'):
+        from apps.envs_python_runtime.helper import get_user_config, get_installed
+        folders.append(get_user_config().get('install_folder'))
+        folders.extend(info.get('folder') for info in get_installed().values())
+    if apps.is_installed('apps.db_mysql'):
+        from apps.db_mysql.helper import get_config, get_installed
+        folders.append(get_config().get('install_folder'))
+        folders.extend(info.get('install_dir') for info in get_installed().values())
+    return tuple({_normalize_folder(folder) for folder in folders if folder})
+
+
+def is_managed_exe(exe, folders):
+    return bool(exe) and os.path.normcase(os.path.abspath(exe)).startswith(folders)
+
+
+class RingBuffer:
+    """
+    固定长度的浮点数环形缓冲区，写满后覆盖最旧的数据
+
+    :param capacity: 最多保存的样本数
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = array('d', [math.nan]) * capacity
+        self._next = 0
+        self._count = 0
+
+    def append(self, value):
+        self._data[self._next] = math.nan if value is None else value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def __len__(self):
+        return self._count
+
+    def values(self, last=None):
+        """按时间顺序返回最近 last 个样本"""
+        count = self._count if last is None else min(last, self._count)
+        start = (self._next - count) % self.capacity
+        if start + count <= self.capacity:
+            return self._data[start:start + count]
+        return self._data[start:] + self._data[:start + count - self.capacity]
+
+
+class HostMonitor:
+    """
+    :param interval: 采样间隔秒数
+    :param capacity: 每个指标保存的样本数，默认 5 秒 * 720 = 1 小时
+    """
+
+    def __init__(self, interval=5, capacity=720):
+        self.interval = interval
+        self.capacity = capacity
+        self.times = RingBuffer(capacity)
+        self.series = {}
+        self.processes = {}
+        self._process_handles = {}
+        self._last_io = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _buffer(self, name):
+        buffer = self.series.get(name)
+        if buffer is None:
+            # 中途出现的指标（如新启动的进程）前面补空值，与时间轴对齐
+            buffer = self.series[name] = RingBuffer(self.capacity)
+            for _ in range(len(self.times) - 1):
+                buffer.append(None)
+        return buffer
+
+    def _io_rates(self, now, psutil):
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        current = (
+            now,
+            disk.read_bytes if disk else 0, disk.write_bytes if disk else 0,
+            net.bytes_sent if net else 0, net.bytes_recv if net else 0,
+        )
+        last, self._last_io = self._last_io, current
+        if last is None or now <= last[0]:
+            return {}
+        seconds = now - last[0]
+        names = ('disk_read', 'disk_write', 'net_sent', 'net_recv')
+        return {name: max(current[i + 1] - last[i + 1], 0) / seconds for i, name in enumerate(names)}
+
+    def _process_samples(self, psutil):
+        samples = {}
+        processes = {}
+        try:
+            folders = managed_folders()
+        except Exception as e:
+            print(f'读取安装目录失败: {e}')
+            folders = ()
+        for proc in psutil.process_iter(['name', 'exe', 'create_time']):
+            name = (proc.info['name'] or '').lower()
+            if name not in MANAGED_PROCESS_NAMES or not is_managed_exe(proc.info['exe'], folders):
+                continue
+            key = f'proc:{proc.pid}:{int(proc.info["create_time"] or 0)}'
+            # cpu_percent 需要同一个 Process 对象两次调用之间的差值
+            handle = self._process_handles.setdefault(key, proc)
+            try:
+                with handle.oneshot():
+                    samples[f'{key}:cpu'] = handle.cpu_percent(None)
+                    samples[f'{key}:memory'] = handle.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            processes[key] = {'key': key, 'pid': proc.pid, 'name': proc.info['name'], 'exe': proc.info['exe'] or ''}
+        for key in list(self._process_handles):
+            if key not in processes:
+                del self._process_handles[key]
+        return samples, processes
+
+    def _drop_stale(self):
+        """已退出进程的数据全部移出时间窗口后删除"""
+        for name in list(self.series):
+            if name.startswith('proc:') and name.rsplit(':', 1)[0] not in self.processes:
+                if all(math.isnan(value) for value in self.series[name].values()):
+                    del self.series[name]
+
+    def sample(self):
+        import psutil
+
+        now = time.time()
+        samples = {'cpu': psutil.cpu_percent(None)}
+        for index, percent in enumerate(psutil.cpu_percent(None, percpu=True)):
+            samples[f'cpu_core_{index}'] = percent
+        memory = psutil.virtual_memory()
+        samples['memory_percent'] = memory.percent
+        samples['memory_used'] = memory.used
+        samples.update(self._io_rates(now, psutil))
+        process_samples, processes = self._process_samples(psutil)
+        samples.update(process_samples)
+
+        with self._lock:
+            self.processes = processes
+            self.times.append(now)
+            for name, value in samples.items():
+                self._buffer(name)
+            for name, buffer in self.series.items():
+                buffer.append(samples.get(name))
+            self._drop_stale()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                print(f'资源监控采样失败: {e}')
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """启动采样线程，已经启动时直接返回"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='jiemonitor', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def query(self, names=None, seconds=None, points=120):
+        """
+        按时间分桶取 min/max/avg
+
+        :param names: 指标名称前缀列表，为空返回全部
+        :param seconds: 只取最近多少秒
+        :param points: 最多返回的桶数
+        :return: {'times': [...], 'series': {name: {'min': [], 'max': [], 'avg': []}}, 'processes': [...]}
+        """
+        with self._lock:
+            count = len(self.times)
+            if seconds:
+                count = min(count, int(seconds // self.interval) + 1)
+            times = self.times.values(count)
+            selected = {
+                name: buffer.values(count) for name, buffer in self.series.items()
+                if not names or any(name.startswith(prefix) for prefix in names)
+            }
+            processes = list(self.processes.values())
+
+        size = max(math.ceil(count / max(points, 1)), 1)
+        buckets = [(start, min(start + size, count)) for start in range(0, count, size)]
+        result = {'times': [times[end - 1] for start, end in buckets], 'series': {}, 'processes': processes}
+        for name, values in selected.items():
+            data = {'min': [], 'max': [], 'avg': []}
+            for start, end in buckets:
+                bucket = [value for value in values[start:end] if not math.isnan(value)]
+                data['min'].append(round(min(bucket), 2) if bucket else None)
+                data['max'].append(round(max(bucket), 2) if bucket else None)
+                data['avg'].append(round(sum(bucket) / len(bucket), 2) if bucket else None)
+            result['series'][name] = data
+        return result
+
+
+host_monitor = HostMonitor()
@@ -0,0 +1,150 @@
+"""
+端口分配
+
+一次 psutil.net_connections() 得到本机已占用的端口，合并各应用安装记录中登记的端口，
+保存为有序列表，用二分查找下一个可用端口；分配出去的端口会短时间预留，
+两个同时进行的安装不会拿到同一个端口。
+"""
+import bisect
+import threading
+import time
+
+
+class PortAllocator:
+    """
+    :param reservation_ttl: 端口预留秒数
+    :param snapshot_ttl: 连接表快照缓存秒数
+    :param max_port: 最大端口号
+    """
+
+    def __init__(self, reservation_ttl=600, snapshot_ttl=2, max_port=65535):
+        self.reservation_ttl = reservation_ttl
+        self.snapshot_ttl = snapshot_ttl
+        self.max_port = max_port
+        self._sources = {}
+        self._reservations = {}
+        self._snapshot = None
+        self._snapshot_at = 0
+        self._system_available = True
+        self._lock = threading.RLock()
+
+    def register_source(self, name, func):
+        """
+        登记已安装记录中的端口来源，func() 返回端口列表，如 MySQL 各实例配置的端口
+        """
+        self._sources[name] = func
+
+    def _system_ports(self):
+        """本机已经被占用的端口（监听中或者作为本地地址使用中）"""
+        try:
+            import psutil
+            return {conn.laddr.port for conn in psutil.net_connections(kind='inet') if conn.laddr}
+        except Exception as e:
+            print(f'获取端口占用失败: {e}')
+            return None
+
+    def _source_ports(self):
+        ports = set()
+        for name, func in self._sources.items():
+            try:
+                for port in func():
+                    if str(port).isdigit():
+                        ports.add(int(port))
+            except Exception as e:
+                print(f'读取 {name} 端口记录失败: {e}')
+        return ports
+
+    def snapshot(self, refresh=False):
+        """
+        已占用端口的有序列表（连接表 + 安装记录）
+        """
+        with self._lock:
+            if refresh or self._snapshot is None or time.monotonic() - self._snapshot_at > self.snapshot_ttl:
+                ports = self._system_ports()
+                self._system_available = ports is not None
+                self._snapshot = sorted((ports or set()) | self._source_ports())
+                self._snapshot_at = time.monotonic()
+            return self._snapshot
+
+    def _active_reservations(self, owner=None):
+        now = time.monotonic()
+        for port, (expires_at, reserved_by) in list(self._reservations.items()):
+            if expires_at < now:
+                del self._reservations[port]
+        return sorted(port for port, (expires_at, reserved_by) in self._reservations.items()
+                      if owner is None or reserved_by != owner)
+
+    @staticmethod
+    def _contains(sorted_ports, port):
+        index = bisect.bisect_left(sorted_ports, port)
+        return index < len(sorted_ports) and sorted_ports[index] == port
+
+    def _probe(self, port):
+        # 无法获取连接表时退回逐个绑定检测
+        if self._system_available:
+            return True
+        from panelcore.helper import is_port_available
+        return is_port_available(port)
+
+    def is_available(self, port, owner=None):
+        """端口未被占用且未被其他人预留"""
+        with self._lock:
+            port = int(port)
+            if self._contains(self.snapshot(), port):
+                return False
+            if self._contains(self._active_reservations(owner), port):
+                return False
+            return self._probe(port)
+
+    def next_free(self, start_port=3306, owner=None, skip=()):
+        """从 start_port 开始查找下一个可用端口（不预留）"""
+        with self._lock:
+            used = self.snapshot()
+            reserved = self._active_reservations(owner)
+            skip = sorted(skip)
+            port = int(start_port)
+            while port <= self.max_port:
+                index = bisect.bisect_left(used, port)
+                # 跳过连续被占用的一段端口
+                while index < len(used) and used[index] == port:
+                    port += 1
+                    index += 1
+                if self._contains(reserved, port) or self._contains(skip, port) or not self._probe(port):
+                    port += 1
+                    continue
+                return port
+            raise RuntimeError(f'从 {start_port} 开始没有可用端口')
+
+    def allocate(self, start_port=3306, count=1, owner=None):
+        """
+        分配并预留 count 个端口，同一个 owner 再次分配时释放之前的预留
+
+        :param owner: 预留人，如 'db_mysql:<安装ID>'
+        :return: 端口列表
+        """
+        with self._lock:
+            if owner:
+                self.release(owner=owner)
+            ports = []
+            port = int(start_port)
+            for _ in range(count):
+                port = self.next_free(port, skip=ports)
+                ports.append(port)
+                port += 1
+            for port in ports:
+                self.reserve(port, owner)
+            return ports
+
+    def reserve(self, port, owner=None, ttl=None):
+        with self._lock:
+            self._reservations[int(port)] = (time.monotonic() + (ttl or self.reservation_ttl), owner)
+
+    def release(self, port=None, owner=None):
+        """释放指定端口或某个 owner 的全部预留"""
+        with self._lock:
+            for reserved_port, (expires_at, reserved_by) in list(self._reservations.items()):
+                if reserved_port == port or (owner and reserved_by == owner):
+                    del self._reservations[reserved_port]
+
+
+port_allocator = PortAllocator()
@@ -0,0 +1,410 @@
+"""
+Windows 服务状态与服务目录
+
+- 一次 EnumServicesStatusEx 列出全部服务（不可用时使用 `sc queryex`），结果缓存几秒钟，
+  页面上多个实例的状态查询共用同一次结果，不再每个服务单独启动一个 sc 进程；
+- 服务目录直接读取注册表中各服务的 ImagePath，按可执行文件路径和 --defaults-file 路径建立索引，
+  用于按配置文件查找已存在的服务，面板创建/删除服务后失效重建。
+"""
+import posixpath
+import re
+import threading
+import time
+
+# sc 输出中的状态码（与系统语言无关）
+SERVICE_STATES = {
+    1: ('stopped', 'danger', '已停止'),
+    2: ('starting', 'success', '正在启动'),
+    3: ('stopping', 'warning', '正在停止'),
+    4: ('running', 'success', '运行中'),
+    5: ('continuing', 'success', '正在继续'),
+    6: ('pausing', 'warning', '正在暂停'),
+    7: ('paused', 'warning', '已暂停'),
+}
+
+
+def parse_sc_queryex(output):
+    """
+    解析 `sc queryex` 的输出
+
+    :param output: sc 命令的标准输出文本
+    :return: {服务名小写: {'name', 'display_name', 'state_code', 'pid'}}
+    """
+    services = {}
+    current = None
+    for line in output.splitlines():
+        line = line.strip()
+        if not line or ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        key = key.strip().upper()
+        value = value.strip()
+        if key == 'SERVICE_NAME':
+            current = {'name': value, 'display_name': value, 'state_code': 0, 'pid': 0}
+            services[value.lower()] = current
+        elif current is None:
+            continue
+        elif key == 'DISPLAY_NAME':
+            current['display_name'] = value
+        elif key == 'STATE':
+            code = value.split(maxsplit=1)[0] if value else ''
+            current['state_code'] = int(code) if code.isdigit() else 0
+        elif key == 'PID':
+            current['pid'] = int(value) if value.isdigit() else 0
+    return services
+
+
+def enum_services():
+    """
+    调用 EnumServicesStatusExW 列出全部 Win32 服务，直接得到 Unicode 的名称，不需要解析命令输出
+
+    :return: 与 parse_sc_queryex() 相同的结构
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    class SERVICE_STATUS_PROCESS(ctypes.Structure):
+        _fields_ = [(name, wintypes.DWORD) for name in (
+            'dwServiceType', 'dwCurrentState', 'dwControlsAccepted', 'dwWin32ExitCode', 'dwServiceSpecificExitCode',
+            'dwCheckPoint', 'dwWaitHint', 'dwProcessId', 'dwServiceFlags',
+        )]
+
+    class ENUM_SERVICE_STATUS_PROCESSW(ctypes.Structure):
+        _fields_ = [
+            ('lpServiceName', wintypes.LPWSTR),
+            ('lpDisplayName', wintypes.LPWSTR),
+            ('ServiceStatusProcess', SERVICE_STATUS_PROCESS),
+        ]
+
+    SC_MANAGER_ENUMERATE_SERVICE = 0x0004
+    SC_ENUM_PROCESS_INFO = 0
+    SERVICE_WIN32 = 0x30
+    SERVICE_STATE_ALL = 0x3
+    ERROR_MORE_DATA = 234
+
+    advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+    advapi32.OpenSCManagerW.restype = wintypes.HANDLE
+    advapi32.OpenSCManagerW.argtypes = [wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD]
+    advapi32.EnumServicesStatusExW.restype = wintypes.BOOL
+    advapi32.EnumServicesStatusExW.argtypes = [
+        wintypes.HANDLE, ctypes.c_int, wintypes.DWORD, wintypes.DWORD, ctypes.c_void_p, wintypes.DWORD,
+        ctypes.POINTER(wintypes.DWORD), ctypes.POINTER(wintypes.DWORD), ctypes.POINTER(wintypes.DWORD),
+        wintypes.LPCWSTR,
+    ]
+    advapi32.CloseServiceHandle.argtypes = [wintypes.HANDLE]
+
+    manager = advapi32.OpenSCManagerW(None, None, SC_MANAGER_ENUMERATE_SERVICE)
+    if not manager:
+        raise ctypes.WinError(ctypes.get_last_error())
+    services = {}
+    try:
+        resume = wintypes.DWORD(0)
+        buffer_size = 256 * 1024
+        while True:
+            buffer = ctypes.create_string_buffer(buffer_size)
+            needed = wintypes.DWORD(0)
+            count = wintypes.DWORD(0)
+            ok = advapi32.EnumServicesStatusExW(
+                manager, SC_ENUM_PROCESS_INFO, SERVICE_WIN32, SERVICE_STATE_ALL, buffer, buffer_size,
+                ctypes.byref(needed), ctypes.byref(count), ctypes.byref(resume), None
+            )
+            error = 0 if ok else ctypes.get_last_error()
+            if not ok and error != ERROR_MORE_DATA:
+                raise ctypes.WinError(error)
+            entries = ctypes.cast(buffer, ctypes.POINTER(ENUM_SERVICE_STATUS_PROCESSW))
+            for index in range(count.value):
+                entry = entries[index]
+                status = entry.ServiceStatusProcess
+                services[entry.lpServiceName.lower()] = {
+                    'name': entry.lpServiceName,
+                    'display_name': entry.lpDisplayName or entry.lpServiceName,
+                    'state_code': status.dwCurrentState,
+                    'pid': status.dwProcessId,
+                }
+            if ok:
+                break
+            # 剩余的服务从 resume 位置继续获取
+            buffer_size = max(buffer_size, needed.value)
+    finally:
+        advapi32.CloseServiceHandle(manager)
+    return services
+
+
+def _console_encoding():
+    """sc 等控制台程序输出使用的 OEM 代码页，中文系统为 cp936"""
+    import locale
+    try:
+        import ctypes
+        return f'cp{ctypes.windll.kernel32.GetOEMCP()}'
+    except (AttributeError, OSError):
+        return locale.getpreferredencoding()
+
+
+def decode_console_output(data, encoding=None):
+    """
+    解码控制台程序的输出
+
+    :param encoding: 默认使用 OEM 代码页，无法解码的字符替换掉
+    """
+    return data.decode(encoding or _console_encoding(), errors='replace')
+
+
+def query_services_sc():
+    """
+    用 sc queryex 列出全部服务，EnumServicesStatusEx 不可用时使用
+
+    DISPLAY_NAME 按 OEM 代码页输出，无法解码的字符替换掉，不影响服务名和状态码
+    """
+    import subprocess
+
+    result = subprocess.run(
+        ['sc', 'queryex', 'type=', 'service', 'state=', 'all', 'bufsize=', '262144'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    encoding = _console_encoding()
+    stdout = decode_console_output(result.stdout, encoding)
+    if result.returncode != 0:
+        raise RuntimeError(decode_console_output(result.stderr, encoding) or stdout)
+    return parse_sc_queryex(stdout)
+
+
+def format_service_status(service_name, service):
+    """
+    转换为页面使用的状态字典，格式与 get_service_status 保持一致
+    """
+    if not service:
+        return {
+            'status': 'not_found',
+            'color': 'secondary',
+            'status_text': '服务不存在',
+            'service_name': service_name
+        }
+    status, color, status_text = SERVICE_STATES.get(service.get('state_code'), ('unknown', 'secondary', '未知状态'))
+    return {
+        'status': status,
+        'color': color,
+        'status_text': status_text,
+        'service_name': service_name,
+        'display_name': service['display_name'],
+        'pid': service['pid'],
+    }
+
+
+class ServiceStateProvider:
+    """
+    服务状态快照，ttl 秒内重复查询直接使用缓存
+
+    :param ttl: 缓存秒数
+    """
+
+    def __init__(self, ttl=3):
+        self.ttl = ttl
+        self._snapshot = None
+        self._snapshot_at = 0
+        self._lock = threading.Lock()
+
+    def _query(self):
+        try:
+            return enum_services()
+        except (OSError, AttributeError) as e:
+            print(f'EnumServicesStatusEx 调用失败，改用 sc 查询: {e}')
+        return query_services_sc()
+
+    def snapshot(self):
+        with self._lock:
+            if self._snapshot is None or time.monotonic() - self._snapshot_at > self.ttl:
+                self._snapshot = self._query()
+                self._snapshot_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        """服务启动/停止/创建/删除后调用，下次查询重新获取"""
+        with self._lock:
+            self._snapshot = None
+
+    def get(self, service_name):
+        return self.snapshot().get((service_name or '').lower())
+
+    def get_many(self, service_names):
+        snapshot = self.snapshot()
+        return {name: snapshot.get(name.lower()) for name in service_names if name}
+
+
+service_state = ServiceStateProvider()
+
+
+def get_services_status(service_names):
+    """
+    批量获取服务状态，只执行一次 sc
+
+    :param service_names: 服务名称列表
+    :return: {服务名: 状态字典}
+    """
+    service_names = [name for name in service_names if name]
+    if not service_names:
+        return {}
+    try:
+        services = service_state.get_many(service_names)
+    except Exception as e:
+        return {
+            name: {'status': 'error', 'color': 'danger', 'status_text': f'查询失败: {str(e)}', 'service_name': name}
+            for name in service_names
+        }
+    return {name: format_service_status(name, services.get(name)) for name in service_names}
+
+
+SERVICE_START_TYPES = {
+    0: 'boot',
+    1: 'system',
+    2: 'automatic',
+    3: 'manual',
+    4: 'disabled',
+}
+
+DEFAULTS_FILE_PATTERN = re.compile(r'--defaults-file\s*=\s*(?:"([^"]+)"|(\S+))', re.IGNORECASE)
+
+
+def normalize_path(path):
+    """路径统一为小写、正斜杠，用作索引键"""
+    path = (path or '').strip().strip('"').replace('\\', '/')
+    if not path:
+        return ''
+    return posixpath.normpath(path).lower()
+
+
+def parse_image_path(image_path):
+    """
+    解析服务的 ImagePath
+
+    :return: (可执行文件路径, --defaults-file 路径)
+    """
+    image_path = (image_path or '').strip()
+    if image_path.startswith('"'):
+        executable = image_path[1:].split('"', 1)[0]
+    else:
+        match = re.match(r'(.+?\.exe)(?:\s|$)', image_path, re.IGNORECASE)
+        executable = match.group(1) if match else image_path.split(' ', 1)[0]
+    defaults_file = ''
+    match = DEFAULTS_FILE_PATTERN.search(image_path)
+    if match:
+        defaults_file = match.group(1) or match.group(2)
+    return executable, defaults_file
+
+
+class ServiceCatalog:
+    """
+    服务目录：读取 HKLM\\SYSTEM\\CurrentControlSet\\Services 下的 Win32 服务，
+    按可执行文件路径、--defaults-file 路径建立索引
+    """
+    registry_path = r'SYSTEM\CurrentControlSet\Services'
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._services = None
+        self._by_executable = {}
+        self._by_defaults_file = {}
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    def _read_registry(self):
+        import winreg
+
+        services = {}
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, self.registry_path) as root:
+            index = 0
+            while True:
+                try:
+                    name = winreg.EnumKey(root, index)
+                except OSError:
+                    break
+                index += 1
+                try:
+                    with winreg.OpenKey(root, name) as key:
+                        values = {}
+                        for value_name in ('ImagePath', 'DisplayName', 'Start', 'Type', 'Description'):
+                            try:
+                                values[value_name] = winreg.QueryValueEx(key, value_name)[0]
+                            except OSError:
+                                values[value_name] = None
+                except OSError:
+                    continue
+                # 只保留 Win32 服务（0x10 独立进程、0x20 共享进程），跳过驱动
+                if not values['ImagePath'] or not (values['Type'] or 0) & 0x30:
+                    continue
+                services[name.lower()] = {
+                    'name': name,
+                    'display_name': values['DisplayName'] or name,
+                    'binpath': values['ImagePath'],
+                    'start_type': SERVICE_START_TYPES.get(values['Start'], 'unknown'),
+                    'description': values['Description'] or '',
+                }
+        return services
+
+    def _build(self):
+        services = self._read_registry()
+        by_executable = {}
+        by_defaults_file = {}
+        for key, service in services.items():
+            executable, defaults_file = parse_image_path(service['binpath'])
+            service['executable'] = executable
+            service['defaults_file'] = defaults_file
+            if executable:
+                by_executable.setdefault(normalize_path(executable), []).append(key)
+            if defaults_file:
+                by_defaults_file.setdefault(normalize_path(defaults_file), []).append(key)
+        self._services = services
+        self._by_executable = by_executable
+        self._by_defaults_file = by_defaults_file
+        self._built_at = time.monotonic()
+
+    def _ensure(self):
+        """
+        :return: 在锁内取得的 (服务, 可执行文件索引, 配置文件索引)，查找只使用这份快照，
+            其他请求同时调用 invalidate() 也不影响
+        """
+        with self._lock:
+            if self._services is None or time.monotonic() - self._built_at > self.ttl:
+                self._build()
+            return self._services, self._by_executable, self._by_defaults_file
+
+    def invalidate(self):
+        """面板创建、删除服务后调用"""
+        with self._lock:
+            self._services = None
+
+    @staticmethod
+    def _with_status(services, keys):
+        services = [dict(services[key]) for key in keys]
+        try:
+            states = service_state.get_many([service['name'] for service in services])
+        except Exception:
+            states = {}
+        for service in services:
+            service['status'] = format_service_status(service['name'], states.get(service['name']))['status']
+        return services
+
+    def get(self, service_name):
+        services, by_executable, by_defaults_file = self._ensure()
+        key = (service_name or '').lower()
+        if key not in services:
+            return None
+        return self._with_status(services, [key])[0]
+
+    def find_by_defaults_file(self, defaults_file):
+        """按 --defaults-file 配置文件路径查找服务"""
+        services, by_executable, by_defaults_file = self._ensure()
+        return self._with_status(services, by_defaults_file.get(normalize_path(defaults_file), []))
+
+    def find_by_executable(self, executable):
+        """按服务可执行文件路径查找服务"""
+        services, by_executable, by_defaults_file = self._ensure()
+        return self._with_status(services, by_executable.get(normalize_path(executable), []))
+
+
+service_catalog = ServiceCatalog()
+
+
+def invalidate_services():
+    """服务创建/删除/启停后清除状态快照和服务目录"""
+    service_state.invalidate()
+    service_catalog.invalidate()
@@ -0,0 +1,118 @@
+/*
+ * 后台任务轮询
+ * 视图提交任务后返回 {job_id, status_url, cancel_url}，使用 watchJob 轮询进度直到任务结束。
+ * 进度文字中带有取消按钮，点击后 POST 到 cancel_url，任务在下一个检查点结束并以 onError 返回。
+ */
+
+function formatBytes(size) {
+    if (!size) return '0B';
+    var units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    var i = 0;
+    while (size >= 1024 && i < units.length - 1) {
+        size = size / 1024;
+        i++;
+    }
+    return size.toFixed(i ? 1 : 0) + units[i];
+}
+
+function jobProgressText(job) {
+    var text = job.stage_title || job.title;
+    var stage = null;
+    for (var i = 0; i < job.stages.length; i++) {
+        if (job.stages[i].name === job.stage) stage = job.stages[i];
+    }
+    if (stage) {
+        text += ' ' + stage.percent + '%';
+        if (stage.bytes_total) {
+            text += ' (' + formatBytes(stage.bytes_done) + '/' + formatBytes(stage.bytes_total) + ')';
+        } else if (stage.files_total) {
+            text += ' (' + stage.files_done + '/' + stage.files_total + ')';
+        }
+    }
+    if (job.message && job.message !== job.stage_title) text += '<br/>' + job.message;
+    if (job.cancel_url) {
+        text += '<br/><button type="button" class="layui-btn layui-btn-xs layui-btn-danger job-cancel mt-2" data-url="'
+            + job.cancel_url + '">取消任务</button>';
+    }
+    return text;
+}
+
+function updateLayerMsg(index, text) {
+    var $content = $('#layui-layer' + index).find('.layui-layer-content');
+    var $icon = $content.children('i').first().detach();
+    // 保留已有的取消按钮，避免每次刷新进度时替换掉正在点击或已点击的按钮
+    var $cancel = $content.find('.job-cancel').detach();
+    $content.html(text).prepend($icon);
+    if ($cancel.length) $content.find('.job-cancel').replaceWith($cancel);
+}
+
+function jobCsrfToken() {
+    var match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+    return match ? decodeURIComponent(match[1]) : '';
+}
+
+function cancelJob(cancelUrl, onDone) {
+    $.ajax({
+        url: cancelUrl,
+        type: 'POST',
+        dataType: 'json',
+        headers: {'X-CSRFToken': jobCsrfToken()},
+        success: function (data) {
+            if (onDone) onDone(data.status === 'success', data.message);
+        },
+        error: function (xhr, status, message) {
+            if (xhr.responseJSON && xhr.responseJSON.message) message = xhr.responseJSON.message;
+            if (onDone) onDone(false, message);
+        }
+    });
+}
+
+$(document).on('click', '.job-cancel', function () {
+    var $button = $(this);
+    if ($button.prop('disabled')) return;
+    $button.prop('disabled', true).addClass('layui-btn-disabled').text('正在取消...');
+    cancelJob($button.data('url'), function (ok, message) {
+        if (!ok) {
+            $button.prop('disabled', false).removeClass('layui-btn-disabled').text('取消任务');
+            if (window.layui && layui.layer) layui.layer.msg('取消失败: ' + message, {icon: 2});
+        }
+    });
+});
+
+/*
+ * response: 提交任务接口的返回值，没有 status_url 时视为已经完成
+ * options.onProgress(job)、options.onSuccess(job)、options.onError(message, job)
+ */
+function watchJob(response, options) {
+    options = options || {};
+    var interval = options.interval || 1000;
+    if (!response || !response.status_url) {
+        if (options.onSuccess) options.onSuccess({result: response, message: response ? response.message : ''});
+        return;
+    }
+    function poll() {
+        $.ajax({
+            url: response.status_url,
+            type: 'GET',
+            dataType: 'json',
+            success: function (data) {
+                var job = data.job;
+                job.cancel_url = response.cancel_url;
+                if (job.status === 'pending' || job.status === 'running') {
+                    if (options.onProgress) options.onProgress(job);
+                    setTimeout(poll, interval);
+                } else if (job.status === 'success') {
+                    if (options.onSuccess) options.onSuccess(job);
+                } else {
+                    if (options.onError) options.onError(job.error || job.status_text, job);
+                }
+            },
+            error: function (xhr, status, message) {
+                var errorMsg = message;
+                if (xhr.responseJSON && xhr.responseJSON.message) errorMsg = xhr.responseJSON.message;
+                if (options.onError) options.onError(errorMsg, null);
+            }
+        });
+    }
+    poll();
+}
@@ -0,0 +1,88 @@
+/*
+ * 资源监控图表
+ * 数据来自 monitor_data 接口，每条曲线绘制平均值，浅色区域为同一时间段内的最小值~最大值。
+ */
+
+function drawMonitorChart(canvas, times, lines, options) {
+    options = options || {};
+    var ctx = canvas.getContext('2d');
+    var width = canvas.width = canvas.clientWidth;
+    var height = canvas.height = canvas.clientHeight;
+    var padding = {left: 56, right: 8, top: 8, bottom: 20};
+    var plotWidth = width - padding.left - padding.right;
+    var plotHeight = height - padding.top - padding.bottom;
+    ctx.clearRect(0, 0, width, height);
+
+    var maxValue = options.max || 0;
+    if (!options.max) {
+        lines.forEach(function (line) {
+            (line.data.max || []).forEach(function (value) {
+                if (value !== null && value > maxValue) maxValue = value;
+            });
+        });
+        maxValue = maxValue || 1;
+    }
+    var format = options.format || function (value) { return value.toFixed(0); };
+    var count = times.length;
+    function x(i) { return padding.left + (count > 1 ? plotWidth * i / (count - 1) : 0); }
+    function y(value) { return padding.top + plotHeight - plotHeight * Math.min(value, maxValue) / maxValue; }
+
+    ctx.strokeStyle = '#eee';
+    ctx.fillStyle = '#999';
+    ctx.font = '11px sans-serif';
+    for (var step = 0; step <= 4; step++) {
+        var value = maxValue * step / 4;
+        ctx.beginPath();
+        ctx.moveTo(padding.left, y(value));
+        ctx.lineTo(width - padding.right, y(value));
+        ctx.stroke();
+        ctx.fillText(format(value), 2, y(value) + 4);
+    }
+    if (count) {
+        ctx.fillText(new Date(times[0] * 1000).toLocaleTimeString(), padding.left, height - 4);
+        var last = new Date(times[count - 1] * 1000).toLocaleTimeString();
+        ctx.fillText(last, width - padding.right - ctx.measureText(last).width, height - 4);
+    }
+
+    lines.forEach(function (line) {
+        var data = line.data;
+        // 最小值~最大值区域
+        ctx.globalAlpha = 0.15;
+        ctx.fillStyle = line.color;
+        ctx.beginPath();
+        var started = false;
+        for (var i = 0; i < count; i++) {
+            if (data.max[i] === null) continue;
+            started ? ctx.lineTo(x(i), y(data.max[i])) : ctx.moveTo(x(i), y(data.max[i]));
+            started = true;
+        }
+        for (var j = count - 1; j >= 0; j--) {
+            if (data.min[j] !== null) ctx.lineTo(x(j), y(data.min[j]));
+        }
+        ctx.closePath();
+        ctx.fill();
+        // 平均值曲线，没有数据的地方断开
+        ctx.globalAlpha = 1;
+        ctx.strokeStyle = line.color;
+        ctx.lineWidth = 1.5;
+        ctx.beginPath();
+        var drawing = false;
+        for (var k = 0; k < count; k++) {
+            if (data.avg[k] === null) {
+                drawing = false;
+                continue;
+            }
+            drawing ? ctx.lineTo(x(k), y(data.avg[k])) : ctx.moveTo(x(k), y(data.avg[k]));
+            drawing = true;
+        }
+        ctx.stroke();
+        ctx.lineWidth = 1;
+    });
+}
+
+function lastValue(data) {
+    for (var i = data.avg.length - 1; i >= 0; i--) {
+        if (data.avg[i] !== null) return data.avg[i];
+    }
+    return null;
+}
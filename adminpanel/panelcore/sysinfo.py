@@ -0,0 +1,247 @@
+"""
+系统信息
+
+首页原来每次执行 systeminfo，需要枚举补丁和网卡，耗时好几秒。
+这里直接读取 psutil、platform 和注册表，字段与 systeminfo 的输出保持一致：
+- 不会变化的字段（系统版本、处理器、BIOS 等）第一次获取后缓存；
+- 内存、运行时间等每次请求重新获取；
+- 获取失败时退回执行 systeminfo 并解析输出。
+"""
+import locale
+import os
+import platform
+import re
+import threading
+import time
+from datetime import datetime
+
+_static_info = None
+_static_lock = threading.Lock()
+
+# 与 systeminfo 输出一致的字段顺序
+FIELDS = [
+    '主机名', 'OS 名称', 'OS 版本', 'OS 制造商', 'OS 配置', 'OS 构件类型', '注册的所有人', '注册的组织',
+    '产品 ID', '初始安装日期', '系统启动时间', '系统运行时间', '系统制造商', '系统型号', '系统类型', '处理器',
+    'BIOS 版本', 'Windows 目录', '系统目录', '启动设备', '系统区域设置', '时区',
+    '物理内存总量', '可用的物理内存', '虚拟内存: 最大值', '虚拟内存: 可用', '虚拟内存: 使用中',
+]
+
+
+def _read_registry(path, names, root=None):
+    """读取 HKLM 下某个键的多个值，不存在的值返回 None"""
+    import winreg
+
+    values = {}
+    with winreg.OpenKey(root or winreg.HKEY_LOCAL_MACHINE, path) as key:
+        for name in names:
+            try:
+                values[name] = winreg.QueryValueEx(key, name)[0]
+            except OSError:
+                values[name] = None
+    return values
+
+
+def _format_mb(size):
+    return f'{size // (1024 * 1024):,} MB'
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y/%m/%d, %H:%M:%S')
+
+
+def _format_uptime(seconds):
+    days, seconds = divmod(int(seconds), 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes = seconds // 60
+    return f'{days} 天 {hours} 小时 {minutes} 分钟'
+
+
+def collect_static_info():
+    """
+    获取不会变化的字段
+    """
+    import psutil
+    import winreg
+
+    current = _read_registry(
+        r'SOFTWARE\Microsoft\Windows NT\CurrentVersion',
+        ['ProductName', 'DisplayVersion', 'CurrentBuild', 'UBR', 'CurrentType',
+         'RegisteredOwner', 'RegisteredOrganization', 'ProductId', 'InstallDate', 'InstallationType']
+    )
+    bios = _read_registry(
+        r'HARDWARE\DESCRIPTION\System\BIOS',
+        ['SystemManufacturer', 'SystemProductName', 'BIOSVendor', 'BIOSVersion', 'BIOSReleaseDate']
+    )
+    cpu = _read_registry(r'HARDWARE\DESCRIPTION\System\CentralProcessor\0', ['ProcessorNameString', '~MHz'])
+    timezone = _read_registry(r'SYSTEM\CurrentControlSet\Control\TimeZoneInformation', ['TimeZoneKeyName'])
+    try:
+        international = _read_registry(r'Control Panel\International', ['LocaleName'], winreg.HKEY_CURRENT_USER)
+    except OSError:
+        international = {'LocaleName': None}
+
+    product_name = current['ProductName'] or f'Windows {platform.release()}'
+    build = current['CurrentBuild'] or platform.version().rsplit('.', 1)[-1]
+    # Windows 11 注册表中的 ProductName 仍然是 Windows 10，按构建号修正
+    if build.isdigit() and int(build) >= 22000:
+        product_name = product_name.replace('Windows 10', 'Windows 11')
+    os_version = platform.version()
+    if current['DisplayVersion']:
+        os_version += f' ({current["DisplayVersion"]})'
+    os_version += f' Build {build}'
+    if current['UBR'] is not None:
+        os_version += f'.{current["UBR"]}'
+
+    is_server = (current['InstallationType'] or '').lower().startswith('server')
+    system_root = os.environ.get('SystemRoot', r'C:\Windows')
+    boot_time = psutil.boot_time()
+    return {
+        '主机名': platform.node(),
+        'OS 名称': f'Microsoft {product_name}',
+        'OS 版本': os_version,
+        'OS 制造商': 'Microsoft Corporation',
+        'OS 配置': '独立服务器' if is_server else '独立工作站',
+        'OS 构件类型': current['CurrentType'] or '',
+        '注册的所有人': current['RegisteredOwner'] or '',
+        '注册的组织': current['RegisteredOrganization'] or '',
+        '产品 ID': current['ProductId'] or '',
+        '初始安装日期': _format_time(current['InstallDate']) if current['InstallDate'] else '',
+        '系统启动时间': _format_time(boot_time),
+        '系统制造商': bios['SystemManufacturer'] or '',
+        '系统型号': bios['SystemProductName'] or '',
+        '系统类型': f'{platform.machine()}-based PC',
+        '处理器': f'安装了 {psutil.cpu_count(logical=False) or 1} 个处理器，{psutil.cpu_count()} 个逻辑处理器。'
+                  f'</br>{(cpu["ProcessorNameString"] or platform.processor()).strip()} ~{cpu["~MHz"] or 0} Mhz',
+        'BIOS 版本': ' '.join(str(value) for value in (bios['BIOSVendor'], bios['BIOSVersion'], bios['BIOSReleaseDate']) if value),
+        'Windows 目录': system_root,
+        '系统目录': os.path.join(system_root, 'system32'),
+        '启动设备': os.environ.get('SystemDrive', ''),
+        '系统区域设置': international['LocaleName'] or (locale.getlocale()[0] or ''),
+        '时区': timezone['TimeZoneKeyName'] or time.tzname[0],
+        '_boot_time': boot_time,
+    }
+
+
+def collect_dynamic_info(boot_time):
+    """
+    获取每次都需要刷新的字段：运行时间、内存
+    """
+    import psutil
+
+    memory = psutil.virtual_memory()
+    swap = psutil.swap_memory()
+    return {
+        '系统运行时间': _format_uptime(time.time() - boot_time),
+        '物理内存总量': _format_mb(memory.total),
+        '可用的物理内存': _format_mb(memory.available),
+        '虚拟内存: 最大值': _format_mb(memory.total + swap.total),
+        '虚拟内存: 可用': _format_mb(memory.available + swap.free),
+        '虚拟内存: 使用中': _format_mb(memory.used + swap.used),
+    }
+
+
+def get_static_info():
+    global _static_info
+    with _static_lock:
+        if _static_info is None:
+            _static_info = collect_static_info()
+        return _static_info
+
+
+VIRTUAL_MEMORY_PATTERN = re.compile(r'^((?:虚拟内存|Virtual Memory): [^:]+?):\s*(.*)$')
+
+
+def parse_systeminfo(output):
+    """
+    解析 systeminfo 的输出
+
+    字段名和值之间用多个空格对齐，按“冒号 + 两个以上空格”拆分，
+    '虚拟内存: 最大值:' 这类字段名本身包含冒号，单独匹配；以空格开头的行是上一个字段的续行（如网卡、补丁）。
+    """
+    info = {}
+    last_key = None
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        if line.startswith(' '):
+            if last_key:
+                info[last_key] += '</br>' + line.strip()
+            continue
+        match = VIRTUAL_MEMORY_PATTERN.match(line) or re.match(r'^(.+?):\s{2,}(.*)$', line)
+        if match:
+            key, value = match.groups()
+        elif ':' in line:
+            key, value = line.split(':', 1)
+        else:
+            continue
+        key = key.strip()
+        info[key] = value.strip()
+        last_key = key
+    return info
+
+
+# systeminfo 各语言版本的字段名
+BOOT_TIME_KEYS = ('系统启动时间', 'System Boot Time')
+BOOT_TIME_FORMATS = ('%Y/%m/%d, %H:%M:%S', '%m/%d/%Y, %I:%M:%S %p', '%m/%d/%Y, %H:%M:%S')
+
+
+def parse_memory_mb(value):
+    """
+    解析 systeminfo 中的内存值，如 '16,234 MB'、'16.234 MB'（千位分隔符随区域设置变化）
+
+    :return: MB 数，无法解析时返回 None
+    """
+    match = re.match(r'^\s*([\d,.\s\u00a0\u202f]+?)\s*MB\s*$', value or '', re.IGNORECASE)
+    if not match:
+        return None
+    digits = re.sub(r'\D', '', match.group(1))
+    return int(digits) if digits else None
+
+
+def parse_boot_time(info):
+    """
+    从 parse_systeminfo() 的结果中取出系统启动时间
+
+    :return: datetime，没有该字段或格式无法识别时返回 None
+    """
+    value = next((info[key] for key in BOOT_TIME_KEYS if key in info), '')
+    # 月、日、时可能没有补零，strptime 可以处理
+    for time_format in BOOT_TIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), time_format)
+        except ValueError:
+            continue
+    return None
+
+
+def run_systeminfo():
+    import subprocess
+    encoding = locale.getpreferredencoding()
+    result = subprocess.run(
+        ['systeminfo'],
+        capture_output=True,
+        text=True,
+        encoding=encoding,
+        errors='replace'
+    )
+    return parse_systeminfo(result.stdout)
+
+
+def get_system_info():
+    """
+    首页显示的系统信息
+
+    :return: 按 FIELDS 顺序排列的字典
+    """
+    try:
+        static_info = get_static_info()
+        info = dict(static_info)
+        info.update(collect_dynamic_info(static_info['_boot_time']))
+    except Exception as e:
+        print(f'读取系统信息失败，使用 systeminfo: {e}')
+        info = dict(list(run_systeminfo().items())[:27])
+        # 较新的系统 systeminfo 不再输出运行时间，按启动时间计算
+        boot_time = parse_boot_time(info)
+        if boot_time and '系统运行时间' not in info and '系统启动时间' in info:
+            info['系统运行时间'] = _format_uptime(time.time() - boot_time.timestamp())
+        return info
+    return {key: info[key] for key in FIELDS if key in info}
@@ -0,0 +1,278 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from unittest import mock
+
+from django.http import QueryDict
+from django.test import SimpleTestCase
+
+from jiefoundation import downloader
+from jiefoundation.downloader import download, DownloadError, ChecksumError
+
+from .monitor import is_managed_exe, _normalize_folder
+from .services import parse_sc_queryex, decode_console_output
+from .sysinfo import parse_systeminfo, parse_memory_mb, parse_boot_time
+from .views import _int_param
+
+testdata_dir = Path(__file__).resolve().parent / 'testdata'
+
+
+def read_fixture(name):
+    return (testdata_dir / name).read_text(encoding='utf-8')
+
+
+class ParseSysteminfoZhCnTests(SimpleTestCase):
+    """中文系统 systeminfo 输出"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.info = parse_systeminfo(read_fixture('systeminfo_zh_cn.txt'))
+
+    def test_os_name_and_version(self):
+        self.assertEqual(self.info['主机名'], 'DESKTOP-JIE01')
+        self.assertEqual(self.info['OS 名称'], 'Microsoft Windows 11 专业版')
+        self.assertEqual(self.info['OS 版本'], '10.0.22631 暂缺 Build 22631')
+
+    def test_memory(self):
+        self.assertEqual(self.info['物理内存总量'], '32,482 MB')
+        self.assertEqual(parse_memory_mb(self.info['物理内存总量']), 32482)
+        self.assertEqual(parse_memory_mb(self.info['可用的物理内存']), 17105)
+
+    def test_virtual_memory_keys_contain_colon(self):
+        self.assertEqual(parse_memory_mb(self.info['虚拟内存: 最大值']), 37346)
+        self.assertEqual(parse_memory_mb(self.info['虚拟内存: 可用']), 19012)
+        self.assertEqual(parse_memory_mb(self.info['虚拟内存: 使用中']), 18334)
+
+    def test_boot_time(self):
+        self.assertEqual(parse_boot_time(self.info), datetime(2024, 10, 8, 8, 5, 33))
+
+    def test_continuation_lines(self):
+        self.assertTrue(self.info['处理器'].startswith('安装了 1 个处理器。</br>[01]: Intel64'))
+        self.assertIn('[03]: KB5044285', self.info['修补程序'])
+
+    def test_field_order(self):
+        self.assertEqual(list(self.info)[:3], ['主机名', 'OS 名称', 'OS 版本'])
+
+
+class ParseSysteminfoEnUsTests(SimpleTestCase):
+    """英文系统 systeminfo 输出"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.info = parse_systeminfo(read_fixture('systeminfo_en_us.txt'))
+
+    def test_os_name_and_version(self):
+        self.assertEqual(self.info['OS Name'], 'Microsoft Windows Server 2022 Datacenter')
+        self.assertEqual(self.info['OS Version'], '10.0.20348 N/A Build 20348')
+
+    def test_memory(self):
+        self.assertEqual(parse_memory_mb(self.info['Total Physical Memory']), 16383)
+        self.assertEqual(parse_memory_mb(self.info['Available Physical Memory']), 9871)
+        self.assertEqual(parse_memory_mb(self.info['Virtual Memory: Max Size']), 18815)
+        self.assertEqual(parse_memory_mb(self.info['Virtual Memory: In Use']), 7513)
+
+    def test_boot_time(self):
+        self.assertEqual(parse_boot_time(self.info), datetime(2024, 10, 7, 23, 42, 9))
+
+
+class ParseScQueryexTests(SimpleTestCase):
+    """sc queryex 输出，中文系统按 OEM 代码页（cp936）输出"""
+
+    def parse_fixture(self, name, encoding):
+        return parse_sc_queryex(decode_console_output((testdata_dir / name).read_bytes(), encoding))
+
+    def test_zh_cn(self):
+        services = self.parse_fixture('sc_queryex_zh_cn.txt', 'cp936')
+        self.assertEqual(list(services), ['audiosrv', 'mysql80', 'jie-mysql-8.4', 'wuauserv'])
+        self.assertEqual(services['audiosrv'], {
+            'name': 'AudioSrv', 'display_name': 'Windows 音频', 'state_code': 4, 'pid': 2816})
+        self.assertEqual(services['mysql80']['pid'], 4321)
+        self.assertEqual(services['jie-mysql-8.4']['name'], 'jie-mysql-8.4')
+        self.assertEqual(services['jie-mysql-8.4']['display_name'], 'Jie面板 MySQL 8.4 实例')
+        self.assertEqual(services['jie-mysql-8.4']['state_code'], 2)
+        self.assertEqual((services['wuauserv']['state_code'], services['wuauserv']['pid']), (1, 0))
+
+    def test_zh_cn_wrong_encoding(self):
+        # 用错误的编码解码时名称可能乱码，但服务名、状态码和 PID 不受影响
+        services = self.parse_fixture('sc_queryex_zh_cn.txt', 'utf-8')
+        self.assertEqual(services['mysql80'], {
+            'name': 'MySQL80', 'display_name': 'MySQL80', 'state_code': 4, 'pid': 4321})
+        self.assertEqual(services['jie-mysql-8.4']['state_code'], 2)
+
+    def test_en_us(self):
+        services = self.parse_fixture('sc_queryex_en_us.txt', 'cp437')
+        self.assertEqual(services['spooler'], {
+            'name': 'Spooler', 'display_name': 'Print Spooler', 'state_code': 1, 'pid': 0})
+        self.assertEqual((services['mysql84']['state_code'], services['mysql84']['pid']), (3, 7788))
+        self.assertEqual(services['audiosrv']['pid'], 2704)
+
+    def test_empty(self):
+        self.assertEqual(parse_sc_queryex(''), {})
+        self.assertEqual(parse_sc_queryex('[SC] EnumQueryServicesStatus:OpenService FAILED 5:\r\n'), {})
+
+
+class ParseMemoryTests(SimpleTestCase):
+
+    def test_separators(self):
+        self.assertEqual(parse_memory_mb('16,234 MB'), 16234)
+        self.assertEqual(parse_memory_mb('16.234 MB'), 16234)
+        self.assertEqual(parse_memory_mb('16 234 MB'), 16234)
+        self.assertEqual(parse_memory_mb('512 MB'), 512)
+
+    def test_invalid(self):
+        self.assertIsNone(parse_memory_mb('暂缺'))
+        self.assertIsNone(parse_memory_mb('16,234 GB'))
+        self.assertIsNone(parse_memory_mb(''))
+
+
+class MonitorParamTests(SimpleTestCase):
+
+    def test_invalid_uses_default(self):
+        self.assertEqual(_int_param(QueryDict('points=abc'), 'points', 120, 1, 720), 120)
+        self.assertEqual(_int_param(QueryDict('points='), 'points', 120, 1, 720), 120)
+        self.assertEqual(_int_param(QueryDict(''), 'seconds', 0, 0, 3600), 0)
+
+    def test_clamp(self):
+        self.assertEqual(_int_param(QueryDict('points=100000'), 'points', 120, 1, 720), 720)
+        self.assertEqual(_int_param(QueryDict('points=-5'), 'points', 120, 1, 720), 1)
+        self.assertEqual(_int_param(QueryDict('seconds=600'), 'seconds', 0, 0, 3600), 600)
+
+
+class ManagedExeTests(SimpleTestCase):
+
+    def test_under_install_folder(self):
+        folders = (_normalize_folder('/opt/jie/python'),)
+        self.assertTrue(is_managed_exe('/opt/jie/python/3.12.1/python.exe', folders))
+        self.assertFalse(is_managed_exe('/opt/jie/python-other/python.exe', folders))
+        self.assertFalse(is_managed_exe('/opt/panel/python/python.exe', folders))
+        self.assertFalse(is_managed_exe('', folders))
+        self.assertFalse(is_managed_exe('/opt/jie/python/python.exe', ()))
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """支持 Range 的下载替代服务器，server.content 为文件内容"""
+
+    def do_GET(self):
+        server = self.server
+        content = server.content
+        range_header = self.headers.get('Range')
+        with server.lock:
+            server.ranges.append(range_header)
+        if range_header and server.supports_range:
+            start, end = range_header.split('=', 1)[1].split('-')
+            start, end = int(start), int(end or len(content) - 1)
+            if start > 0 and server.fail_segments:
+                self.send_response(500)
+                self.end_headers()
+                return
+            data = content[start:end + 1]
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(content)}')
+        else:
+            data = content
+            self.send_response(200)
+        self.send_header('ETag', server.etag)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        if range_header != 'bytes=0-0':
+            with server.lock:
+                server.bytes_sent += len(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DownloaderTests(SimpleTestCase):
+    """用本地 http.server 测试分段下载、断点续传和边下载边计算摘要"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _RangeHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.content = os.urandom(1024 * 1024 + 123)
+        cls.server.etag = '"v1"'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/file.zip'
+        cls.sha256 = hashlib.sha256(cls.server.content).hexdigest()
+        cls.md5 = hashlib.md5(cls.server.content).hexdigest()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.ranges = []
+        self.server.bytes_sent = 0
+        self.server.supports_range = True
+        self.server.fail_segments = False
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, True)
+        self.destination = os.path.join(folder, 'file.zip')
+        patcher = mock.patch.object(downloader, 'MIN_SEGMENT_SIZE', 256 * 1024)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_destination(self):
+        with open(self.destination, 'rb') as f:
+            return f.read()
+
+    def test_parallel_segments_and_digests(self):
+        result = download(self.url, self.destination, expected={'sha256': self.sha256}, segments=4)
+        self.assertEqual(result['sha256'], self.sha256)
+        self.assertEqual(result['md5'], self.md5)
+        self.assertEqual(result['size'], len(self.server.content))
+        self.assertEqual(self.read_destination(), self.server.content)
+        segment_ranges = [item for item in self.server.ranges if item != 'bytes=0-0']
+        self.assertEqual(len(segment_ranges), 4)
+        self.assertFalse(os.path.exists(self.destination + '.part'))
+        self.assertFalse(os.path.exists(self.destination + '.part.json'))
+
+    def test_resume_part_file(self):
+        self.server.fail_segments = True
+        with self.assertRaises(DownloadError):
+            download(self.url, self.destination, segments=4, max_retries=1)
+        self.assertTrue(os.path.exists(self.destination + '.part'))
+        self.assertTrue(os.path.exists(self.destination + '.part.json'))
+        first_segment = self.server.bytes_sent
+        self.assertGreater(first_segment, 0)
+
+        # 第二次只下载剩下的分段，摘要仍然覆盖整个文件
+        self.server.fail_segments = False
+        self.server.bytes_sent = 0
+        result = download(self.url, self.destination, expected={'sha256': self.sha256, 'md5': self.md5}, segments=4)
+        self.assertEqual(self.server.bytes_sent, len(self.server.content) - first_segment)
+        self.assertEqual(result['sha256'], self.sha256)
+        self.assertEqual(self.read_destination(), self.server.content)
+
+    def test_checksum_mismatch(self):
+        with self.assertRaises(ChecksumError):
+            download(self.url, self.destination, expected={'sha256': '0' * 64}, segments=4)
+        self.assertFalse(os.path.exists(self.destination))
+
+    def test_without_range_support(self):
+        self.server.supports_range = False
+        result = download(self.url, self.destination, expected={'md5': self.md5}, segments=4)
+        self.assertEqual(result['sha256'], self.sha256)
+        self.assertEqual(self.read_destination(), self.server.content)
+
+    def test_transport_error(self):
+        with self.assertRaises(DownloadError):
+            download('http://127.0.0.1:1/file.zip', self.destination, max_retries=1, timeout=2)
+
+    def test_file_error_wrapped(self):
+        # 目标目录的上级是一个文件，创建目录时的 OSError 转换为 DownloadError
+        with open(self.destination, 'wb'):
+            pass
+        with self.assertRaises(DownloadError):
+            download(self.url, os.path.join(self.destination, 'sub', 'file.zip'), segments=4)
@@ -5,4 +5,8 @@ from . import views
 urlpatterns = [
     path('', views.HomeView.as_view()),
     path('home/index/', views.HomeView.as_view(), name='home'),
+    path('home/monitor/', views.MonitorDataView.as_view(), name='monitor_data'),
+    path('jobs/', views.JobListView.as_view(), name='job_list'),
+    path('jobs/<str:job_id>/', views.JobStatusView.as_view(), name='job_status'),
+    path('jobs/<str:job_id>/cancel/', views.JobCancelView.as_view(), name='job_cancel'),
 ]
@@ -1,6 +1,10 @@
-import locale
 from django.views.generic.base import ContextMixin, TemplateView
 
+from jiefoundation.jiebase import JsonView
+from jiefoundation.jobs import job_manager, get_job
+from .sysinfo import get_system_info
+from .monitor import host_monitor
+
 
 class HomeMixin(ContextMixin):
     def get_context_data(self, **kwargs):
@@ -8,37 +12,67 @@ class HomeMixin(ContextMixin):
         context['parent_menu'] = 'systeminfo'
         return context
 
-def get_system_info():
-    import subprocess
-    encoding = locale.getpreferredencoding()
-    result = subprocess.run(
-        ['systeminfo'],
-        capture_output=True,
-        text=True,
-        encoding=encoding,
-        errors='replace'
-    )
-    # 解析输出为字典
-    info = {}
-    for line in result.stdout.splitlines():
-        if ':' in line:
-            # 处理多行值的情况（如网络适配器）
-            if line.startswith(' '):
-                if last_key:
-                    info[last_key] += "</br>" + line.strip()
-            else:
-                parts = line.split(':', 1)
-                key = parts[0].strip()
-                value = parts[1].strip()
-                info[key] = value
-                last_key = key
-    return info
-
 class HomeView(HomeMixin, TemplateView):
     template_name = 'home.html'
 
     def get_context_data(self, **kwargs):
         context = super(HomeView, self).get_context_data(**kwargs)
         context['page_title'] = '系统信息'
-        context['system_info'] = dict(list(get_system_info().items())[:27])
+        context['system_info'] = get_system_info()
+        context['monitor_charts'] = [
+            ('chart-cpu', 'CPU'), ('chart-memory', '内存'), ('chart-disk', '磁盘 I/O'), ('chart-net', '网络 I/O'),
+        ]
+        host_monitor.start()
         return context
+
+
+def _int_param(params, name, default, minimum, maximum):
+    """整数查询参数，无法解析时使用默认值，超出范围时取边界值"""
+    try:
+        value = int(params.get(name) or default)
+    except (TypeError, ValueError):
+        value = default
+    return max(minimum, min(value, maximum))
+
+
+class MonitorDataView(JsonView):
+    """
+    资源监控数据，metrics 为逗号分隔的指标前缀，如 cpu,memory,disk,net,proc
+    """
+    def get(self, request, *args, **kwargs):
+        host_monitor.start()
+        metrics = [name for name in request.GET.get('metrics', '').split(',') if name]
+        # 最多取环形缓冲区中保存的全部样本
+        seconds = _int_param(request.GET, 'seconds', 0, 0, host_monitor.interval * host_monitor.capacity)
+        points = _int_param(request.GET, 'points', 120, 1, host_monitor.capacity)
+        data = host_monitor.query(metrics, seconds=seconds, points=points)
+        return self.render_to_json_response({'status': 'success', 'interval': host_monitor.interval, **data})
+
+
+class JobStatusView(JsonView):
+    """
+    后台任务状态，页面轮询此接口获取进度
+    """
+    def get(self, request, *args, **kwargs):
+        job = get_job(self.kwargs.get('job_id'))
+        if not job:
+            return self.render_to_json_error('任务不存在或已过期~', status=404)
+        return self.render_to_json_response({'status': 'success', 'job': job.to_dict()})
+
+
+class JobCancelView(JsonView):
+    def post(self, request, *args, **kwargs):
+        if job_manager.cancel(self.kwargs.get('job_id')):
+            return self.render_to_json_success('已请求取消任务~')
+        return self.render_to_json_error('任务不存在或已结束~')
+
+
+class JobListView(JsonView):
+    """
+    按 key 前缀列出任务，刷新页面后可以找回正在执行的任务
+    """
+    def get(self, request, *args, **kwargs):
+        key_prefix = request.GET.get('key', '')
+        active_only = request.GET.get('active') == '1'
+        jobs = [job.to_dict() for job in job_manager.list(key_prefix, active_only=active_only)]
+        return self.render_to_json_response({'status': 'success', 'jobs': jobs})